@@ -1,9 +1,326 @@
-from src.core import BillImportService
+from src.core import AccountScheduler, BillImportService, ImportOptions, MailWatcher
+from src.adapters.factory import AdapterFactory
+from src.config import constants
+from src.config.settings import load_profiles
 from src.utils.logger import setup_logger
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from datetime import date, datetime
+
+
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Import WeChat Pay / Alipay bills into Notion")
+    parser.add_argument(
+        "--platform",
+        type=platform_list,
+        metavar="PLATFORM[,PLATFORM]",
+        help=f"platforms to import, comma separated: {', '.join(AdapterFactory.get_supported_platforms())} "
+             "or all (asked interactively if omitted)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=constants.PLATFORM_CONCURRENCY,
+        metavar="N",
+        help="platforms processed at once; one platform's mail and extraction overlap another's upload "
+             f"(default: {constants.PLATFORM_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--async-upload",
+        action="store_true",
+        help="upload pages concurrently through the async Notion client",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=constants.NOTION_UPLOAD_WORKERS,
+        help=f"number of concurrent upload workers in async mode (default: {constants.NOTION_UPLOAD_WORKERS})",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="upload every row, even those already recorded in the local ledger",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        metavar="YYYY-MM-DD[ HH:MM:SS]",
+        help="import records from this time on instead of the stored watermark (backfill)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted upload from its checkpoint, skipping email and extraction",
+    )
+    parser.add_argument(
+        "--upsert",
+        action="store_true",
+        help="update pages of already imported transactions whose data changed instead of skipping them",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="query Notion for transactions already in the data source before uploading "
+             "(done automatically when the local ledger is empty)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help=f"write the Notion payloads to a compressed NDJSON file under {constants.DRY_RUN_DIR} "
+             "instead of uploading them",
+    )
+    parser.add_argument(
+        "--mail-since",
+        type=date.fromisoformat,
+        metavar="YYYY-MM-DD",
+        help="only search mails received since this day (default: the whole mailbox)",
+    )
+    parser.add_argument(
+        "--scan-mailbox",
+        action="store_true",
+        help="classify every mail of the period from its headers instead of using server-side search "
+             "(for servers whose search is unreliable)",
+    )
+    parser.add_argument(
+        "--no-mail-index",
+        action="store_true",
+        help="search the mailbox from scratch instead of updating the local index of mail headers",
+    )
+    parser.add_argument(
+        "--no-mail-cache",
+        action="store_true",
+        help=f"do not keep copies of bill and password mails under {constants.MAIL_CACHE_DIR}",
+    )
+    parser.add_argument(
+        "--from-cache",
+        action="store_true",
+        help="reprocess the newest cached bill mail instead of connecting to the mail server",
+    )
+    parser.add_argument(
+        "--keep-artifacts",
+        action="store_true",
+        help="also write the extracted bill and the standard CSV to disk for debugging "
+             "(bills are read from the archive in memory otherwise)",
+    )
+    parser.add_argument(
+        "--notion-base-url",
+        metavar="URL",
+        help="send Notion API requests to this URL instead of https://api.notion.com "
+             "(e.g. the local fake server, python -m src.notion_client.fake_server)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    replay_parser = subparsers.add_parser(
+        "replay", help="re-send only the pages recorded in the dead-letter files"
+    )
+    replay_parser.add_argument(
+        "platforms",
+        nargs="*",
+        metavar="PLATFORM",
+        help=f"platforms to replay: {', '.join(AdapterFactory.get_supported_platforms())} (default: all)",
+    )
+    replay_parser.add_argument(
+        "--account",
+        metavar="NAME",
+        help="replay the dead letters of this account of an `accounts` run, under "
+             f"{constants.ACCOUNT_DATA_DIR}/NAME, with the credentials of its profile",
+    )
+    replay_parser.add_argument(
+        "--profiles",
+        default=constants.ACCOUNTS_DIR,
+        metavar="DIR",
+        help=f"directory of the account profiles for --account (default: {constants.ACCOUNTS_DIR})",
+    )
+    push_parser = subparsers.add_parser(
+        "push", help="upload the payload files written by an earlier --dry-run"
+    )
+    push_parser.add_argument("files", nargs="+", metavar="FILE", help="payload files to upload")
+    watch_parser = subparsers.add_parser(
+        "watch", help="stay connected to the mailbox and import bills as soon as their mails arrive"
+    )
+    watch_parser.add_argument(
+        "platforms",
+        nargs="*",
+        metavar="PLATFORM",
+        help=f"platforms to watch: {', '.join(AdapterFactory.get_supported_platforms())} (default: all)",
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=constants.MAIL_POLL_INTERVAL,
+        metavar="SECONDS",
+        help=f"seconds between checks on servers without IDLE (default: {constants.MAIL_POLL_INTERVAL})",
+    )
+    accounts_parser = subparsers.add_parser(
+        "accounts", help="import the bills of several accounts concurrently, one profile file per account"
+    )
+    accounts_parser.add_argument(
+        "platforms",
+        nargs="*",
+        metavar="PLATFORM",
+        help="platforms to import for every account (default: each profile's PLATFORMS, or all)",
+    )
+    accounts_parser.add_argument(
+        "--profiles",
+        default=constants.ACCOUNTS_DIR,
+        metavar="DIR",
+        help=f"directory of <account>.env profiles with the same variables as .env (default: {constants.ACCOUNTS_DIR})",
+    )
+    accounts_parser.add_argument(
+        "--jobs",
+        type=int,
+        default=constants.ACCOUNT_WORKERS,
+        help=f"accounts imported at once (default: {constants.ACCOUNT_WORKERS})",
+    )
+    accounts_parser.add_argument(
+        "--imap-connections",
+        type=int,
+        default=constants.IMAP_CONNECTION_LIMIT,
+        help=f"IMAP sessions open at once over all accounts (default: {constants.IMAP_CONNECTION_LIMIT})",
+    )
+    backfill_parser = subparsers.add_parser(
+        "backfill",
+        help=f"import every bill archive in {constants.ATTACHMENT_DIR} at once, decrypted and parsed in parallel",
+    )
+    backfill_parser.add_argument(
+        "platforms",
+        nargs="*",
+        metavar="PLATFORM",
+        help=f"platforms to backfill: {', '.join(AdapterFactory.get_supported_platforms())} (default: all)",
+    )
+    backfill_parser.add_argument(
+        "--password",
+        action="append",
+        default=[],
+        dest="passwords",
+        metavar="PASSWORD",
+        help="archive password to try, may be repeated (the passwords of cached password mails are tried too)",
+    )
+    backfill_parser.add_argument(
+        "--processes",
+        type=int,
+        metavar="N",
+        help="archives decrypted and parsed at once (default: number of CPUs)",
+    )
+    return parser.parse_args(argv)
+
+
+def platform_list(value):
+    """Parse a comma separated --platform value."""
+    supported = AdapterFactory.get_supported_platforms()
+    platforms = [p.strip().lower() for p in value.split(",") if p.strip()]
+    if platforms == ["all"]:
+        return tuple(supported)
+    unknown = [p for p in platforms if p not in supported]
+    if unknown or not platforms:
+        raise argparse.ArgumentTypeError(
+            f"unknown platform {', '.join(unknown) or value!r}, choose from {', '.join(supported)} or all"
+        )
+    return tuple(dict.fromkeys(platforms))
+
+
+def select_platforms(logger):
+    """Ask which platforms to import."""
+    try:
+        flag = int(input("Select platform (0: wechatpay, 1: alipay, 2: all): "))
+    except ValueError:
+        logger.error("Invalid input: must be a number")
+        raise ValueError("Invalid input. Please enter a number (0, 1, or 2).")
+    platforms = {0: ("wechatpay",), 1: ("alipay",), 2: ("alipay", "wechatpay")}
+    
+    if flag not in platforms:
+        logger.error("Invalid input received")
+        raise ValueError("Invalid input. Please enter 0, 1, or 2.")
+    return platforms[flag]
+
+
+def account_service(args, logger, options):
+    """Create the service of the ``replay --account`` account, on its own data paths."""
+    profiles = {profile.name: profile for profile in load_profiles(args.profiles)}
+    if args.account not in profiles:
+        raise ValueError(f"No account profile {args.account!r} in {args.profiles}")
+    return BillImportService(
+        profiles[args.account].config, logger, options, paths=AccountScheduler.paths_for(args.account)
+    )
+
+
+def warn_dead_letters(logger, results, args, paths=None):
+    """Tell where the dead-lettered records are and how to replay them.
+    
+    Results of an ``accounts`` run are labelled ``<account>/<platform>`` and
+    their dead-letter files live under each account's own data directory,
+    as do those of ``replay --account``.
+    """
+    counts = {}
+    for result in results:
+        if result.success and result.records_dead_lettered:
+            if args.command == "accounts":
+                account = result.platform.split("/")[0]
+            else:
+                account = getattr(args, "account", None)
+            counts[account] = counts.get(account, 0) + result.records_dead_lettered
+    for account, count in counts.items():
+        command = "python main.py replay"
+        if account is not None:
+            paths = AccountScheduler.paths_for(account)
+            command += f" --account {account}"
+            if args.profiles != constants.ACCOUNTS_DIR:
+                command += f" --profiles {args.profiles}"
+        logger.warning(
+            f"{count} records were dead-lettered under {paths.dead_letter_dir}; "
+            f"run `{command}` to re-send them"
+        )
+
+
+def run_platforms(service, args, logger):
+    """Run the selected command for each platform, sharing one mailbox scan.
+    
+    Up to ``--concurrency`` platforms run at once. Results are printed and
+    returned in platform order.
+    """
+    session = nullcontext()
+    if args.command == "replay":
+        platforms = args.platforms or args.platform or AdapterFactory.get_supported_platforms()
+        run = service.replay_dead_letters
+    elif args.command == "push":
+        platforms = args.files
+        run = service.push_payload_file
+    elif args.command == "backfill":
+        platforms = args.platforms or args.platform or AdapterFactory.get_supported_platforms()
+        run = partial(service.backfill, passwords=args.passwords, processes=args.processes)
+    else:
+        # Get user input for platform selection unless --platform says
+        platforms = args.platform or select_platforms(logger)
+        run = service.import_bill
+        if not args.resume:
+            # One mailbox scan serves every selected platform
+            session = service.mail_session(platforms)
+    
+    def process(platform):
+        logger.info(f"\n{'='*60}")
+        logger.info(f"Processing {platform}...")
+        logger.info(f"{'='*60}")
+        return run(platform)
+    
+    results = []
+    with session, ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        # Process the selected platforms, several at once
+        for result in executor.map(process, platforms):
+            results.append(result)
+            
+            # Print result to console
+            print(f"\n{result}")
+    
+    return results
+
 
 def main():
     """Main entry point for the application."""
+    args = parse_args()
+    
     # Setup logger with both console and file output
     logger = setup_logger(
         name="bill2notion",
@@ -18,33 +335,47 @@ def main():
     
     try:
         # Create service instance from environment configuration
-        service = BillImportService.from_env(logger)
-        
-        # Get user input for platform selection
-        try:
-            flag = int(input("Select platform (0: wechatpay, 1: alipay, 2: all): "))
-        except ValueError:
-            logger.error("Invalid input: must be a number")
-            raise ValueError("Invalid input. Please enter a number (0, 1, or 2).")
-        platforms = {0: ("wechatpay",), 1: ("alipay",), 2: ("alipay", "wechatpay")}
-        
-        if flag not in platforms:
-            logger.error("Invalid input received")
-            raise ValueError("Invalid input. Please enter 0, 1, or 2.")
-        
-        results = []
-        
-        # Process each selected platform
-        for platform in platforms[flag]:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"Processing {platform}...")
-            logger.info(f"{'='*60}")
+        options = ImportOptions(
+            async_upload=args.async_upload,
+            upload_workers=args.workers,
+            dedup=not args.no_dedup,
+            since=args.since,
+            resume=args.resume,
+            upsert=args.upsert,
+            prefetch=args.prefetch,
+            dry_run=args.dry_run,
+            notion_base_url=args.notion_base_url,
+            mail_since=args.mail_since,
+            scan_mailbox=args.scan_mailbox,
+            mail_index=not args.no_mail_index,
+            mail_cache=not args.no_mail_cache,
+            from_cache=args.from_cache,
+            keep_artifacts=args.keep_artifacts,
+        )
+        if args.command == "accounts":
+            scheduler = AccountScheduler(
+                load_profiles(args.profiles),
+                options,
+                args.platforms or args.platform,
+                workers=args.jobs,
+                imap_connections=args.imap_connections,
+                logger=logger,
+            )
+            results = scheduler.run()
+            for result in results:
+                print(f"\n{result}")
+        else:
+            if args.command == "replay" and args.account:
+                service = account_service(args, logger, options)
+            else:
+                service = BillImportService.from_env(logger, options)
             
-            result = service.import_bill(platform)
-            results.append(result)
+            if args.command == "watch":
+                platforms = args.platforms or args.platform or AdapterFactory.get_supported_platforms()
+                MailWatcher(service, platforms, poll_interval=args.poll_interval).run()
+                return
             
-            # Print result to console
-            print(f"\n{result}")
+            results = run_platforms(service, args, logger)
         
         # Summary
         logger.info("\n" + "=" * 60)
@@ -52,14 +383,17 @@ def main():
         logger.info("=" * 60)
         
         success_count = sum(1 for r in results if r.success)
-        total_records = sum(r.records_processed for r in results if r.success)
+        total_records = sum(r.records_uploaded for r in results if r.success)
         
         for result in results:
             logger.info(str(result))
         
         logger.info(f"\nTotal: {success_count}/{len(results)} platforms succeeded")
         logger.info(f"Total records imported: {total_records}")
+        warn_dead_letters(logger, results, args, None if args.command == "accounts" else service.paths)
             
+    except KeyboardInterrupt:
+        logger.info("Interrupted")
     except ValueError as e:
         logger.error(f"Validation error: {e}")
         print(f"\nError: {e}")
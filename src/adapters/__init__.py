@@ -1,12 +1,13 @@
 """Payment platform adapters for handling platform-specific differences."""
 
-from src.adapters.base import PaymentAdapter
+from src.adapters.base import BillPartRule, PaymentAdapter
 from src.adapters.alipay_adapter import AlipayAdapter
 from src.adapters.wechatpay_adapter import WechatpayAdapter
 from src.adapters.factory import AdapterFactory
 
 __all__ = [
     "PaymentAdapter",
+    "BillPartRule",
     "AlipayAdapter",
     "WechatpayAdapter",
     "AdapterFactory",
@@ -39,6 +39,7 @@ class AlipayAdapter(PaymentAdapter):
             'transaction_id': '交易订单号',
             'merchant_order_id': '商家订单号',
             'payment_method': '收/付款方式',
+            'status': '交易状态',
         }
 
     def process_amount(self, amount_str: str) -> float:
@@ -1,7 +1,43 @@
 """Base adapter interface for payment platforms."""
 
+import re
 from abc import ABC, abstractmethod
-from typing import Dict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Pattern
+
+_IMAP_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def imap_date(day: date) -> str:
+    """Format a date for IMAP SEARCH (RFC 3501 date, e.g. '01-Feb-2025').
+    
+    Month names are spelled out here rather than with strftime('%b'),
+    which follows the process locale.
+    """
+    return f"{day.day:02d}-{_IMAP_MONTHS[day.month - 1]}-{day.year}"
+
+
+@dataclass(frozen=True)
+class BillPartRule:
+    """Describe the MIME part of a bill mail that holds the bill.
+    
+    Attributes:
+        kind: "attachment" to save a part whose file name matches ``pattern``,
+            or "link" to download the URLs in a part that match ``pattern``
+        pattern: Compiled pattern for the file name or URL
+        content_type: Only consider parts of this content type ("" for any)
+    """
+
+    kind: str
+    pattern: Pattern
+    content_type: str = ""
+
+
+# Links in a bill mail that may point at the bill file
+BILL_LINK_PATTERN = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+)
 
 
 class PaymentAdapter(ABC):
@@ -78,3 +114,46 @@ class PaymentAdapter(ABC):
     def needs_excel_conversion(self) -> bool:
         """Return True if downloaded files are Excel and need conversion to CSV."""
         pass
+
+    def get_bill_part_rules(self) -> List[BillPartRule]:
+        """Return the rules selecting the parts of a bill mail to save.
+        
+        By default the bill is a zip attachment named after the bill file prefix.
+        """
+        pattern = re.compile(f"^{re.escape(self.get_bill_file_prefix())}.*\\.zip$", re.IGNORECASE)
+        return [BillPartRule("attachment", pattern)]
+
+    def get_password_subject(self) -> str:
+        """Return the subject prefix of the password mail the user sends to themself."""
+        return f"{self.platform_name}解压密码"
+
+    def parse_password_subject(self, subject: str) -> Optional[str]:
+        """Return the 6-digit password if ``subject`` is this platform's password mail subject."""
+        match = re.match(f"^{re.escape(self.get_password_subject())}([0-9]{{6}})$", subject or "")
+        return match.group(1) if match else None
+
+    def get_bill_search_criteria(self, since: Optional[date] = None) -> List[str]:
+        """Return IMAP SEARCH criteria matching this platform's bill mails.
+        
+        Args:
+            since: Only match mails received on or after this day (optional)
+        """
+        criteria = ["FROM", self.get_email_sender()]
+        if since is not None:
+            criteria += ["SINCE", imap_date(since)]
+        return criteria
+
+    def get_password_search_criteria(self, username: str, since: Optional[date] = None) -> List[str]:
+        """Return IMAP SEARCH criteria matching the password mail sent from ``username``.
+        
+        The subject criterion is last because it is not ASCII and has to be
+        sent as a UTF-8 literal.
+        
+        Args:
+            username: The user's own email address
+            since: Only match mails received on or after this day (optional)
+        """
+        criteria = ["FROM", username]
+        if since is not None:
+            criteria += ["SINCE", imap_date(since)]
+        return criteria + ["SUBJECT", self.get_password_subject()]
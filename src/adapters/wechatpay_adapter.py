@@ -1,7 +1,7 @@
 """WeChat Pay payment platform adapter."""
 
-from typing import Dict
-from src.adapters.base import PaymentAdapter
+from typing import Dict, List
+from src.adapters.base import BILL_LINK_PATTERN, BillPartRule, PaymentAdapter
 
 
 class WechatpayAdapter(PaymentAdapter):
@@ -39,6 +39,7 @@ class WechatpayAdapter(PaymentAdapter):
             'transaction_id': '交易单号',
             'merchant_order_id': '商户单号',
             'payment_method': '支付方式',
+            'status': '当前状态',
         }
 
     def process_amount(self, amount_str: str) -> float:
@@ -83,3 +84,7 @@ class WechatpayAdapter(PaymentAdapter):
     def needs_excel_conversion(self) -> bool:
         """WeChat Pay provides Excel files that need conversion to CSV."""
         return True
+
+    def get_bill_part_rules(self) -> List[BillPartRule]:
+        """WeChat Pay mails a download link in the HTML body instead of an attachment."""
+        return [BillPartRule("link", BILL_LINK_PATTERN, content_type="text/html")]
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from pathlib import Path
 
 # Directory and filename constants
@@ -7,18 +8,113 @@ PROCESSED_PATH = Path("processed")
 ATTACHMENT_DIR = DATA_PATH / RAW_PATH / "attachment"
 BILL_RAW_DIR = DATA_PATH / RAW_PATH / "csv"
 PROCESSED_DIR = DATA_PATH / PROCESSED_PATH
+DRY_RUN_DIR = DATA_PATH / "dry_run"
+MAIL_CACHE_DIR = DATA_PATH / "mail_cache"
 PROJECT_ROOT = Path(".")
+# One .env-style profile per account; each account works under its own data directory
+ACCOUNTS_DIR = PROJECT_ROOT / "accounts"
+ACCOUNT_DATA_DIR = DATA_PATH / "accounts"
 
 # Filename prefixes / templates (can be overridden by envs later)
-RAW_FILENAME_PREFIX = {
-    "alipay": "alipay_raw",
-    "wechatpay": "wechatpay_raw",
-}
-
 STD_FILENAME_TEMPLATE = "{platform}_standard.csv"
+DEAD_LETTER_FILENAME_TEMPLATE = "{platform}_dead_letter.ndjson"
+CHECKPOINT_FILENAME_TEMPLATE = "{platform}_upload.ndjson"
+DRY_RUN_FILENAME_TEMPLATE = "{platform}_{timestamp}.ndjson.gz"
+
+# Notion API throughput: the public API allows an average of ~3 requests/second
+# per integration, so uploads are paced by a token bucket rather than latency.
+NOTION_RATE_LIMIT = 3.0
+NOTION_RATE_BURST = 3
+NOTION_UPLOAD_WORKERS = 4
+
+# Retries for throttled (429) and transient (5xx / network) Notion failures
+NOTION_MAX_ATTEMPTS = 5
+NOTION_RETRY_BASE_DELAY = 1.0
+NOTION_RETRY_MAX_DELAY = 60.0
+
+# Messages per UID FETCH when only envelopes (From/Subject/Date) are fetched
+ENVELOPE_BATCH_SIZE = 200
+
+# Platforms of one run imported at once (--concurrency)
+PLATFORM_CONCURRENCY = 2
+
+# Multi-account runs: accounts imported at once, and IMAP sessions open at once
+ACCOUNT_WORKERS = 4
+IMAP_CONNECTION_LIMIT = 4
+
+# Watch mode: IDLE is renewed before the 29-minute limit of RFC 2177;
+# servers without IDLE are polled with NOOP instead
+MAIL_IDLE_TIMEOUT = 25 * 60
+MAIL_POLL_INTERVAL = 60
+MAIL_RECONNECT_MIN_DELAY = 5
+MAIL_RECONNECT_MAX_DELAY = 300
+
+# Downloads of bill files linked from mails (WeChat)
+DOWNLOAD_CONNECT_TIMEOUT = 10.0
+DOWNLOAD_READ_TIMEOUT = 60.0
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+DOWNLOAD_POOL_SIZE = 4
+# Responses up to this size (or HTML/text ones) are checked for the expiry page
+DOWNLOAD_EXPIRY_CHECK_BYTES = 64 * 1024
+
+@dataclass(frozen=True)
+class DataPaths:
+    """Working directories of one account, laid out like the default ``data/``."""
+
+    root: Path
+
+    @property
+    def attachment_dir(self) -> Path:
+        return self.root / RAW_PATH / "attachment"
+
+    @property
+    def bill_raw_dir(self) -> Path:
+        return self.root / RAW_PATH / "csv"
+
+    @property
+    def processed_dir(self) -> Path:
+        return self.root / PROCESSED_PATH
+
+    @property
+    def dead_letter_dir(self) -> Path:
+        return self.root / "dead_letter"
+
+    @property
+    def state_dir(self) -> Path:
+        return self.root / "state"
+
+    @property
+    def ledger_path(self) -> Path:
+        return self.state_dir / "ledger.sqlite3"
+
+    @property
+    def mail_index_path(self) -> Path:
+        return self.state_dir / "mail_index.sqlite3"
+
+    @property
+    def checkpoint_dir(self) -> Path:
+        return self.state_dir / "checkpoints"
+
+    @property
+    def dry_run_dir(self) -> Path:
+        return self.root / "dry_run"
+
+    @property
+    def mail_cache_dir(self) -> Path:
+        return self.root / "mail_cache"
+
+    def ensure(self):
+        """Ensure the directories exist."""
+        for directory in (
+            self.attachment_dir,
+            self.bill_raw_dir,
+            self.processed_dir,
+            self.dead_letter_dir,
+            self.state_dir,
+            self.checkpoint_dir,
+            self.dry_run_dir,
+        ):
+            directory.mkdir(parents=True, exist_ok=True)
+
 
-def ensure_dirs():
-    """Ensure base directories exist."""
-    ATTACHMENT_DIR.mkdir(parents=True, exist_ok=True)
-    BILL_RAW_DIR.mkdir(parents=True, exist_ok=True)
-    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+DEFAULT_PATHS = DataPaths(DATA_PATH)
@@ -1,8 +1,9 @@
 import os
+from dataclasses import dataclass
 from pathlib import Path
 import shutil
-from typing import Tuple
-from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+from dotenv import dotenv_values, load_dotenv
 from src.utils.logger import get_logger 
 
 def _ensure_env_file_exists():
@@ -21,6 +22,50 @@ def _ensure_env_file_exists():
         shutil.copy(template_file, env_file)
         logger.info("Copied .env.template to .env. Please review and update it.")
 
+_CONFIG_KEYS = ('EMAIL_USERNAME', 'EMAIL_PASSWORD', 'EMAIL_IMAP_URL', 'NOTION_DATA_SOURCE_ID', 'NOTION_TOKEN')
+
+
+@dataclass
+class AccountProfile:
+    """Credentials of one account in a multi-account run."""
+
+    name: str
+    config: Tuple[str, str, str, str, str]
+    platforms: Optional[List[str]] = None
+
+    @property
+    def notion_token(self) -> str:
+        return self.config[4]
+
+
+def load_profiles(directory: str | Path) -> List[AccountProfile]:
+    """Loads every account profile from a directory of .env files.
+
+    Each ``<name>.env`` file holds the same variables as ``.env``, plus an
+    optional ``PLATFORMS=alipay,wechatpay``. The files are read without
+    touching ``os.environ``, so profiles cannot leak into each other.
+
+    Raises:
+        FileNotFoundError: If the directory holds no profile
+        ValueError: If a profile misses a required variable
+    """
+    profiles = []
+    for path in sorted(Path(directory).glob('*.env')):
+        values = dotenv_values(path)
+        missing = [key for key in _CONFIG_KEYS if not values.get(key)]
+        if missing:
+            raise ValueError(f"Missing {', '.join(missing)} in account profile {path}")
+        platforms = [p.strip() for p in (values.get('PLATFORMS') or '').split(',') if p.strip()]
+        profiles.append(AccountProfile(
+            name=path.stem,
+            config=tuple(values[key] for key in _CONFIG_KEYS),
+            platforms=platforms or None,
+        ))
+    if not profiles:
+        raise FileNotFoundError(f"No account profiles (*.env) found in {directory}")
+    return profiles
+
+
 def load_config() -> Tuple[str, str, str, str, str]:
     """Loads all necessary configurations from the .env file."""
     _ensure_env_file_exists()
@@ -1,5 +1,7 @@
 """Core business logic and service orchestration."""
 
-from src.core.service import BillImportService, ImportResult
+from src.core.service import BillImportService, ImportOptions, ImportResult
+from src.core.scheduler import AccountScheduler
+from src.core.watcher import MailWatcher
 
-__all__ = ["BillImportService", "ImportResult"]
+__all__ = ["BillImportService", "ImportOptions", "ImportResult", "AccountScheduler", "MailWatcher"]
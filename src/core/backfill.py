@@ -0,0 +1,102 @@
+"""Backfill: decrypt and parse every bill archive of a platform in parallel."""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import repeat
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+from src.adapters.factory import AdapterFactory
+from src.data_processing.data_processor import DataProcessor
+from src.file_utils.bill_reader import BillReader
+
+
+@dataclass
+class ArchiveResult:
+    """Processed rows of one archive, or why it could not be read."""
+
+    archive: Path
+    data: Optional[pd.DataFrame] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+def read_archive(
+    archive: Path,
+    platform: str,
+    passwords: Sequence[Optional[str]],
+    since: Optional[datetime] = None,
+) -> ArchiveResult:
+    """Decrypt and process one archive; runs in a worker process.
+
+    Each password is first checked against the member's encryption header,
+    so trying the passwords of many mails is cheap. For ZipCrypto that
+    header is a single check byte that one wrong password in 256 passes:
+    such a password fails later, while decoding or on the CRC at the end of
+    the member, and the next password is tried then as well.
+    """
+    started = time.perf_counter()
+    adapter = AdapterFactory.create(platform)
+    last_error = None
+    for password in passwords:
+        reader = BillReader(archive, password, adapter)
+        try:
+            reader.verify()
+        except RuntimeError:  # wrong password
+            continue
+        except Exception as e:
+            return ArchiveResult(archive, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - started)
+        try:
+            processor = DataProcessor(reader, adapter)
+        except Exception as e:  # wrong password that passed the header check, or bad data
+            last_error = f"{type(e).__name__}: {e}"
+            continue
+        try:
+            if since is not None:
+                processor.filter_since(since)
+            processor.process_mandatory_fields()
+        except Exception as e:
+            return ArchiveResult(archive, error=f"{type(e).__name__}: {e}", seconds=time.perf_counter() - started)
+        return ArchiveResult(archive, processor.get_processed_data(), seconds=time.perf_counter() - started)
+
+    error = f"none of the {len(passwords)} passwords opens it"
+    if last_error:
+        error += f" (last error: {last_error})"
+    return ArchiveResult(archive, error=error, seconds=time.perf_counter() - started)
+
+
+def read_archives(
+    archives: Sequence[Path],
+    platform: str,
+    passwords: Sequence[Optional[str]],
+    since: Optional[datetime] = None,
+    processes: Optional[int] = None,
+) -> List[ArchiveResult]:
+    """Read many archives at once, one per worker process.
+
+    Decryption and parsing are CPU bound, so a process pool (not threads)
+    lets the wall time shrink with the number of cores. Workers are
+    spawned rather than forked, since the caller may be running other
+    platforms in threads.
+
+    Args:
+        archives: Archives to read
+        platform: Payment platform name
+        passwords: Candidate passwords, tried in order (None for unencrypted archives)
+        since: Drop rows older than this time (optional)
+        processes: Worker processes (defaults to the number of CPUs)
+
+    Returns:
+        One ArchiveResult per archive, in the order given
+    """
+    if not archives:
+        return []
+    workers = min(processes or os.cpu_count() or 1, len(archives))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(read_archive, archives, repeat(platform), repeat(list(passwords)), repeat(since)))
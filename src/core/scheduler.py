@@ -0,0 +1,109 @@
+"""Concurrent bill imports for several accounts."""
+
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Dict, List, Optional, Sequence
+
+from src.adapters.factory import AdapterFactory
+from src.config import constants
+from src.config.settings import AccountProfile
+from src.core.service import BillImportService, ImportOptions, ImportResult
+from src.utils.logger import get_logger
+from src.utils.rate_limiter import TokenBucket
+
+
+class AccountScheduler:
+    """Run the imports of many accounts at once, each in its own service.
+
+    Accounts are isolated from each other: every one works under
+    ``data/accounts/<name>/`` with its own ledger, mail index, mail cache,
+    checkpoints and dead-letter files. What they share is capped instead:
+
+    * at most ``imap_connections`` IMAP sessions are open at once, across
+      all accounts (a session is released as soon as its bills are
+      downloaded, before the uploads finish);
+    * accounts using the same Notion token share one token bucket, so the
+      integration's rate limit holds however many data sources it writes to.
+
+    Wall time is therefore bounded by the slowest account rather than the
+    sum of all of them, as long as ``workers`` covers the accounts.
+    """
+
+    def __init__(
+        self,
+        profiles: Sequence[AccountProfile],
+        options: Optional[ImportOptions] = None,
+        platforms: Optional[Sequence[str]] = None,
+        workers: int = constants.ACCOUNT_WORKERS,
+        imap_connections: int = constants.IMAP_CONNECTION_LIMIT,
+        logger=None,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            profiles: Accounts to import
+            options: Import behaviour options shared by all accounts
+            platforms: Platforms to import for every account (optional,
+                defaults to each profile's PLATFORMS, then to all platforms)
+            workers: Accounts imported at once
+            imap_connections: IMAP sessions open at once, over all accounts
+            logger: Logger instance (optional)
+        """
+        self.profiles = list(profiles)
+        self.options = options or ImportOptions()
+        self.platforms = list(platforms) if platforms else None
+        self.workers = max(1, workers)
+        self.imap_slots = threading.BoundedSemaphore(max(1, imap_connections))
+        self.logger = logger or get_logger()
+        rate = self.options.rate_limit
+        self.rate_limiters: Dict[str, TokenBucket] = {
+            profile.notion_token: TokenBucket(rate, constants.NOTION_RATE_BURST) for profile in self.profiles
+        }
+
+    @staticmethod
+    def paths_for(account: str) -> constants.DataPaths:
+        """Return the data paths of an account (``data/accounts/<account>/``)."""
+        return constants.DataPaths(constants.ACCOUNT_DATA_DIR / account)
+
+    def run(self) -> List[ImportResult]:
+        """Import every account and return the results of all platforms.
+
+        Results are labelled ``<account>/<platform>`` and listed in profile order.
+        """
+        started = time.monotonic()
+        self.logger.info(
+            f"Importing {len(self.profiles)} accounts with {self.workers} workers "
+            f"({len(self.rate_limiters)} Notion tokens)"
+        )
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="account") as executor:
+            per_account = list(executor.map(self._run_account, self.profiles))
+        self.logger.info(f"All accounts finished in {time.monotonic() - started:.1f}s")
+        return [result for results in per_account for result in results]
+
+    def _run_account(self, profile: AccountProfile) -> List[ImportResult]:
+        platforms = self.platforms or profile.platforms or AdapterFactory.get_supported_platforms()
+        started = time.monotonic()
+        try:
+            service = BillImportService(
+                profile.config,
+                self.logger,
+                self.options,
+                paths=self.paths_for(profile.name),
+                rate_limiter=self.rate_limiters[profile.notion_token],
+                imap_slots=self.imap_slots,
+            )
+            results = []
+            # One mailbox scan per account, unless resuming skips the mail step
+            session = nullcontext() if self.options.resume else service.mail_session(platforms)
+            with session:
+                for platform in platforms:
+                    results.append(service.import_bill(platform))
+        except Exception as e:
+            self.logger.exception(f"Account {profile.name} failed: {e}")
+            return [ImportResult(success=False, platform=profile.name, error_message=str(e))]
+        finally:
+            self.logger.info(f"Account {profile.name} finished in {time.monotonic() - started:.1f}s")
+        return [replace(result, platform=f"{profile.name}/{result.platform}") for result in results]
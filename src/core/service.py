@@ -1,20 +1,36 @@
 """Bill import service for orchestrating the complete import workflow."""
 
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from datetime import date, datetime, timedelta
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
 from pathlib import Path
 
+import pandas as pd
+
 from src.config.settings import load_config
 from src.config import constants
 from src.adapters.factory import AdapterFactory
 from src.adapters.base import PaymentAdapter
+from src.email_client.cache import MailCache
 from src.email_client.client import MailClient
+from src.email_client.scanner import MailboxScanner
+from src.core.backfill import read_archives
+from src.file_utils.bill_reader import BillReader
 from src.file_utils.unzip_att import FileExtractor
-from src.file_utils.move_file import FileMover
-from src.file_utils.csv_transformer import CsvTransformer
 from src.data_processing.data_processor import DataProcessor
 from src.notion_client.client import NotionClient
+from src.notion_client.dead_letter import DeadLetterQueue
+from src.notion_client.payload_file import PayloadFile
+from src.notion_client.uploader import NotionUploader, UploadJob, UploadReport
 from src.utils.logger import get_logger
+from src.state.checkpoint import CheckpointState, UploadCheckpoint, file_sha256
+from src.state.ledger import TransactionLedger
+from src.state.mail_index import MailIndex
+from src.utils.rate_limiter import TokenBucket
+from src.utils.timing import StageStats
 from src.core.exceptions import (
     ConfigurationError,
     PasswordNotFoundError,
@@ -32,15 +48,71 @@ class ImportResult:
     success: bool
     platform: str
     records_processed: int = 0
+    records_uploaded: int = 0
+    records_retried: int = 0
+    records_dead_lettered: int = 0
+    records_updated: int = 0
+    records_unchanged: int = 0
+    output_file: Optional[str] = None
     error_message: Optional[str] = None
     
+    @classmethod
+    def from_report(cls, platform: str, report: UploadReport) -> "ImportResult":
+        """Build a successful result from the uploader's counts."""
+        return cls(
+            success=True,
+            platform=platform,
+            records_processed=report.processed,
+            records_uploaded=report.uploaded,
+            records_retried=report.retried,
+            records_dead_lettered=report.dead_lettered,
+            records_updated=report.updated,
+            records_unchanged=report.unchanged,
+        )
+    
     def __str__(self):
+        if self.success and self.output_file:
+            return (
+                f"✓ {self.platform}: Dry run wrote {self.records_processed} payloads "
+                f"to {self.output_file}"
+            )
         if self.success:
-            return f"✓ {self.platform}: Successfully imported {self.records_processed} records"
+            upsert_counts = (
+                f", {self.records_updated} updated, {self.records_unchanged} unchanged"
+                if self.records_updated or self.records_unchanged
+                else ""
+            )
+            return (
+                f"✓ {self.platform}: Successfully imported {self.records_uploaded}/"
+                f"{self.records_processed} records ({self.records_retried} retried, "
+                f"{self.records_dead_lettered} dead-lettered{upsert_counts})"
+            )
         else:
             return f"✗ {self.platform}: Failed - {self.error_message}"
 
 
+@dataclass
+class ImportOptions:
+    """Tunable behaviour of an import run."""
+    
+    async_upload: bool = False
+    upload_workers: int = constants.NOTION_UPLOAD_WORKERS
+    rate_limit: float = constants.NOTION_RATE_LIMIT
+    dedup: bool = True
+    since: Optional[datetime] = None
+    resume: bool = False
+    upsert: bool = False
+    prefetch: bool = False
+    dry_run: bool = False
+    notion_base_url: Optional[str] = None
+    mail_since: Optional[date] = None
+    scan_mailbox: bool = False
+    mail_index: bool = True
+    mail_cache: bool = True
+    from_cache: bool = False
+    keep_artifacts: bool = False
+
+
 class BillImportService:
     """Service for orchestrating the complete bill import workflow.
     
@@ -48,25 +120,51 @@ class BillImportService:
     from email attachments and uploading them to Notion.
     """
     
-    def __init__(self, config: tuple, logger=None):
+    def __init__(
+        self,
+        config: tuple,
+        logger=None,
+        options: Optional[ImportOptions] = None,
+        paths: Optional[constants.DataPaths] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        imap_slots: Optional[threading.Semaphore] = None,
+    ):
         """Initialize the service with configuration.
         
         Args:
             config: Tuple of (username, password, imap_url, data_source_id, token)
             logger: Logger instance (will create one if not provided)
+            options: Import behaviour options (defaults to ImportOptions())
+            paths: Working directories (defaults to ``data/``)
+            rate_limiter: Notion rate limiter shared with other services using
+                the same token (optional, the service creates its own otherwise)
+            imap_slots: Semaphore capping the IMAP sessions open at once (optional)
         """
         self.username, self.password, self.imap_url, self.data_source_id, self.token = config
         self.logger = logger or get_logger()
+        self.options = options or ImportOptions()
+        self.paths = paths or constants.DEFAULT_PATHS
+        # One bucket for every upload of the service, so platforms imported
+        # concurrently stay within the integration's rate limit together
+        self.rate_limiter = rate_limiter or TokenBucket(self.options.rate_limit, constants.NOTION_RATE_BURST)
+        self.imap_slots = imap_slots
         
         # Ensure directories exist
-        constants.ensure_dirs()
+        self.paths.ensure()
+        
+        # Ledger of imported transactions and per-platform watermarks
+        self.ledger = TransactionLedger(self.paths.ledger_path)
+        
+        # Shared mailbox scan of the enclosing mail_session(), if any
+        self._mail_scanner: Optional[MailboxScanner] = None
     
     @classmethod
-    def from_env(cls, logger=None):
+    def from_env(cls, logger=None, options: Optional[ImportOptions] = None):
         """Create service instance from environment variables.
         
         Args:
             logger: Logger instance (optional)
+            options: Import behaviour options (optional)
             
         Returns:
             BillImportService instance
@@ -76,7 +174,7 @@ class BillImportService:
         """
         try:
             config = load_config()
-            return cls(config, logger)
+            return cls(config, logger, options)
         except Exception as e:
             raise ConfigurationError(f"Failed to load configuration: {e}") from e
     
@@ -90,32 +188,245 @@ class BillImportService:
             ImportResult with operation status and details
         """
         self.logger.info(f"Starting bill import for platform: {platform}")
+        dry_run = self.options.dry_run
+        stats = StageStats()
         
         try:
             # 1. Prepare adapter
             adapter = self._prepare_adapter(platform)
             
-            # 2. Fetch from email
-            password, attachment_downloaded = self._fetch_from_email(adapter)
+            checkpoint = self._upload_checkpoint(adapter)
+            resumed = self._load_resumable_checkpoint(checkpoint, adapter) if self.options.resume else None
+            
+            if resumed is not None:
+                # 2-3. The bill archive of the interrupted run is unchanged: skip email
+                resumed, bill = resumed
+                since = self.options.since or resumed.since
+            else:
+                # 2. Fetch from email
+                with stats.stage("email"):
+                    password, attachment_downloaded = self._fetch_from_email(adapter)
+                
+                # 3. Process bill file
+                with stats.stage("extract"):
+                    bill = self._process_bill_file(password, platform, adapter)
+                since = self._resolve_since(adapter)
+                if not dry_run:
+                    checkpoint.start(bill.archive, file_sha256(bill.archive), since)
+            
+            # 4. Process data newer than the platform's watermark
+            with stats.stage("process") as stage:
+                processed_data = self._process_data(bill, adapter, since)
+                stage.rows = len(processed_data)
+            
+            # 5-6. Skip rows imported before, then upload the rest
+            return self._import_processed(processed_data, adapter, stats, checkpoint, resumed)
             
-            # 3. Process bill file
-            csv_file = self._process_bill_file(password, platform, adapter)
+        except Exception as e:
+            self.logger.exception(f"Failed to import bills for {platform}: {e}")
+            return ImportResult(
+                success=False,
+                platform=platform,
+                error_message=str(e)
+            )
+    
+    def backfill(
+        self,
+        platform: str,
+        passwords: Sequence[str] = (),
+        processes: Optional[int] = None,
+    ) -> ImportResult:
+        """Import every bill archive of a platform in the attachment directory at once.
+        
+        The archives are decrypted and parsed in a process pool, their rows
+        merged and deduplicated by transaction number, and the result goes
+        through the ledger check and upload as one import. No mail is read:
+        each archive is opened with the first password that fits, trying
+        ``passwords`` and then those of the cached password mails. The
+        watermark is ignored, since older exports are behind it; the ``since``
+        option still applies.
+        
+        Args:
+            platform: Payment platform ('alipay' or 'wechatpay')
+            passwords: Archive passwords to try before the cached ones
+            processes: Worker processes (defaults to the number of CPUs)
+            
+        Returns:
+            ImportResult with operation status and details
+        """
+        self.logger.info(f"Starting backfill for platform: {platform}")
+        stats = StageStats()
+        
+        try:
+            adapter = self._prepare_adapter(platform)
+            archives = FileExtractor(self.paths.attachment_dir, adapter).archives()
+            if not archives:
+                raise ExtractionError(f"No {platform} bill archives found in {self.paths.attachment_dir}")
+            candidates = list(dict.fromkeys([*passwords, *self._cached_passwords(adapter)])) or [None]
+            self.logger.info(
+                f"Backfilling {len(archives)} archives with {len(candidates)} candidate passwords"
+            )
             
-            # 4. Process data
-            processed_data = self._process_data(csv_file, adapter)
+            # 1. Decrypt and parse every archive in parallel
+            with stats.stage("process") as stage:
+                frames = []
+                for result in read_archives(archives, platform, candidates, self.options.since, processes):
+                    if result.error:
+                        self.logger.error(f"Skipping {result.archive.name}: {result.error}")
+                        continue
+                    self.logger.info(f"Read {len(result.data)} rows from {result.archive.name} in {result.seconds:.2f}s")
+                    frames.append(result.data)
+                if not frames:
+                    raise ExtractionError(f"None of the {len(archives)} archives could be read")
+                processed_data = self._merge_bills(frames, adapter)
+                stage.rows = len(processed_data)
             
-            # 5. Upload to Notion
-            records_count = self._upload_to_notion(processed_data, adapter)
+            # 2-3. Skip rows imported before, then upload the rest
+            return self._import_processed(processed_data, adapter, stats)
             
-            self.logger.info(f"Successfully completed bill import for {platform}")
+        except Exception as e:
+            self.logger.exception(f"Failed to backfill bills for {platform}: {e}")
             return ImportResult(
-                success=True,
+                success=False,
                 platform=platform,
-                records_processed=records_count
+                error_message=str(e)
             )
+    
+    def _import_processed(
+        self,
+        processed_data,
+        adapter: PaymentAdapter,
+        stats: StageStats,
+        checkpoint: Optional[UploadCheckpoint] = None,
+        resumed: Optional[CheckpointState] = None,
+    ) -> ImportResult:
+        """Drop the rows imported before and upload the rest (or write them, in a dry run)."""
+        platform = adapter.platform_name
+        dry_run = self.options.dry_run
+        
+        # Drop rows that were imported by an earlier (or the interrupted) run
+        with stats.stage("dedup") as stage:
+            existing = None if dry_run else self._prefetch_existing(processed_data, adapter)
+            new_data = self._drop_imported(processed_data, adapter, existing)
+            if resumed is not None:
+                new_data = self._drop_checkpointed(new_data, adapter, resumed)
+            stage.rows = len(new_data)
+        
+        if dry_run:
+            # Write the payloads to a file instead of uploading them
+            with stats.stage("payloads") as stage:
+                result = self._write_payload_file(new_data, adapter)
+                stage.rows = result.records_processed
+            self._log_stats(stats)
+            return result
+        
+        # Upload to Notion
+        with stats.stage("upload") as stage:
+            report = self._upload_to_notion(new_data, adapter, checkpoint, existing)
+            stage.rows = report.processed
+        self._advance_watermark(processed_data, adapter)
+        if checkpoint is not None:
+            checkpoint.clear()
+        
+        self._log_stats(stats)
+        self.logger.info(f"Successfully completed bill import for {platform}")
+        return ImportResult.from_report(platform, report)
+    
+    def replay_dead_letters(self, platform: str) -> ImportResult:
+        """Re-send only the rows recorded in the platform's dead-letter file.
+        
+        Rows that fail again are written back to a fresh dead-letter file.
+        
+        Args:
+            platform: Payment platform ('alipay' or 'wechatpay')
+            
+        Returns:
+            ImportResult with operation status and details
+        """
+        self.logger.info(f"Replaying dead-lettered pages for platform: {platform}")
+        
+        try:
+            adapter = self._prepare_adapter(platform)
+            dead_letters = self._dead_letter_queue(adapter)
+            records = dead_letters.claim()
+            if self.options.dedup:
+                # Updates (with a page_id) always have their key in the ledger: only
+                # creates that went through since being dead-lettered are dropped
+                imported = self.ledger.imported_keys(platform)
+                records = [
+                    record for record in records
+                    if record.get("page_id") or NotionClient.transaction_key(record["properties"]) not in imported
+                ]
+            if not records:
+                self.logger.info(f"No dead-lettered pages for {platform}")
+                return ImportResult(success=True, platform=platform)
+            
+            self.logger.info(f"Replaying {len(records)} dead-lettered pages...")
+            notion_client = self._notion_client(adapter)
+            uploader = self._create_uploader(notion_client, dead_letters)
+            try:
+                report = uploader.run(
+                    UploadJob(row, record["properties"], page_id=record.get("page_id"))
+                    for row, record in enumerate(records)
+                )
+            except Exception as e:
+                raise NotionUploadError(f"Failed to replay dead-lettered pages: {e}") from e
+            dead_letters.release_claim()
+            return ImportResult.from_report(platform, report)
             
         except Exception as e:
-            self.logger.exception(f"Failed to import bills for {platform}: {e}")
+            self.logger.exception(f"Failed to replay dead-lettered pages for {platform}: {e}")
+            return ImportResult(
+                success=False,
+                platform=platform,
+                error_message=str(e)
+            )
+    
+    def push_payload_file(self, path: str | Path) -> ImportResult:
+        """Upload the payloads written by an earlier dry run.
+        
+        The file is streamed, so it is never held in memory as a whole.
+        Successful rows are recorded in the ledger exactly like a normal
+        import; rows already in the ledger are skipped unless dedup is off.
+        
+        Args:
+            path: Payload file written by ``import_bill`` with the dry_run option
+            
+        Returns:
+            ImportResult with operation status and details
+        """
+        path = Path(path)
+        self.logger.info(f"Pushing payloads from {path}")
+        platform = path.name
+        
+        try:
+            records = iter(PayloadFile(path))
+            first = next(records, None)
+            if first is None:
+                self.logger.info(f"No payloads in {path}")
+                return ImportResult(success=True, platform=platform)
+            platform = first["platform"]
+            adapter = self._prepare_adapter(platform)
+            
+            payloads = (
+                (record["row"], record["properties"]) for record in chain([first], records)
+            )
+            if self.options.dedup and not self.options.upsert:
+                # The ledger may have moved on since the dry run
+                imported = self.ledger.imported_keys(platform)
+                payloads = (
+                    (row, properties) for row, properties in payloads
+                    if NotionClient.transaction_key(properties) not in imported
+                )
+            stats = StageStats()
+            with stats.stage("upload") as stage:
+                report = self._upload_payloads(payloads, adapter)
+                stage.rows = report.processed
+            self._log_stats(stats)
+            return ImportResult.from_report(platform, report)
+            
+        except Exception as e:
+            self.logger.exception(f"Failed to push payloads from {path}: {e}")
             return ImportResult(
                 success=False,
                 platform=platform,
@@ -136,9 +447,115 @@ class BillImportService:
         self.logger.info(f"Created adapter for {adapter.get_notion_display_name()}")
         return adapter
     
+    @contextmanager
+    def mail_session(self, platforms, mail_client: Optional[MailClient] = None):
+        """Scan the mailbox once for several platforms.
+        
+        ``import_bill`` calls made inside the block take their password and
+        bill mail from this scan instead of opening their own session, so
+        connecting, searching and scanning happen once per run however many
+        platforms are imported. If the scan fails, each platform falls back
+        to its own session and reports its own error.
+        
+        When the session is the block's own, the bill mails are downloaded
+        one after another in the background while the block runs: a platform
+        uploads as soon as its own bill is in, and the session is logged out
+        after the last download, so its IMAP slot is not held while the
+        remaining bills are uploaded.
+        
+        Args:
+            platforms: Platform names that will be imported in the block
+            mail_client: Connected client to scan with (optional); it is left
+                logged in when the block ends
+        """
+        scanner = None
+        if self.options.from_cache:
+            # Nothing to scan: every platform reads the mail cache
+            yield None
+            return
+        try:
+            scanner = self._scan_mailbox(
+                [AdapterFactory.create(platform) for platform in platforms], mail_client
+            )
+        except Exception as e:
+            self.logger.warning(f"Shared mailbox scan failed, platforms will connect on their own: {e}")
+        if scanner is not None and mail_client is None:
+            # Download the bills in the background, in platform order, and free
+            # the IMAP session (and its slot) once the last one is in
+            scanner.start_downloads()
+        self._mail_scanner = scanner
+        try:
+            yield scanner
+        finally:
+            self._mail_scanner = None
+            if scanner is not None:
+                scanner.close(logout=mail_client is None)
+    
+    def connect_mail(self) -> MailClient:
+        """Log in to the mail server and select the inbox.
+        
+        Raises:
+            ConfigurationError: If the mail server cannot be reached
+        """
+        self.logger.info("Connecting to email server...")
+        
+        email_client = MailClient(
+            self.username,
+            self.password,
+            self.imap_url,
+            attachment_dir=str(self.paths.attachment_dir),
+        )
+        email_client.connection_slots = self.imap_slots
+        if self.options.mail_cache:
+            email_client.cache = MailCache(self.paths.mail_cache_dir)
+        
+        try:
+            email_client.connect()
+        except Exception as e:
+            raise ConfigurationError(f"Failed to connect to email server: {e}") from e
+        return email_client
+    
+    def _scan_mailbox(self, adapters, email_client: Optional[MailClient] = None) -> MailboxScanner:
+        """Find the password and bill mails of ``adapters``.
+        
+        Args:
+            adapters: Adapters of the platforms to look for
+            email_client: Connected client to use (optional, connects a new one otherwise)
+        
+        Raises:
+            ConfigurationError: If the mail server cannot be reached
+        """
+        owned = email_client is None
+        if owned:
+            email_client = self.connect_mail()
+        
+        # Only the mails matching the adapters' criteria are fetched
+        mail_since = self.options.mail_since
+        if mail_since is None:
+            self.logger.info("Searching for password and bill emails in the whole mailbox...")
+        else:
+            self.logger.info(f"Searching for password and bill emails since {mail_since}...")
+        
+        scanner = MailboxScanner(
+            email_client,
+            adapters,
+            mail_since,
+            self.options.scan_mailbox,
+            index=MailIndex(self.paths.mail_index_path) if self.options.mail_index else None,
+        )
+        try:
+            scanner.scan()
+            scanner.cache_passwords()
+        except Exception:
+            scanner.close(logout=owned)
+            raise
+        return scanner
+    
     def _fetch_from_email(self, adapter: PaymentAdapter) -> Tuple[str, bool]:
         """Fetch password and bill attachment from email.
         
+        Uses the scan of the enclosing ``mail_session`` when there is one.
+        
         Args:
             adapter: Payment platform adapter
             
@@ -149,56 +566,89 @@ class BillImportService:
             PasswordNotFoundError: If password email not found
             AttachmentNotFoundError: If bill attachment not found
         """
-        self.logger.info("Connecting to email server...")
+        if self.options.from_cache:
+            return self._fetch_from_cache(adapter)
+        
+        platform = adapter.platform_name
+        scanner = self._mail_scanner
+        owned = scanner is None or platform not in scanner.adapters
+        if owned:
+            scanner = self._scan_mailbox([adapter])
+        
+        # Mails older than --mail-since were not searched at all
+        window = "" if scanner.since is None else (
+            f" (only mails since {scanner.since} were searched, pass an earlier --mail-since to look further back)"
+        )
+        try:
+            mail = scanner.results[platform]
+            if not mail.password:
+                raise PasswordNotFoundError(
+                    f"Password email not found for {platform}{window}. "
+                    f"Please send password email to yourself with subject: "
+                    f"{adapter.get_password_subject()}XXXXXX"
+                )
+            
+            # Only the matching bill mail is downloaded in full
+            self.logger.info("Downloading bill attachment email...")
+            attachment_found = scanner.download_bill(platform)
+            if not attachment_found:
+                raise AttachmentNotFoundError(
+                    f"Bill attachment email from {adapter.get_email_sender()} "
+                    f"not found for {platform}{window}"
+                )
+            return mail.password, attachment_found
+        finally:
+            if owned:
+                scanner.close()
+    
+    def _fetch_from_cache(self, adapter: PaymentAdapter) -> Tuple[str, bool]:
+        """Restore the newest cached bill mail of a platform without connecting to IMAP.
+        
+        Attachments are written from the cached mail; files that were
+        downloaded from a WeChat link are written from their cached copy.
         
+        Args:
+            adapter: Payment platform adapter
+            
+        Returns:
+            Tuple of (password, attachment_restored_flag)
+            
+        Raises:
+            PasswordNotFoundError: If no password mail is cached for the bill
+            AttachmentNotFoundError: If no bill mail is cached
+        """
+        platform = adapter.platform_name
+        cache = MailCache(self.paths.mail_cache_dir)
+        bill = cache.latest_bill(platform)
+        if bill is None:
+            raise AttachmentNotFoundError(f"No cached bill email for {platform} in {cache.root}")
+        password_entry = cache.password_for(platform, bill)
+        password = adapter.parse_password_subject(password_entry["subject"]) if password_entry else None
+        if not password:
+            raise PasswordNotFoundError(f"No cached password email for {platform} in {cache.root}")
+        
+        self.logger.info(f"Restoring cached bill email from {bill['date']}: {bill['subject']}")
         email_client = MailClient(
             self.username,
             self.password,
             self.imap_url,
             adapter,
-            attachment_dir=str(constants.ATTACHMENT_DIR),
+            attachment_dir=str(self.paths.attachment_dir),
         )
-        
-        try:
-            email_client.connect()
-            email_client.fetch_mail()
-        except Exception as e:
-            raise ConfigurationError(f"Failed to connect to email server: {e}") from e
-        
-        # Find password email
-        self.logger.info("Searching for password email...")
-        password_found = False
-        for num in reversed(email_client.email_list):
-            email_client.get_mail_info(num)
-            if email_client.get_passwd():
-                password_found = True
-                break
-        
-        if not password_found or not email_client.paswd:
-            raise PasswordNotFoundError(
-                f"Password email not found for {adapter.platform_name}. "
-                f"Please send password email to yourself with subject: "
-                f"{adapter.platform_name}解压密码XXXXXX"
-            )
-        
-        # Find bill attachment email
-        self.logger.info("Searching for bill attachment email...")
-        attachment_found = False
-        for num in reversed(email_client.email_list):
-            email_client.get_mail_info(num)
-            if email_client.fetch_mail_attachment():
-                attachment_found = True
-                break
-        
+        email_client.cache = cache
+        email_client.offline = True
+        email_client.load_message(cache.read(bill))
+        attachment_found = bool(email_client.fetch_mail_attachment())
         if not attachment_found:
-            raise AttachmentNotFoundError(
-                f"Bill attachment email not found for {adapter.platform_name}"
-            )
-        
-        return email_client.paswd, attachment_found
+            raise AttachmentNotFoundError(f"Cached bill email for {platform} is not from {adapter.get_email_sender()}")
+        return password, attachment_found
     
-    def _process_bill_file(self, password: str, platform: str, adapter: PaymentAdapter) -> Path:
-        """Extract and process the bill file.
+    def _process_bill_file(self, password: str, platform: str, adapter: PaymentAdapter) -> BillReader:
+        """Locate the bill archive and check that the password opens it.
+        
+        Nothing is extracted: the bill is streamed from the archive when the
+        data is processed. With the keep_artifacts option the extracted bill
+        and the standard CSV are also written to ``raw/csv`` and ``processed``.
         
         Args:
             password: Extraction password
@@ -206,61 +656,130 @@ class BillImportService:
             adapter: Payment platform adapter
             
         Returns:
-            Path to processed CSV file
+            BillReader of the newest archive of the platform
             
         Raises:
-            ExtractionError: If file extraction fails
+            ExtractionError: If there is no archive or it cannot be opened
         """
-        self.logger.info("Extracting bill file...")
+        self.logger.info("Locating bill archive...")
         
-        extractor = FileExtractor(
-            str(constants.ATTACHMENT_DIR),
-            str(constants.BILL_RAW_DIR),
+        extractor = FileExtractor(self.paths.attachment_dir, adapter)
+        
+        try:
+            archive = extractor.search_files()
+        except ValueError as e:
+            raise ExtractionError(str(e)) from e
+        return self._bill_reader(archive, password, adapter)
+    
+    def _bill_reader(self, archive: Path, password: Optional[str], adapter: PaymentAdapter) -> BillReader:
+        """Create the reader of a bill archive, failing early on a wrong password."""
+        keep = self.options.keep_artifacts
+        reader = BillReader(
+            archive,
             password,
-            platform
+            adapter,
+            keep_dir=self.paths.bill_raw_dir if keep else None,
+            standard_csv=(
+                self.paths.processed_dir / constants.STD_FILENAME_TEMPLATE.format(platform=adapter.platform_name)
+                if keep else None
+            ),
         )
-        
         try:
-            files = extractor.search_files()
-            result = extractor.unzip_earliest_file(files)
-            if "No zip files" in result:
-                raise ExtractionError(result)
+            reader.verify()
         except Exception as e:
-            raise ExtractionError(f"Failed to extract bill file: {e}") from e
-        
-        self.logger.info("Moving and processing bill file...")
-        
-        mover = FileMover(
-            str(constants.BILL_RAW_DIR),
-            str(constants.PROCESSED_DIR),
-            adapter
+            raise ExtractionError(f"Failed to open bill archive {archive}: {e}") from e
+        return reader
+    
+    def _upload_checkpoint(self, adapter: PaymentAdapter) -> UploadCheckpoint:
+        """Return the upload checkpoint of a platform."""
+        path = self.paths.checkpoint_dir / constants.CHECKPOINT_FILENAME_TEMPLATE.format(
+            platform=adapter.platform_name
         )
+        return UploadCheckpoint(path)
+    
+    def _load_resumable_checkpoint(
+        self, checkpoint: UploadCheckpoint, adapter: PaymentAdapter
+    ) -> Optional[Tuple[CheckpointState, BillReader]]:
+        """Return the checkpoint state and a reader of its bill archive, if it can be resumed.
         
-        try:
-            mover.copy_file()
-        except Exception as e:
-            raise ExtractionError(f"Failed to move bill file: {e}") from e
+        The archive must still exist unchanged, and its password is taken from
+        the mail cache, since the resumed run does not read any mail.
+        """
+        state = checkpoint.load()
+        if state is None:
+            self.logger.info("No checkpoint to resume from, running a full import")
+            return None
         
-        self.logger.info("Transforming CSV to standard format...")
+        source_file = Path(state.source_file)
+        if not source_file.exists() or file_sha256(source_file) != state.source_sha256:
+            self.logger.warning(
+                f"Checkpointed file {source_file} is missing or has changed, running a full import"
+            )
+            return None
         
-        # Construct paths for raw and standard CSV files
-        raw_csv_path = constants.PROCESSED_DIR / f"{constants.RAW_FILENAME_PREFIX[adapter.platform_name]}.csv"
-        std_csv_path = constants.PROCESSED_DIR / constants.STD_FILENAME_TEMPLATE.format(platform=adapter.platform_name)
+        password = self._cached_password(adapter)
+        if password is None:
+            self.logger.warning(
+                f"No cached password email for {adapter.platform_name} to reopen {source_file}, "
+                f"running a full import"
+            )
+            return None
         
-        transformer = CsvTransformer(adapter, raw_csv_path, std_csv_path)
-        try:
-            transformer.transform_to_standard_csv()
-        except Exception as e:
-            raise DataProcessingError(f"Failed to transform CSV: {e}") from e
+        self.logger.info(
+            f"Resuming upload started at {state.started_at}: "
+            f"{len(state.completed_rows)} rows already uploaded (cursor {state.cursor})"
+        )
+        return state, self._bill_reader(source_file, password, adapter)
+    
+    def _cached_passwords(self, adapter: PaymentAdapter) -> List[str]:
+        """Return the passwords of all cached password mails of a platform, newest first."""
+        cache = MailCache(self.paths.mail_cache_dir)
+        entries = reversed(cache.entries("password", adapter.platform_name))
+        passwords = (adapter.parse_password_subject(entry["subject"]) for entry in entries)
+        return list(dict.fromkeys(password for password in passwords if password))
+    
+    def _cached_password(self, adapter: PaymentAdapter) -> Optional[str]:
+        """Return the password of the newest cached bill mail of a platform."""
+        cache = MailCache(self.paths.mail_cache_dir)
+        bill = cache.latest_bill(adapter.platform_name)
+        entry = cache.password_for(adapter.platform_name, bill) if bill else None
+        return adapter.parse_password_subject(entry["subject"]) if entry else None
+    
+    def _resolve_since(self, adapter: PaymentAdapter) -> Optional[datetime]:
+        """Return the time from which rows are imported.
+        
+        An explicit ``since`` option (backfill) wins over the stored watermark.
+        """
+        if self.options.since is not None:
+            self.logger.info(f"Importing records since {self.options.since} (explicit --since)")
+            return self.options.since
+        if self.options.upsert:
+            # Refunds and status changes touch rows older than the watermark
+            self.logger.info("Upsert mode: re-syncing every record of the bill")
+            return None
+        watermark = self.ledger.watermark(adapter.platform_name)
+        if watermark is not None:
+            self.logger.info(f"Importing records since watermark {watermark}")
+        return watermark
+    
+    def _advance_watermark(self, data, adapter: PaymentAdapter):
+        """Move the platform's watermark to the latest transaction of a completed import.
         
-        return std_csv_path
+        Rows that ended up in the dead-letter file are covered by replay, so
+        they do not hold the watermark back.
+        """
+        latest = DataProcessor.latest_transaction_time(data, adapter)
+        if latest is not None:
+            self.ledger.advance_watermark(adapter.platform_name, latest)
+            self.logger.info(f"Watermark for {adapter.platform_name} advanced to {latest}")
     
-    def _process_data(self, csv_file: str, adapter: PaymentAdapter):
+    def _process_data(self, bill: BillReader, adapter: PaymentAdapter, since: Optional[datetime] = None):
         """Process and validate bill data.
         
         Args:
-            csv_file: Path to CSV file
+            bill: Reader of the bill archive
             adapter: Payment platform adapter
+            since: Drop rows older than this time before any processing (optional)
             
         Returns:
             Processed DataFrame
@@ -271,30 +790,316 @@ class BillImportService:
         self.logger.info("Processing data fields...")
         
         try:
-            processor = DataProcessor(csv_file, adapter)
+            processor = DataProcessor(bill, adapter)
+            if since is not None:
+                processor.filter_since(since)
             processor.process_mandatory_fields()
             return processor.get_processed_data()
         except Exception as e:
             raise DataProcessingError(f"Failed to process data: {e}") from e
     
-    def _upload_to_notion(self, data, adapter: PaymentAdapter) -> int:
+    def _prefetch_existing(self, data, adapter: PaymentAdapter) -> Optional[Dict[str, Dict[str, str]]]:
+        """Fetch the pages already in Notion for the bill's date range.
+        
+        Runs when requested, or automatically when the ledger knows nothing about
+        the platform (a fresh machine, or a data source shared between devices).
+        One paginated query returns 100 pages per call.
+        
+        The pages are only used for this run and are not written to the ledger:
+        the query returns no property hashes, and a ledger row without them
+        would make every later upsert rewrite the whole page. Pages uploaded or
+        updated by this run are recorded with their hashes as usual.
+        
+        Args:
+            data: Processed DataFrame
+            adapter: Payment platform adapter
+            
+        Returns:
+            ``{transaction_key: {"page_id": ..., "date": ...}}`` of the bill's date
+            range, or None if the data source was not queried
+            
+        Raises:
+            NotionUploadError: If the data source cannot be queried
+        """
+        if data.empty:
+            return None
+        if not self.options.prefetch and self.ledger.count(adapter.platform_name):
+            return None
+        
+        # One day of margin on each side absorbs time zone differences in Notion's date filter
+        earliest, latest = DataProcessor.transaction_time_range(data, adapter)
+        if latest is None:
+            return None
+        start_date = (earliest - timedelta(days=1)).strftime("%Y-%m-%d")
+        end_date = (latest + timedelta(days=1)).strftime("%Y-%m-%d")
+        self.logger.info(f"Fetching existing pages from Notion between {start_date} and {end_date}...")
+        
+        try:
+            notion_client = self._notion_client(adapter)
+            return notion_client.fetch_existing_transactions(
+                start_date,
+                end_date,
+                rate_limiter=self.rate_limiter,
+            )
+        except Exception as e:
+            raise NotionUploadError(f"Failed to query existing pages: {e}") from e
+    
+    def _drop_imported(self, data, adapter: PaymentAdapter, existing: Optional[Dict[str, Dict[str, str]]] = None):
+        """Remove rows whose transaction is already recorded in the ledger or found in Notion.
+        
+        Args:
+            data: Processed DataFrame
+            adapter: Payment platform adapter
+            existing: Pages fetched from Notion by ``_prefetch_existing`` (optional)
+            
+        Returns:
+            DataFrame containing only rows that still need uploading
+        """
+        if not self.options.dedup or self.options.upsert or data.empty:
+            return data
+        
+        keys = self._transaction_keys(data, adapter)
+        known = self.ledger.imported_keys(adapter.platform_name) | set(existing or ())
+        imported = keys.isin(known) & (keys != "")
+        skipped = int(imported.sum())
+        if skipped:
+            self.logger.info(f"Skipping {skipped} records already imported (ledger: {self.ledger.path})")
+        return data[~imported]
+    
+    def _drop_checkpointed(self, data, adapter: PaymentAdapter, state: CheckpointState):
+        """Remove rows that the interrupted upload already completed."""
+        if data.empty:
+            return data
+        
+        keys = self._transaction_keys(data, adapter)
+        done = data.index.isin(list(state.completed_rows)) | (
+            keys.isin(state.completed_keys) & (keys != "")
+        )
+        self.logger.info(f"Skipping {int(done.sum())} records completed before the interruption")
+        return data[~done]
+    
+    def _merge_bills(self, frames, adapter: PaymentAdapter):
+        """Concatenate the rows of several bills, oldest bill first.
+        
+        A transaction found in more than one bill keeps the row of the newest
+        one, which has its latest status (e.g. a refund). Rows without a
+        transaction number are all kept.
+        """
+        data = pd.concat(frames, ignore_index=True)
+        keys = self._transaction_keys(data, adapter)
+        duplicate = keys.duplicated(keep="last") & (keys != "")
+        if duplicate.any():
+            self.logger.info(f"Dropping {int(duplicate.sum())} records found in more than one bill")
+        return data[~duplicate].reset_index(drop=True)
+    
+    @staticmethod
+    def _transaction_keys(data, adapter: PaymentAdapter):
+        """Return the transaction number of each row, falling back to the merchant order number."""
+        col_map = adapter.get_csv_column_mapping()
+        transaction_ids = data[col_map['transaction_id']].astype(str).str.strip()
+        merchant_ids = data[col_map['merchant_order_id']].astype(str).str.strip()
+        return transaction_ids.where(transaction_ids != "", merchant_ids)
+    
+    def _record_uploaded(self, adapter: PaymentAdapter, checkpoint: Optional[UploadCheckpoint] = None):
+        """Return an upload callback that writes successful rows to the ledger and checkpoint."""
+        platform = adapter.platform_name
+        
+        def record(job, page_id):
+            key = NotionClient.transaction_key(job.properties)
+            self.ledger.record(
+                platform,
+                key,
+                page_id,
+                NotionClient.transaction_time(job.properties),
+                NotionClient.property_hashes(job.properties),
+            )
+            if checkpoint is not None:
+                checkpoint.mark_done(job.row, key)
+        
+        return record
+    
+    def _upsert_jobs(
+        self,
+        payloads,
+        adapter: PaymentAdapter,
+        report: UploadReport,
+        existing: Optional[Dict[str, Dict[str, str]]] = None,
+    ):
+        """Turn payloads into create/update jobs, skipping rows whose page is up to date.
+        
+        The page of a transaction comes from the ledger; the properties that
+        changed are found by comparing per-property hashes with those stored
+        at the last upload. Transactions missing from the ledger are taken from
+        the prefetched pages if the data source was queried, and looked up in
+        the data source one by one otherwise.
+        
+        Args:
+            payloads: Iterable of (row, properties) pairs
+            adapter: Payment platform adapter
+            report: Report whose ``unchanged`` count is incremented for skipped rows
+            existing: Pages fetched from Notion by ``_prefetch_existing`` (optional)
+            
+        Yields:
+            UploadJob for every row that needs an API call
+        """
+        index = self.ledger.page_index(adapter.platform_name)
+        for row, properties in payloads:
+            key = NotionClient.transaction_key(properties)
+            entry = index.get(key) if key else None
+            if entry is None and existing is not None:
+                page = existing.get(key) if key else None
+                if page is None:
+                    yield UploadJob(row, properties)
+                else:
+                    # No hashes for a page fetched from Notion: rewrite it all once
+                    yield UploadJob(row, properties, page_id=page["page_id"])
+                continue
+            if entry is None:
+                yield UploadJob(row, properties, lookup_key=key or None)
+                continue
+            
+            page_id, stored_hashes = entry
+            changes = None
+            if stored_hashes is not None:
+                hashes = NotionClient.property_hashes(properties)
+                changes = {
+                    name: value for name, value in properties.items()
+                    if stored_hashes.get(name) != hashes[name]
+                }
+                if not changes:
+                    report.unchanged += 1
+                    continue
+            yield UploadJob(row, properties, page_id=page_id, changes=changes)
+    
+    def _notion_client(self, adapter: PaymentAdapter) -> NotionClient:
+        """Create a Notion client for a platform, honouring the base URL option."""
+        return NotionClient(
+            self.data_source_id, self.token, adapter, base_url=self.options.notion_base_url
+        )
+    
+    def _dead_letter_queue(self, adapter: PaymentAdapter) -> DeadLetterQueue:
+        """Return the dead-letter queue of a platform."""
+        path = self.paths.dead_letter_dir / constants.DEAD_LETTER_FILENAME_TEMPLATE.format(
+            platform=adapter.platform_name
+        )
+        return DeadLetterQueue(path, adapter.platform_name)
+    
+    def _create_uploader(
+        self,
+        notion_client: NotionClient,
+        dead_letters: DeadLetterQueue,
+        checkpoint: Optional[UploadCheckpoint] = None,
+    ) -> NotionUploader:
+        """Create an uploader configured from the service options."""
+        return NotionUploader(
+            notion_client,
+            async_mode=self.options.async_upload,
+            workers=self.options.upload_workers,
+            rate_limiter=self.rate_limiter,
+            dead_letters=dead_letters,
+            on_uploaded=self._record_uploaded(notion_client.adapter, checkpoint),
+        )
+    
+    def _upload_to_notion(
+        self,
+        data,
+        adapter: PaymentAdapter,
+        checkpoint: Optional[UploadCheckpoint] = None,
+        existing: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> UploadReport:
         """Upload processed data to Notion.
         
         Args:
             data: Processed DataFrame
             adapter: Payment platform adapter
+            checkpoint: Checkpoint recording each uploaded row (optional)
+            existing: Every page of the bill's date range, fetched from Notion,
+                so upserts need no per-row lookup (optional)
             
         Returns:
-            Number of records uploaded
+            UploadReport with uploaded, retried and dead-lettered counts
             
         Raises:
             NotionUploadError: If upload fails
         """
         self.logger.info("Uploading to Notion...")
+        notion_client = self._notion_client(adapter)
+        try:
+            notion_client.detect_status_property(rate_limiter=self.rate_limiter)
+        except Exception as e:
+            raise NotionUploadError(f"Failed to retrieve the data source schema: {e}") from e
+        payloads = notion_client.build_payloads(data)
+        return self._upload_payloads(payloads, adapter, checkpoint, existing)
+    
+    def _upload_payloads(
+        self,
+        payloads,
+        adapter: PaymentAdapter,
+        checkpoint: Optional[UploadCheckpoint] = None,
+        existing: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> UploadReport:
+        """Upload (row, properties) pairs to Notion.
         
+        Args:
+            payloads: Iterable of (row, properties) pairs
+            adapter: Payment platform adapter
+            checkpoint: Checkpoint recording each uploaded row (optional)
+            existing: Pages fetched from Notion by ``_prefetch_existing`` (optional)
+            
+        Returns:
+            UploadReport with uploaded, retried and dead-lettered counts
+            
+        Raises:
+            NotionUploadError: If upload fails
+        """
         try:
-            notion_client = NotionClient(self.data_source_id, self.token, adapter)
-            data.apply(notion_client.process_row, axis=1)
-            return len(data)
+            notion_client = self._notion_client(adapter)
+            uploader = self._create_uploader(
+                notion_client, self._dead_letter_queue(adapter), checkpoint
+            )
+            report = UploadReport()
+            if self.options.upsert:
+                jobs = self._upsert_jobs(payloads, adapter, report, existing)
+            else:
+                jobs = (UploadJob(index, properties) for index, properties in payloads)
+            return uploader.run(jobs, report)
         except Exception as e:
             raise NotionUploadError(f"Failed to upload to Notion: {e}") from e
+    
+    def _write_payload_file(self, data, adapter: PaymentAdapter) -> ImportResult:
+        """Write the payloads of processed data to a compressed NDJSON file.
+        
+        Args:
+            data: Processed DataFrame
+            adapter: Payment platform adapter
+            
+        Returns:
+            ImportResult whose ``output_file`` is the written file
+            
+        Raises:
+            DataProcessingError: If the payloads cannot be built or written
+        """
+        path = self.paths.dry_run_dir / constants.DRY_RUN_FILENAME_TEMPLATE.format(
+            platform=adapter.platform_name,
+            timestamp=datetime.now().strftime("%Y%m%d_%H%M%S"),
+        )
+        self.logger.info(f"Dry run: writing payloads to {path}")
+        
+        try:
+            payloads = self._notion_client(adapter).build_payloads(data)
+            count = PayloadFile(path).write(adapter.platform_name, payloads)
+        except Exception as e:
+            raise DataProcessingError(f"Failed to write payload file: {e}") from e
+        
+        return ImportResult(
+            success=True,
+            platform=adapter.platform_name,
+            records_processed=count,
+            output_file=str(path),
+        )
+    
+    def _log_stats(self, stats: StageStats):
+        """Log the time and throughput of each stage of a run."""
+        self.logger.info("Stage timings:")
+        for line in stats.summary():
+            self.logger.info(f"  {line}")
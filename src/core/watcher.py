@@ -0,0 +1,111 @@
+"""Watch mode: import bills as soon as their mails arrive."""
+
+import imaplib
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.config import constants
+from src.core.exceptions import ConfigurationError
+from src.core.service import BillImportService, ImportResult
+from src.email_client.client import MailClient
+from src.utils.logger import get_logger
+
+# Errors after which the IMAP connection is dropped and opened again
+_CONNECTION_ERRORS = (imaplib.IMAP4.error, OSError, ConfigurationError)
+
+
+class MailWatcher:
+    """Keep one IMAP session open and import a platform when its bill is ready.
+
+    The watcher waits for new mail with IDLE (or NOOP polling), scans the
+    mailbox on the same connection, and calls ``import_bill`` for every
+    platform whose newest password mail is newer than its newest bill mail,
+    i.e. the user has sent the password for that bill. Each (password, bill)
+    pair is imported once; a failed import is tried again on the next mail.
+
+    The first scan after start-up imports the pairs already in the mailbox;
+    rows imported before are skipped by the ledger as usual.
+    """
+
+    def __init__(
+        self,
+        service: BillImportService,
+        platforms: Sequence[str],
+        idle_timeout: float = constants.MAIL_IDLE_TIMEOUT,
+        poll_interval: float = constants.MAIL_POLL_INTERVAL,
+    ):
+        """Initialize the watcher.
+
+        Args:
+            service: Service that imports the bills
+            platforms: Platform names to watch
+            idle_timeout: Seconds before IDLE is renewed
+            poll_interval: Seconds between NOOPs on servers without IDLE
+        """
+        self.service = service
+        self.platforms = list(platforms)
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self._imported: Dict[str, Tuple[int, int]] = {}
+        self.logger = get_logger()
+
+    def run(self, max_cycles: Optional[int] = None):
+        """Watch the mailbox until interrupted.
+
+        Args:
+            max_cycles: Stop after this many wake-ups (optional, for testing)
+        """
+        delay = constants.MAIL_RECONNECT_MIN_DELAY
+        cycles = 0
+        client: Optional[MailClient] = None
+        self.logger.info(f"Watching mailbox for {', '.join(self.platforms)} bills")
+        try:
+            while max_cycles is None or cycles < max_cycles:
+                try:
+                    if client is None:
+                        client = self.service.connect_mail()
+                        self.import_ready(client)
+                        delay = constants.MAIL_RECONNECT_MIN_DELAY
+                    cycles += 1
+                    if client.wait_for_mail(self.idle_timeout, self.poll_interval):
+                        self.logger.info("New mail arrived")
+                        self.import_ready(client)
+                except _CONNECTION_ERRORS as e:
+                    self.logger.warning(f"Mail connection lost ({e}), reconnecting in {delay}s")
+                    if client is not None:
+                        client.close()
+                        client = None
+                    time.sleep(delay)
+                    delay = min(delay * 2, constants.MAIL_RECONNECT_MAX_DELAY)
+        finally:
+            if client is not None:
+                client.close()
+
+    def import_ready(self, client: MailClient) -> List[ImportResult]:
+        """Scan the mailbox and import every platform with a new password and bill pair.
+
+        Raises:
+            imaplib.IMAP4.abort: If the mailbox scan failed
+        """
+        results = []
+        with self.service.mail_session(self.platforms, client) as scanner:
+            if scanner is None:
+                raise imaplib.IMAP4.abort("Mailbox scan failed")
+            for platform in self.platforms:
+                mail = scanner.results[platform]
+                if not mail.complete:
+                    continue
+                pair = (int(mail.password_uid), int(mail.bill_uid))
+                if pair[0] < pair[1]:
+                    self.logger.info(f"{platform} bill mail found, waiting for its password mail")
+                    continue
+                if self._imported.get(platform) == pair:
+                    continue
+
+                self.logger.info(f"Importing {platform} bill (mail UID {pair[1]})")
+                result = self.service.import_bill(platform)
+                self.logger.info(str(result))
+                if result.success:
+                    self._imported[platform] = pair
+                results.append(result)
+        return results
@@ -11,13 +11,31 @@
 
 import pandas as pd
 from src.adapters.base import PaymentAdapter
+from src.file_utils.bill_reader import BillReader
 
 
 class DataProcessor:
     def __init__(self, path, adapter: PaymentAdapter):
+        # path: standard CSV file, a text stream of it, or a BillReader
         self.path = path
         self.adapter = adapter
-        self.df = pd.read_csv(self.path, encoding="utf-8")
+        col_map = self.adapter.get_csv_column_mapping()
+        # Order numbers are identifiers, not numbers: keep them as exact strings
+        id_columns = {col_map['transaction_id']: str, col_map['merchant_order_id']: str}
+        if isinstance(self.path, BillReader):
+            self.df = self.path.read_frame(dtype=id_columns)
+        else:
+            self.df = pd.read_csv(self.path, encoding="utf-8", dtype=id_columns)
+
+    def filter_since(self, since):
+        """Keep only rows at or after ``since``.
+
+        A single vectorized datetime comparison, run before any per-row work.
+        Rows whose time cannot be parsed are kept.
+        """
+        datetime_col = self.adapter.get_csv_column_mapping()['datetime']
+        times = pd.to_datetime(self.df[datetime_col], errors="coerce")
+        self.df = self.df[(times >= pd.Timestamp(since)) | times.isna()]
 
     def process_mandatory_fields(self):
         # Use adapter to get column mapping
@@ -54,4 +72,21 @@ class DataProcessor:
     def get_processed_data(self):
         return self.df
 
+    @staticmethod
+    def transaction_time_range(df, adapter: PaymentAdapter):
+        """Return (earliest, latest) transaction time of a processed frame, or (None, None) if empty."""
+        if df.empty:
+            return None, None
+        datetime_col = adapter.get_csv_column_mapping()['datetime']
+        times = pd.to_datetime(df[datetime_col].str[:19], format="%Y-%m-%dT%H:%M:%S", errors="coerce")
+        earliest, latest = times.min(), times.max()
+        if pd.isna(latest):
+            return None, None
+        return earliest.to_pydatetime(), latest.to_pydatetime()
+
+    @staticmethod
+    def latest_transaction_time(df, adapter: PaymentAdapter):
+        """Return the latest transaction time of a processed frame, or None if empty."""
+        return DataProcessor.transaction_time_range(df, adapter)[1]
+
 
@@ -0,0 +1,204 @@
+"""Content-addressed local cache of bill mails, password mails and WeChat downloads."""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils.logger import get_logger
+
+
+def _mail_time(entry: dict) -> datetime:
+    """Return the timezone-aware Date of a cached mail, or when it was cached if it has none."""
+    if entry.get("date"):
+        sent = datetime.fromisoformat(entry["date"])
+        # parsedate_to_datetime leaves "-0000" dates naive; they are UTC
+        return sent if sent.tzinfo else sent.replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(entry["cached_at"]).astimezone()  # local time
+
+
+class MailCache:
+    """Store the mails and files a bill import needs, to reprocess them offline.
+
+    Blobs (raw RFC 822 messages and files downloaded from WeChat links) are
+    stored once under ``objects/<sha256[:2]>/<sha256>``. ``catalog.ndjson``
+    describes them, one JSON object per line::
+
+        {"kind": "bill", "platform": "wechatpay", "sha256": "...",
+         "from": "...", "subject": "...", "date": "...", "cached_at": "..."}
+        {"kind": "download", "platform": "wechatpay", "sha256": "...",
+         "url": "...", "filename": "...", "message": "<sha256 of the bill mail>", ...}
+
+    ``kind`` is one of ``password``, ``bill`` and ``download``. Both the blob
+    and the catalog line are fsynced, and a blob already in the cache is not
+    written or catalogued again.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.catalog_path = self.root / "catalog.ndjson"
+        self._lock = threading.Lock()
+        self._entries: Optional[List[dict]] = None
+        self.logger = get_logger()
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def _put_blob(self, data: bytes) -> str:
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return sha256
+
+    def _load(self) -> List[dict]:
+        if self._entries is None:
+            self._entries = []
+            if self.catalog_path.exists():
+                with open(self.catalog_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._entries.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            break  # torn write from a crash
+        return self._entries
+
+    def _put_file(self, source: Path) -> str:
+        digest = hashlib.sha256()
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        path = self._blob_path(sha256)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            shutil.copyfile(source, tmp_path)
+            with open(tmp_path, "rb+") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        return sha256
+
+    def _add(self, data: bytes | Path, entry: dict) -> dict:
+        with self._lock:
+            sha256 = self._put_file(data) if isinstance(data, Path) else self._put_blob(data)
+            for existing in self._load():
+                if existing["kind"] == entry["kind"] and existing["sha256"] == sha256:
+                    return existing
+            entry = {**entry, "sha256": sha256, "cached_at": datetime.now().isoformat(timespec="seconds")}
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.catalog_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._entries.append(entry)
+        self.logger.info(f"Cached {entry['kind']} {entry.get('subject') or entry.get('filename')} ({sha256[:12]})")
+        return entry
+
+    def add_message(
+        self,
+        kind: str,
+        platform: str,
+        raw: bytes,
+        from_addr: str,
+        subject: str,
+        date: Optional[datetime] = None,
+    ) -> dict:
+        """Cache a raw mail.
+
+        Args:
+            kind: "password" or "bill"
+            platform: Payment platform
+            raw: Raw RFC 822 bytes as fetched from the server
+            from_addr: Sender address
+            subject: Decoded subject
+            date: Date header of the mail (optional)
+
+        Returns:
+            Catalog entry of the mail
+        """
+        return self._add(raw, {
+            "kind": kind,
+            "platform": platform,
+            "from": from_addr,
+            "subject": subject,
+            "date": date.isoformat() if date else None,
+        })
+
+    def add_download(self, platform: str, url: str, filename: str, path: Path, message: Optional[str]) -> dict:
+        """Cache a file downloaded from a link in a bill mail.
+
+        The file is copied, not read into memory.
+
+        Args:
+            platform: Payment platform
+            url: Link the file was downloaded from
+            filename: File name the server gave it
+            path: Downloaded file
+            message: SHA-256 of the bill mail holding the link
+        """
+        return self._add(Path(path), {
+            "kind": "download",
+            "platform": platform,
+            "url": url,
+            "filename": filename,
+            "message": message,
+        })
+
+    def has_message(self, kind: str, platform: str, subject: str) -> bool:
+        """Return True if a mail with this subject is already cached.
+
+        Lets callers skip fetching a mail whose copy is already here.
+        """
+        with self._lock:
+            return any(
+                entry["kind"] == kind and entry["platform"] == platform and entry["subject"] == subject
+                for entry in self._load()
+            )
+
+    def read(self, entry: dict) -> bytes:
+        """Return the content of a catalog entry."""
+        return self._blob_path(entry["sha256"]).read_bytes()
+
+    def entries(self, kind: str, platform: str) -> List[dict]:
+        """Return the entries of one kind for a platform, oldest mail first."""
+        with self._lock:
+            entries = [e for e in self._load() if e["kind"] == kind and e["platform"] == platform]
+        return sorted(entries, key=_mail_time)
+
+    def latest_bill(self, platform: str) -> Optional[dict]:
+        """Return the newest cached bill mail of a platform."""
+        bills = self.entries("bill", platform)
+        return bills[-1] if bills else None
+
+    def password_for(self, platform: str, bill: dict) -> Optional[dict]:
+        """Return the password mail belonging to a bill mail.
+
+        The password is sent after the bill arrives, so the first password
+        mail dated at or after the bill is used, falling back to the newest.
+        Dates are compared as instants, whatever offset each mail was sent with.
+        """
+        passwords = self.entries("password", platform)
+        for entry in passwords:
+            if bill.get("date") and entry.get("date") and _mail_time(entry) >= _mail_time(bill):
+                return entry
+        return passwords[-1] if passwords else None
+
+    def find_download(self, url: str, message: Optional[str] = None) -> Optional[dict]:
+        """Return the cached download of a link, preferring the one from ``message``."""
+        with self._lock:
+            matches = [e for e in self._load() if e["kind"] == "download" and e["url"] == url]
+        for entry in matches:
+            if entry.get("message") == message:
+                return entry
+        return matches[-1] if matches else None
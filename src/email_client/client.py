@@ -1,39 +1,128 @@
 from pathlib import Path
+import hashlib
 import imaplib
 import email
+import select
+import ssl
+import threading
+import time
 from email.header import decode_header
-from email.utils import parseaddr
+from email.utils import parseaddr, parsedate_to_datetime
 from email.message import Message
-
-# from bs4 import BeautifulSoup
-from lxml import html
+from dataclasses import dataclass
+from datetime import datetime
+from html import unescape
+from typing import Dict, Iterable, Iterator, List, Optional
 import re
-import requests
-from urllib.parse import quote
-from urllib.parse import unquote
 
 from src.config.settings import load_config
-from src.adapters.base import PaymentAdapter
+from src.adapters.base import BillPartRule, PaymentAdapter
+from src.config import constants
+from src.email_client.cache import MailCache
+from src.email_client.download import download, safe_filename, write_part
 from src.utils.logger import get_logger
 
+ENVELOPE_FIELDS = "BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)]"
+_NEW_MAIL = re.compile(rb"^\* (\d+) EXISTS")
+_EXPUNGED = re.compile(rb"^\* \d+ EXPUNGE")
+_HREF = re.compile(r"""href\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+
+
+def decode_header_value(value) -> str:
+    """Decode an RFC 2047 encoded header into text."""
+    if value is None:
+        return ""
+    return "".join(_decode_bytes(part, encoding) for part, encoding in decode_header(str(value)))
+
+
+def _decode_bytes(data, charset: Optional[str]) -> str:
+    """Decode header or body bytes, replacing what the declared charset cannot decode."""
+    if not isinstance(data, bytes):
+        return data
+    try:
+        return data.decode(charset or "utf-8", errors="replace")
+    except LookupError:  # unknown charset, e.g. unknown-8bit
+        return data.decode("utf-8", errors="replace")
+
+
+def uid_set(uids: Iterable[bytes]) -> str:
+    """Compress UIDs into an IMAP sequence set, e.g. 1:4,7,9:10."""
+    numbers = sorted({int(uid) for uid in uids})
+    ranges = []
+    for number in numbers:
+        if ranges and number == ranges[-1][1] + 1:
+            ranges[-1][1] = number
+        else:
+            ranges.append([number, number])
+    return ",".join(str(lo) if lo == hi else f"{lo}:{hi}" for lo, hi in ranges)
+
+
+@dataclass
+class MailEnvelope:
+    """Sender, subject and date of a message, fetched without its body."""
+
+    uid: bytes
+    from_addr: str
+    subject: str
+    date: Optional[datetime] = None
+
+    @classmethod
+    def from_headers(cls, uid: bytes, headers: Message) -> "MailEnvelope":
+        from_name, from_addr = parseaddr(decode_header_value(headers["From"]))
+        try:
+            date = parsedate_to_datetime(headers["Date"]) if headers["Date"] else None
+        except (TypeError, ValueError):
+            date = None
+        return cls(uid, from_addr, decode_header_value(headers["Subject"]), date)
+
+
+class MailNotFoundError(LookupError):
+    """No message has the requested UID (any more)."""
+
 
 class MailClient:
-    def __init__(self, username, password, imap_url, adapter: PaymentAdapter, attachment_dir="attachment"):
+    def __init__(
+        self, username, password, imap_url, adapter: Optional[PaymentAdapter] = None, attachment_dir="attachment"
+    ):
         self.username = username
         self.password = password
         self.imap_url = imap_url
         self.mail = None
+        self.mailbox = "inbox"
+        self.uidvalidity = None
+        self.uidnext = None
+        self.exists = 0
         self.email_list = None
         self.email_message = None
+        self.raw_email = None
         self.from_addr = None
         self.paswd = None
         self.subject = None
+        self.date = None
         self.adapter = adapter
+        # Shared cap on open IMAP sessions (multi-account runs); held from connect to close
+        self.connection_slots: Optional[threading.Semaphore] = None
+        self._holds_slot = False
+        # Local copy of matched mails and downloads; offline mode reads from it only
+        self.cache: Optional[MailCache] = None
+        self.offline = False
+        self._message_sha256 = None
+        self._part_rules: Dict[str, List[BillPartRule]] = {}
         # directory to save attachments
         self.attachment_dir = attachment_dir
         self.logger = get_logger()
 
     def connect(self):
+        if self.connection_slots is not None and not self._holds_slot:
+            self.connection_slots.acquire()
+            self._holds_slot = True
+        try:
+            self._login()
+        except BaseException:
+            self.close()
+            raise
+
+    def _login(self):
         # 连接到服务器
         self.mail = imaplib.IMAP4_SSL(self.imap_url)
 
@@ -47,146 +136,361 @@ class MailClient:
         # 验证
         self.mail.login(self.username, self.password)
 
-        result_sel, data_sel = self.mail.select("inbox")
+        result_sel, data_sel = self.mail.select(self.mailbox)
         self.logger.info(f"Mail login status: {result_sel}, {data_sel}")
+        self.exists = int(data_sel[0]) if result_sel == "OK" and data_sel and data_sel[0] else 0
+
+        # UIDs are only comparable between sessions while UIDVALIDITY is unchanged
+        _, data_validity = self.mail.response("UIDVALIDITY")
+        self.uidvalidity = int(data_validity[-1]) if data_validity and data_validity[-1] else None
+        _, data_next = self.mail.response("UIDNEXT")
+        self.uidnext = int(data_next[-1]) if data_next and data_next[-1] else None
+
+    def close(self):
+        """Log out of the server, ignoring errors of an already broken connection."""
+        if self.mail is not None:
+            try:
+                self.mail.logout()
+            except (imaplib.IMAP4.error, OSError) as e:
+                self.logger.debug(f"Mail logout failed: {e}")
+            self.mail = None
+        if self._holds_slot:
+            self._holds_slot = False
+            self.connection_slots.release()
+
+    def wait_for_mail(
+        self, timeout: float = constants.MAIL_IDLE_TIMEOUT, poll_interval: float = constants.MAIL_POLL_INTERVAL
+    ) -> bool:
+        """Block until the server reports new mail or ``timeout`` seconds pass.
+
+        Uses IDLE (RFC 2177) when the server advertises it and polls with
+        NOOP otherwise. Connection failures are raised as
+        ``imaplib.IMAP4.abort`` / ``OSError`` for the caller to reconnect.
+
+        Returns:
+            True if the mailbox grew
+        """
+        if "IDLE" in self.mail.capabilities:
+            return self._idle(timeout)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            result, data = self.mail.noop()
+            if result != "OK":
+                raise imaplib.IMAP4.abort(f"NOOP failed: {data}")
+            _, expunged = self.mail.response("EXPUNGE")
+            self.exists -= len([number for number in expunged if number])
+            _, exists = self.mail.response("EXISTS")
+            if any(self._mailbox_grew(count) for count in exists if count):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(poll_interval, remaining))
+
+    def _mailbox_grew(self, count) -> bool:
+        count = int(count)
+        grew = count > self.exists
+        self.exists = count
+        return grew
+
+    def _track_untagged(self, line: bytes) -> bool:
+        """Follow the mailbox size through an untagged response; True if it grew.
+
+        Deleted mails are counted down on EXPUNGE, so the mails that arrive
+        after them are still seen as new.
+        """
+        if _EXPUNGED.match(line):
+            self.exists -= 1
+            return False
+        match = _NEW_MAIL.match(line)
+        return bool(match) and self._mailbox_grew(match.group(1))
+
+    def _line_buffered(self) -> bool:
+        """Return True if response data is already waiting to be read.
+
+        ``readline`` goes through the buffered ``mail.file``, which may hold
+        the next line(s) of a packet after the socket stops being readable;
+        TLS may likewise hold decrypted bytes. A non-blocking ``peek`` sees both.
+        """
+        sock = self.mail.sock
+        timeout = sock.gettimeout()
+        sock.settimeout(0.0)
+        try:
+            return bool(self.mail.file.peek(1))
+        except (BlockingIOError, ssl.SSLWantReadError):
+            return False
+        finally:
+            sock.settimeout(timeout)
+
+    def _idle(self, timeout: float) -> bool:
+        # imaplib has no IDLE before Python 3.14, so the exchange is done by hand
+        mail = self.mail
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        new_mail = False
+        deadline = time.monotonic() + timeout
+        while not new_mail:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not (self._line_buffered() or select.select([mail.sock], [], [], remaining)[0]):
+                break
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed during IDLE")
+            new_mail = self._track_untagged(line)
+
+        # Leave IDLE; responses sent meanwhile are read up to the tagged one
+        mail.send(b"DONE\r\n")
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("Connection closed while leaving IDLE")
+            if line.startswith(tag):
+                if not line[len(tag):].strip().upper().startswith(b"OK"):
+                    raise imaplib.IMAP4.error(f"IDLE failed: {line!r}")
+                return new_mail
+            if self._track_untagged(line):
+                new_mail = True
 
-    def fetch_mail(self):
-        # 搜索邮件
-        result_search, data_search = self.mail.uid("search", None, "ALL")
-        self.email_list = data_search[0].split()
+    def fetch_mail(self, criteria: Optional[List[str]] = None):
+        # 搜索邮件, 默认是全部邮件
+        self.email_list = self.search(criteria or ["ALL"])
+
+    def search(self, criteria: List[str]) -> List[bytes]:
+        """Run a server-side UID SEARCH and return the matching UIDs, oldest first.
+
+        A non-ASCII last criterion (the password mail subject) is sent as a
+        UTF-8 literal. Servers that reject ``CHARSET UTF-8`` are searched
+        with only the ASCII part of it instead; callers still check every
+        subject, so the looser search only costs a few extra fetches.
+
+        Args:
+            criteria: Search keys and values, e.g. ["FROM", "a@b.com", "SINCE", "01-Jan-2025"]
+
+        Returns:
+            List of UIDs
+        """
+        criteria = [f'"{c}"' if " " in c else c for c in criteria]
+        *head, last = criteria
+        if last.isascii():
+            result_search, data_search = self.mail.uid("search", None, *criteria)
+        else:
+            self.mail.literal = last.encode("utf-8")
+            try:
+                result_search, data_search = self.mail.uid("search", "CHARSET", "UTF-8", *head)
+            except imaplib.IMAP4.error as e:
+                result_search, data_search = "NO", [str(e).encode()]
+            finally:
+                self.mail.literal = None
+            if result_search != "OK":
+                self.logger.info(f"Server rejected UTF-8 search ({data_search}), searching ASCII only")
+                ascii_part = last.encode("ascii", "ignore").decode()
+                fallback = head + [ascii_part] if ascii_part else head[:-1]
+                result_search, data_search = self.mail.uid("search", None, *(fallback or ["ALL"]))
+
+        if result_search != "OK":
+            raise imaplib.IMAP4.error(f"UID SEARCH {' '.join(criteria)} failed: {data_search}")
+        uids = data_search[0].split() if data_search and data_search[0] else []
+        self.logger.info(f"UID SEARCH {' '.join(criteria)}: {len(uids)} messages")
+        return uids
 
     def get_mail_info(self, num):
-        """获取邮件信息,包括发件人,主题"""
+        """获取邮件信息,包括发件人,主题
+
+        Raises:
+            MailNotFoundError: 如果该UID的邮件不存在(例如已被删除)
+        """
         result, data = self.mail.uid("fetch", num, "(BODY.PEEK[])")
-        raw_email = data[0][1].decode("utf-8")
-        self.email_message: Message = email.message_from_string(raw_email)
+        # An expunged UID gets an empty OK answer: no (envelope, body) tuple
+        raw = next((item[1] for item in data or [] if isinstance(item, tuple)), None)
+        if result != "OK" or raw is None:
+            raise MailNotFoundError(f"Mail UID {num.decode() if isinstance(num, bytes) else num} not found")
+        self.load_message(raw)
+
+    def load_message(self, raw: bytes):
+        """Make a raw mail the current message, e.g. one read from the mail cache."""
+        self.raw_email = raw
+        self._message_sha256 = hashlib.sha256(raw).hexdigest()
+        # Parsed from bytes: bodies stay undecoded until a part is needed
+        self.email_message: Message = email.message_from_bytes(raw)
 
         # 获取邮件发件人
-        from_header_parts = decode_header(self.email_message["From"])
-        from_header = "".join(
-            (
-                part.decode(encoding if encoding else "utf-8")
-                if isinstance(part, bytes)
-                else part
-            )
-            for part, encoding in from_header_parts
-        )
+        from_header = decode_header_value(self.email_message["From"])
         from_name, self.from_addr = parseaddr(from_header)  # 解析邮件地址以及名称
 
         # 获取邮件主题
-        subject_parts = decode_header(self.email_message["Subject"])
-        self.subject = "".join(
-            (
-                part.decode(encoding if encoding else "utf-8")
-                if isinstance(part, bytes)
-                else part
-            )
-            for part, encoding in subject_parts
+        self.subject = decode_header_value(self.email_message["Subject"])
+
+        try:
+            self.date = parsedate_to_datetime(self.email_message["Date"]) if self.email_message["Date"] else None
+        except (TypeError, ValueError):
+            self.date = None
+
+    def cache_message(self, kind: str):
+        """Store the current message in the mail cache, if there is one.
+
+        Args:
+            kind: "password" or "bill"
+        """
+        if self.cache is None or self.offline or self.raw_email is None:
+            return
+        self.cache.add_message(
+            kind, self.adapter.platform_name, self.raw_email, self.from_addr, self.subject, self.date
         )
 
+    def fetch_envelopes(
+        self, uids: Iterable[bytes], batch_size: int = constants.ENVELOPE_BATCH_SIZE
+    ) -> Iterator[MailEnvelope]:
+        """Fetch only the From, Subject and Date headers of messages, in batches.
+
+        One UID FETCH command is sent per batch, and envelopes are yielded in
+        the order of ``uids``. The next batch is only requested once the
+        caller has consumed the current one, so stopping at the first match
+        also stops the scan.
+
+        Args:
+            uids: UIDs to fetch, e.g. newest first
+            batch_size: UIDs per FETCH command
+
+        Yields:
+            MailEnvelope of each message still on the server
+        """
+        uids = list(uids)
+        for start in range(0, len(uids), batch_size):
+            batch = uids[start:start + batch_size]
+            result, data = self.mail.uid("fetch", uid_set(batch), f"({ENVELOPE_FIELDS})")
+            if result != "OK":
+                raise imaplib.IMAP4.error(f"UID FETCH of {len(batch)} envelopes failed: {data}")
+
+            envelopes = {}
+            for item in data:
+                if not isinstance(item, tuple):
+                    continue
+                match = re.search(rb"UID (\d+)", item[0])
+                if match:
+                    headers = email.message_from_bytes(item[1])
+                    envelopes[match.group(1)] = MailEnvelope.from_headers(match.group(1), headers)
+            self.logger.debug(f"Fetched {len(envelopes)} envelopes ({uid_set(batch)})")
+            for uid in batch:
+                envelope = envelopes.get(uid if isinstance(uid, bytes) else str(uid).encode())
+                if envelope is not None:
+                    yield envelope
+
+    def set_envelope(self, envelope: MailEnvelope):
+        """Make an envelope the current message for get_passwd and fetch_mail_attachment.
+
+        The body is not loaded; call get_mail_info before walking the message.
+        """
+        self.from_addr = envelope.from_addr
+        self.subject = envelope.subject
+        self.email_message = None
+
     def get_passwd(self):
         # 检查邮件发件邮箱是否是自己的邮箱
         flag = False
         self.logger.debug(f"Email from: {self.from_addr}")
         if self.from_addr == self.username:
             self.logger.debug(f"Subject from get_passwd: {self.subject}")
-            pattern = f"^{self.adapter.platform_name}解压密码[0-9]{{6}}$"
-            if re.match(pattern, self.subject):
+            password = self.adapter.parse_password_subject(self.subject)
+            if password:
                 self.logger.info(f"Found password email with subject: {self.subject}")
-                self.paswd = self.subject[-6:]
+                self.paswd = password
                 self.logger.info(f"Extracted password: {self.paswd}")
                 flag = True
         return flag
 
-    def walk_message(self, part: Message, count=0):
-        # use configured attachment dir
-        Path(self.attachment_dir).mkdir(parents=True, exist_ok=True)
+    def walk_message(self, message: Message):
+        """Save the bill parts of a message selected by the adapter's rules.
+
+        Only headers are looked at while walking; a part's body is decoded
+        only once a rule matches it.
+        """
+        rules = self._part_rules.get(self.adapter.platform_name)
+        if rules is None:
+            rules = self._part_rules[self.adapter.platform_name] = self.adapter.get_bill_part_rules()
+
+        saved = 0
+        for count, part in enumerate(message.walk()):
+            if part.is_multipart():
+                continue
+            content_type = part.get_content_type()
+            self.logger.debug(f"Content Type {count}: {content_type}")
+            for rule in rules:
+                if rule.content_type and rule.content_type != content_type:
+                    continue
+                if rule.kind == "attachment":
+                    saved += self._save_attachment(part, rule)
+                elif rule.kind == "link":
+                    saved += self._save_links(part, rule)
+        if not saved:
+            self.logger.warning(f"No bill attachment or link found in mail: {self.subject}")
 
-        self.logger.debug(f"Content Type {count}: {part.get_content_type()}")
+    def _save_attachment(self, part: Message, rule: BillPartRule) -> int:
         filename = part.get_filename()
+        if not filename:
+            return 0
         self.logger.debug(f"Original filename: {filename}")
-        if filename:
-            filename = "".join(
-                (
-                    part.decode(encoding if encoding else "utf-8")
-                    if isinstance(part, bytes)
-                    else part
+        filename = decode_header_value(filename)
+        if not rule.pattern.search(filename):
+            self.logger.debug(f"Skipping attachment {filename}")
+            return 0
+        self.logger.info(f"Decoded filename: {filename}")
+
+        # 下载附件
+        write_part(part, Path(self.attachment_dir) / safe_filename(filename))
+        return 1
+
+    def _save_links(self, part: Message, rule: BillPartRule) -> int:
+        # 微信账单邮件正文(HTML)中是下载链接
+        body = _decode_bytes(part.get_payload(decode=True) or b"", part.get_content_charset())
+        saved = 0
+        for url in (unescape(href) for href in _HREF.findall(body)):
+            if not rule.pattern.match(url):
+                continue
+            self.logger.info(f"Found download URL: {url}")
+
+            if self.offline:
+                self._restore_download(url)
+                saved += 1
+                continue
+
+            # 下载网址指向的文件, 流式写入磁盘
+            # 过期时返回的页面: 当前文件已过期，请在微信中重新申请导出 or 当前文件下载次数已超出限制，如有需要请在微信中重新申请导出
+            result = download(url, self.attachment_dir, expired_marker="请在微信中重新申请导出")
+            saved += 1
+
+            if self.cache is not None:
+                # 微信链接有下载次数限制, 留一份本地副本
+                self.cache.add_download(
+                    self.adapter.platform_name, url, result.filename, result.path, self._message_sha256
                 )
-                for part, encoding in decode_header(filename)
-            )
-            self.logger.info(f"Decoded filename: {filename}")
-
-            # 下载附件
-            payload = part.get_payload(decode=True)
-            with open(Path(self.attachment_dir) / filename, "wb") as f:
-                f.write(payload)
-
-        # 如果payload是HTML类型,尝试从中提取网址,微信就是
-        if part.get_content_type() == "text/html":
-            # soup = BeautifulSoup(part.get_payload(decode=True), 'html.parser')
-            # link_elements = soup.find_all('a')
-            tree = html.fromstring(
-                part.get_payload(decode=True), parser=html.HTMLParser(encoding="utf-8")
-            )
-            # self.logger.debug(html.tostring(tree, pretty_print=True).decode('utf-8'))  # 打印HTML树
-            self.logger.debug(f"Parsed HTML tree: {tree}")
-            # link_elements = tree.xpath('/html/body/tr[4]/td/div/a')   # 我下载了其html,按照层级写的,不知道为什么是空值
-            link_elements = tree.xpath('//a[contains(@href, "http")]')
-
-            self.logger.debug(f"Found link elements: {link_elements}")
-            for link in link_elements:
-                url = link.get("href")
-                if url and re.match(
-                    "http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
-                    url,
-                ):
-                    self.logger.info(f"Found download URL: {url}")
-
-                    # 下载网址指向的文件
-                    response = requests.get(url)
-                    self.logger.info(f"Response status code: {response.status_code}")
-                    self.logger.debug(f"Response headers: {response.headers}")
-                    # 检查状态码
-                    if response.status_code != 200:
-                        self.logger.error(f"Request failed with status {response.status_code}")
-                        raise Exception(
-                            f"Request failed with status {response.status_code}"
-                        )
-
-                    # 检查错误消息
-                    error_message = "请在微信中重新申请导出"  # 当前文件已过期，请在微信中重新申请导出 or 当前文件下载次数已超出限制，如有需要请在微信中重新申请导出
-                    if error_message in response.text:
-                        self.logger.error(f"Download link expired or limit exceeded")
-                        raise Exception(
-                            f"Request failed: 不要慌, {error_message}, 并且要重新发送密码邮件"
-                        )
-
-                    if "Content-Disposition" in response.headers:
-                        filename = re.findall(
-                            "filename=([^;]*)", response.headers["Content-Disposition"]
-                        )[0]
-                        self.logger.debug(f"Original HTML filename: {filename}")
-                        filename = unquote(filename)  # 解码文件名
-                        self.logger.info(f"Decoded HTML filename: {filename}")
-                    else:
-                        filename = url.split("/")[-1][:10]  # 实际上用不到,暂时保留
-
-                    with open(
-                        Path(self.attachment_dir) / re.sub(r'[\\/*?:"<>|]', "", filename),
-                        "wb",
-                    ) as f:
-                        f.write(response.content)
-
-        if part.is_multipart():
-            for subpart in part.get_payload():
-                count += 1
-                self.walk_message(subpart, count)
+        return saved
+
+    def _restore_download(self, url: str):
+        """Write the cached copy of a linked file instead of downloading it again."""
+        entry = self.cache.find_download(url, self._message_sha256) if self.cache else None
+        if entry is None:
+            raise Exception(f"Download link {url} is not in the mail cache")
+        filename = safe_filename(entry["filename"])
+        self.logger.info(f"Restored {filename} from the mail cache")
+        with open(Path(self.attachment_dir) / filename, "wb") as f:
+            f.write(self.cache.read(entry))
+
+    def is_bill_mail(self) -> bool:
+        """Return True if the current message was sent by the platform's bill sender."""
+        return self.from_addr == self.adapter.get_email_sender()
 
     def fetch_mail_attachment(self):
         flag = False
         
-        if self.from_addr == self.adapter.get_email_sender():
+        if self.is_bill_mail():
             self.logger.info(f"Found bill email from {self.adapter.platform_name}: {self.subject}")
+            self.cache_message("bill")
+            Path(self.attachment_dir).mkdir(parents=True, exist_ok=True)
             self.walk_message(self.email_message)
             flag = True
             return flag
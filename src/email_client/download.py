@@ -0,0 +1,170 @@
+"""Write bill files from mail attachments and links to disk."""
+
+import binascii
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass
+from email.message import Message
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import constants
+from src.utils.logger import get_logger
+
+# Characters that are not allowed in file names on Windows
+_UNSAFE_FILENAME = re.compile(r'[\\/*?:"<>|]')
+_CONTENT_DISPOSITION_FILENAME = re.compile(r"filename=([^;]*)")
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class DownloadExpiredError(Exception):
+    """The download link answered with the "request a new export" page."""
+
+
+@dataclass
+class DownloadResult:
+    """A file written to disk by a streaming download."""
+
+    path: Path
+    filename: str
+    size: int
+    sha256: str
+
+
+def http_session() -> requests.Session:
+    """Return the process-wide pooled HTTP session used for downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=constants.DOWNLOAD_POOL_SIZE, pool_maxsize=constants.DOWNLOAD_POOL_SIZE
+            )
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def safe_filename(filename: str) -> str:
+    """Remove characters that cannot appear in a file name."""
+    return _UNSAFE_FILENAME.sub("", filename)
+
+
+class _HashingWriter:
+    """Write chunks to a temporary file while hashing them, then move it into place."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self._file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.tmp_path, "wb")
+        return self
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self.digest.update(chunk)
+        self.size += len(chunk)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            self.tmp_path.unlink(missing_ok=True)
+
+
+def write_part(part: Message, path: Path, chunk_chars: int = 1 << 16) -> DownloadResult:
+    """Decode a MIME attachment to a file.
+
+    The encoded payload is already in memory, as part of the message fetched
+    from the server. Base64 parts are decoded a slice at a time, so no second,
+    decoded copy of the whole attachment is built. Other encodings are rare
+    for bill attachments and fall back to ``get_payload(decode=True)``.
+    """
+    with _HashingWriter(path) as writer:
+        if str(part.get("Content-Transfer-Encoding", "")).strip().lower() == "base64":
+            payload = part.get_payload()
+            leftover = ""
+            for start in range(0, len(payload), chunk_chars):
+                text = leftover + "".join(payload[start:start + chunk_chars].split())
+                cut = len(text) - len(text) % 4
+                writer.write(binascii.a2b_base64(text[:cut]))
+                leftover = text[cut:]
+            if leftover:
+                writer.write(binascii.a2b_base64(leftover + "=" * (-len(leftover) % 4)))
+        else:
+            writer.write(part.get_payload(decode=True) or b"")
+    return DownloadResult(path, path.name, writer.size, writer.digest.hexdigest())
+
+
+def download(url: str, directory: str | Path, expired_marker: Optional[str] = None) -> DownloadResult:
+    """Stream a linked file into ``directory``.
+
+    The body is written in chunks and hashed on the way, so memory use does
+    not depend on the file size. Only HTML/text or small responses, which is
+    what an error page looks like, are checked for ``expired_marker``.
+
+    Args:
+        url: Link to download
+        directory: Directory receiving the file
+        expired_marker: Text of the page served instead of an expired file (optional)
+
+    Returns:
+        DownloadResult of the written file
+
+    Raises:
+        Exception: If the server does not answer 200
+        DownloadExpiredError: If the response is the expiry page
+    """
+    logger = get_logger()
+    timeout = (constants.DOWNLOAD_CONNECT_TIMEOUT, constants.DOWNLOAD_READ_TIMEOUT)
+    with http_session().get(url, stream=True, timeout=timeout) as response:
+        logger.info(f"Response status code: {response.status_code}")
+        logger.debug(f"Response headers: {response.headers}")
+        if response.status_code != 200:
+            logger.error(f"Request failed with status {response.status_code}")
+            raise Exception(f"Request failed with status {response.status_code}")
+
+        if "Content-Disposition" in response.headers:
+            filename = _CONTENT_DISPOSITION_FILENAME.findall(response.headers["Content-Disposition"])[0]
+            logger.debug(f"Original HTML filename: {filename}")
+            filename = unquote(filename).strip('"')  # 解码文件名
+            logger.info(f"Decoded HTML filename: {filename}")
+        else:
+            filename = url.split("/")[-1][:10]  # 实际上用不到,暂时保留
+        path = Path(directory) / safe_filename(filename)
+
+        content_type = response.headers.get("Content-Type", "")
+        content_length = int(response.headers.get("Content-Length") or 0)
+        check_expiry = expired_marker is not None and (
+            "html" in content_type
+            or "text" in content_type
+            or 0 < content_length <= constants.DOWNLOAD_EXPIRY_CHECK_BYTES
+        )
+        head = bytearray()
+        with _HashingWriter(path) as writer:
+            for chunk in response.iter_content(chunk_size=constants.DOWNLOAD_CHUNK_SIZE):
+                writer.write(chunk)
+                if check_expiry and len(head) < constants.DOWNLOAD_EXPIRY_CHECK_BYTES:
+                    head += chunk[: constants.DOWNLOAD_EXPIRY_CHECK_BYTES - len(head)]
+            if head and expired_marker in bytes(head).decode(response.encoding or "utf-8", errors="ignore"):
+                logger.error("Download link expired or limit exceeded")
+                raise DownloadExpiredError(
+                    f"Request failed: 不要慌, {expired_marker}, 并且要重新发送密码邮件"
+                )
+
+    logger.info(f"Downloaded {path.name} ({writer.size} bytes, sha256 {writer.digest.hexdigest()[:12]})")
+    return DownloadResult(path, filename, writer.size, writer.digest.hexdigest())
@@ -0,0 +1,330 @@
+"""Single-pass mailbox scan for the password and bill mails of several platforms."""
+
+import imaplib
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+from src.adapters.base import PaymentAdapter, imap_date
+from src.adapters.factory import AdapterFactory
+from src.email_client.client import MailClient, MailEnvelope, MailNotFoundError
+from src.state.mail_index import MailIndex
+from src.utils.logger import get_logger
+
+
+@dataclass
+class PlatformMail:
+    """Newest password mail and bill mail found for one platform."""
+
+    password: Optional[str] = None
+    password_uid: Optional[bytes] = None
+    password_subject: Optional[str] = None
+    bill_uid: Optional[bytes] = None
+    bill_subject: Optional[str] = None
+    # Outcome of a download made ahead of the import, see ``start_downloads``
+    bill_downloaded: Optional[bool] = None
+    bill_error: Optional[Exception] = None
+
+    @property
+    def complete(self) -> bool:
+        return self.password is not None and self.bill_uid is not None
+
+
+class MailboxScanner:
+    """Classify the messages of one mailbox session against several adapters at once.
+
+    Every candidate message is looked at once, newest first, from its
+    envelope only, and the scan stops as soon as each platform has both its
+    password mail and its bill mail. Adding platforms therefore adds a few
+    SEARCH commands at most, not another pass over the mailbox.
+
+    With a MailIndex, envelopes seen by earlier runs are not fetched again:
+    only UIDs above the last indexed one are, and the newest password and
+    bill mail of each platform are looked up in the index.
+
+    The bill bodies are downloaded later, one per platform, through
+    ``download_bill``; a lock serialises them on the shared connection.
+    ``start_downloads`` downloads them one after another in a background
+    thread instead, so a platform can upload its bill while the next one is
+    downloaded, and the session is logged out as soon as the last bill is in
+    rather than when the last upload ends.
+    """
+
+    def __init__(
+        self,
+        mail_client: MailClient,
+        adapters: List[PaymentAdapter],
+        since: Optional[date] = None,
+        scan_mailbox: bool = False,
+        index: Optional[MailIndex] = None,
+    ):
+        """Initialize the scanner.
+
+        Args:
+            mail_client: Connected mail client, shared by all platforms
+            adapters: Adapters of the platforms to look for
+            since: Ignore mails received before this day (None searches the whole mailbox)
+            scan_mailbox: Classify every mail since ``since`` instead of
+                using server-side search
+            index: Persistent envelope index for incremental scans (optional)
+        """
+        self.mail_client = mail_client
+        self.adapters = {adapter.platform_name: adapter for adapter in adapters}
+        self.since = since
+        self.scan_mailbox = scan_mailbox
+        self.index = index
+        self.results: Dict[str, PlatformMail] = {name: PlatformMail() for name in self.adapters}
+        self._lock = threading.Lock()
+        # Set once the background download of a platform's bill is done
+        self._downloaded: Dict[str, threading.Event] = {}
+        self._download_thread: Optional[threading.Thread] = None
+        self._logged_out = False
+        self.logger = get_logger()
+
+    def _since_criteria(self) -> List[str]:
+        """Return the SEARCH criteria matching every mail since ``since``."""
+        return ["SINCE", imap_date(self.since)] if self.since is not None else ["ALL"]
+
+    def _candidate_uids(self, adapters: Optional[List[PaymentAdapter]] = None) -> List[bytes]:
+        """Return the UIDs worth classifying, oldest first.
+
+        Args:
+            adapters: Platforms to search for (defaults to the scanned ones)
+        """
+        if not self.scan_mailbox:
+            try:
+                uids = set()
+                for adapter in adapters or self.adapters.values():
+                    uids.update(self.mail_client.search(
+                        adapter.get_password_search_criteria(self.mail_client.username, self.since)
+                    ))
+                    uids.update(self.mail_client.search(adapter.get_bill_search_criteria(self.since)))
+                return sorted(uids, key=int)
+            except imaplib.IMAP4.error as e:
+                self.logger.warning(f"Server-side mail search failed ({e}), scanning mail headers instead")
+        return self.mail_client.search(self._since_criteria())
+
+    def classify(self, envelope: MailEnvelope, adapters) -> Optional[str]:
+        """Return "password:<platform>", "bill:<platform>" or None for an envelope."""
+        for adapter in adapters:
+            if envelope.from_addr == self.mail_client.username and adapter.parse_password_subject(envelope.subject):
+                return f"password:{adapter.platform_name}"
+            if envelope.from_addr == adapter.get_email_sender():
+                return f"bill:{adapter.platform_name}"
+        return None
+
+    def _record(self, classification: Optional[str], uid: bytes, subject: str):
+        """Keep a classified mail if it is the first (newest) of its kind."""
+        if classification is None:
+            return
+        kind, name = classification.split(":", 1)
+        result = self.results.get(name)
+        if result is None:
+            return
+        if kind == "password" and result.password is None:
+            self.logger.info(f"Found {name} password email with subject: {subject}")
+            result.password = self.adapters[name].parse_password_subject(subject)
+            result.password_uid, result.password_subject = uid, subject
+        elif kind == "bill" and result.bill_uid is None:
+            self.logger.info(f"Found {name} bill email: {subject}")
+            result.bill_uid, result.bill_subject = uid, subject
+
+    def scan(self) -> Dict[str, PlatformMail]:
+        """Find the newest password and bill mail of every platform.
+
+        Returns:
+            Dict mapping platform name to its PlatformMail
+        """
+        with self._lock:
+            if self.index is not None and self.mail_client.uidvalidity is not None:
+                self._scan_indexed()
+                return self.results
+            
+            uids = self._candidate_uids()
+            scanned = 0
+            adapters = list(self.adapters.values())
+            for envelope in self.mail_client.fetch_envelopes(reversed(uids)):
+                scanned += 1
+                self._record(self.classify(envelope, adapters), envelope.uid, envelope.subject)
+                if all(result.complete for result in self.results.values()):
+                    break
+        self.logger.info(f"Scanned {scanned} of {len(uids)} candidate mails for {', '.join(self.adapters)}")
+        return self.results
+
+    def _scan_indexed(self):
+        """Bring the index up to date, then look the mails up in it.
+
+        New envelopes are classified against every registered platform, not
+        only the ones being imported, so later runs for other platforms can
+        use them too. A new index is seeded from the platforms' server-side
+        searches, so building it does not fetch every envelope of the
+        mailbox (unless ``scan_mailbox`` asks for exactly that).
+        """
+        client = self.mail_client
+        account = self._account()
+        adapters = [AdapterFactory.create(name) for name in AdapterFactory.get_supported_platforms()]
+        state = self.index.state(account, client.mailbox)
+        indexed_since = self.since or date.min
+        if state is None or state.uidvalidity != client.uidvalidity or state.indexed_since > indexed_since:
+            reason = "first run" if state is None else (
+                "UIDVALIDITY changed" if state.uidvalidity != client.uidvalidity else "older --mail-since"
+            )
+            self.logger.info(f"Rebuilding mail index from {self.since or 'the first mail'} ({reason})")
+            self.index.reset(account, client.mailbox, client.uidvalidity, indexed_since)
+            # Seed the index with the mails matching the platforms' server-side
+            # searches; the rest of the mailbox is marked as seen without
+            # fetching its envelopes (UIDNEXT - 1 is the highest UID in use)
+            uids = self._candidate_uids(adapters)
+            last_uid = client.uidnext - 1 if client.uidnext else 0
+        else:
+            last_uid = state.last_uid
+            # n:* always matches the highest UID, even when it is below n
+            uids = [uid for uid in client.search(["UID", f"{last_uid + 1}:*"]) if int(uid) > last_uid]
+        
+        rows = [
+            (
+                int(envelope.uid),
+                envelope.from_addr,
+                envelope.subject,
+                envelope.date.isoformat() if envelope.date else None,
+                self.classify(envelope, adapters),
+            )
+            for envelope in client.fetch_envelopes(uids)
+        ]
+        last_uid = max([last_uid, *map(int, uids)])
+        self.index.add(account, client.mailbox, rows, last_uid)
+        self.logger.info(f"Indexed {len(rows)} new mails (last UID {last_uid})")
+        
+        for name in self.adapters:
+            for kind in ("password", "bill"):
+                found = self.index.newest(account, client.mailbox, f"{kind}:{name}", self.since)
+                if found is not None:
+                    uid, subject = found
+                    self._record(f"{kind}:{name}", str(uid).encode(), subject)
+
+    def _account(self) -> str:
+        return f"{self.mail_client.username}@{self.mail_client.imap_url}"
+
+    def _fetch(self, kind: str, name: str) -> bool:
+        """Load a platform's password or bill mail into the mail client.
+
+        A mail found through the index may have been expunged since it was
+        indexed: its envelope is then dropped and the next newest mail of
+        the same kind is tried.
+
+        Returns:
+            False if no mail of that kind is left
+        """
+        result = self.results[name]
+        self.mail_client.adapter = self.adapters[name]
+        while True:
+            uid = result.password_uid if kind == "password" else result.bill_uid
+            if uid is None:
+                return False
+            try:
+                self.mail_client.get_mail_info(uid)
+                return True
+            except MailNotFoundError:
+                if self.index is None:
+                    raise
+            self.logger.warning(f"Indexed {kind} mail UID {uid.decode()} of {name} no longer exists")
+            self.index.remove(self._account(), self.mail_client.mailbox, int(uid))
+            if kind == "password":
+                result.password = result.password_uid = result.password_subject = None
+            else:
+                result.bill_uid = result.bill_subject = None
+            found = self.index.newest(self._account(), self.mail_client.mailbox, f"{kind}:{name}", self.since)
+            if found is not None:
+                self._record(f"{kind}:{name}", str(found[0]).encode(), found[1])
+
+    def cache_passwords(self):
+        """Copy the password mails found by the scan into the mail client's cache.
+
+        Password mails are recognised from their envelope alone, so their
+        (small) bodies are only fetched here, and only once.
+        """
+        cache = self.mail_client.cache
+        if cache is None:
+            return
+        with self._lock:
+            for name, result in self.results.items():
+                if result.password_uid is None or cache.has_message("password", name, result.password_subject):
+                    continue
+                if self._fetch("password", name):
+                    self.mail_client.cache_message("password")
+
+    def download_bill(self, platform: str) -> bool:
+        """Download the attachment (or WeChat link) of a platform's bill mail.
+
+        After ``start_downloads`` this waits for the platform's background
+        download and returns (or raises) its outcome.
+
+        Returns:
+            True if a bill mail was found and processed
+        """
+        result = self.results[platform]
+        event = self._downloaded.get(platform)
+        if event is not None:
+            event.wait()
+            if result.bill_error is not None:
+                raise result.bill_error
+            return bool(result.bill_downloaded)
+        return self._download(platform)
+
+    def _download(self, platform: str) -> bool:
+        if self.results[platform].bill_uid is None:
+            return False
+        with self._lock:
+            if not self._fetch("bill", platform):
+                return False
+            return bool(self.mail_client.fetch_mail_attachment())
+
+    def start_downloads(self, logout: bool = True):
+        """Download the bill of every platform whose password mail was found
+        in a background thread, in registration order.
+
+        ``download_bill`` waits for a platform's own bill only, so the first
+        platform can be uploaded while the others are still downloading.
+
+        Args:
+            logout: Log the mail client out once every bill is downloaded
+        """
+        for platform, result in self.results.items():
+            if result.complete:  # otherwise the import stops before the download
+                self._downloaded[platform] = threading.Event()
+        self._download_thread = threading.Thread(
+            target=self._download_all, args=(logout,), name="bill-downloads", daemon=True
+        )
+        self._download_thread.start()
+
+    def _download_all(self, logout: bool):
+        try:
+            for platform, event in self._downloaded.items():
+                result = self.results[platform]
+                try:
+                    result.bill_downloaded = self._download(platform)
+                except Exception as e:
+                    result.bill_error = e
+                finally:
+                    event.set()
+        finally:
+            if logout:
+                self.logger.info("All bill mails downloaded, logging out of the mail server")
+                with self._lock:
+                    self.mail_client.close()
+                    self._logged_out = True
+
+    def close(self, logout: bool = True):
+        """Log out of the shared session and close the index.
+        
+        Args:
+            logout: Also log the mail client out (False when the caller keeps using it)
+        """
+        if self._download_thread is not None:
+            self._download_thread.join()
+        with self._lock:
+            if logout and not self._logged_out:
+                self.mail_client.close()
+            if self.index is not None:
+                self.index.close()
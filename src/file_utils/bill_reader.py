@@ -0,0 +1,212 @@
+"""Read the bill inside a downloaded archive without extracting it to disk."""
+
+import csv
+import io
+import shutil
+import time
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from src.adapters.base import PaymentAdapter
+from src.file_utils.csv_transformer import CsvTransformer
+from src.file_utils.unzip_att import open_member, select_bill_member
+from src.file_utils.xlsx_reader import iter_bill_rows
+from src.utils.logger import get_logger
+
+def _is_excel(member: zipfile.ZipInfo) -> bool:
+    return Path(member.filename).suffix.lower() == ".xlsx"
+
+
+class LineStream(io.TextIOBase):
+    """Read-only text stream over an iterable of lines.
+
+    Lets ``pd.read_csv`` consume lines as they are produced, so a bill is
+    never held in memory as one string.
+    """
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            data, self._buffer = self._buffer + "".join(self._lines), ""
+            return data
+        chunks, length = [self._buffer], len(self._buffer)
+        while length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = "".join(chunks)
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        while "\n" not in self._buffer:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        end = self._buffer.find("\n") + 1 or len(self._buffer)
+        line, self._buffer = self._buffer[:end], self._buffer[end:]
+        return line
+
+
+class BillReader:
+    """Stream the bill member of a platform's zip archive into the standard CSV layout.
+
+    The member is decrypted and decoded on the fly, the preamble before the
+    "交易时间" header is skipped, and the result is handed to the parser as a
+    text stream (CSV bills) or as records read from the sheet (Excel bills).
+    Nothing is written to disk unless ``keep_dir`` is given, in which case the
+    extracted member and the standard CSV are kept there for debugging,
+    exactly like the file-based pipeline used to leave them.
+    """
+
+    def __init__(
+        self,
+        archive: str | Path,
+        password: Optional[str],
+        adapter: PaymentAdapter,
+        keep_dir: Optional[str | Path] = None,
+        standard_csv: Optional[str | Path] = None,
+    ):
+        """Initialize the reader.
+
+        Args:
+            archive: Zip archive downloaded from the bill mail
+            password: Archive password (None if it is not encrypted)
+            adapter: Payment platform adapter
+            keep_dir: Directory receiving the extracted member (optional)
+            standard_csv: Path receiving the standard CSV (optional)
+        """
+        self.archive = Path(archive)
+        self.password = password.encode() if password else None
+        self.adapter = adapter
+        self.keep_dir = Path(keep_dir) if keep_dir else None
+        self.standard_csv = Path(standard_csv) if standard_csv else None
+        self.logger = get_logger()
+
+    def _member(self, members: List[zipfile.ZipInfo]) -> zipfile.ZipInfo:
+        """Return the bill inside the archive, see ``select_bill_member``."""
+        return select_bill_member(members, self.adapter.get_bill_file_prefix())
+
+    def verify(self) -> str:
+        """Check that the archive holds a bill the password opens, and return its name.
+
+        Only the encryption header of the member is read.
+        """
+        with open_member(self.archive, self._member) as (zf, member, method):
+            with zf.open(member, pwd=self.password):
+                pass
+        self.logger.info(f"Found {member.filename} in {self.archive.name} (encryption: {method})")
+        return member.filename
+
+    def _records(self, zf: zipfile.ZipFile, member: zipfile.ZipInfo) -> Iterator[Tuple]:
+        """Yield the header and records of an Excel bill, see ``iter_bill_rows``."""
+        # openpyxl seeks inside the workbook, which a ZipExtFile can only do by
+        # decrypting again from the start: buffer the (compressed) workbook once
+        yield from iter_bill_rows(io.BytesIO(zf.read(member, pwd=self.password)))
+
+    def _raw_lines(self, zf: zipfile.ZipFile, member: zipfile.ZipInfo) -> Iterator[str]:
+        """Yield the lines of the bill as CSV text, Excel bills from the header row on."""
+        if _is_excel(member):
+            text = io.StringIO()
+            writer = csv.writer(text, lineterminator="\n")
+            for record in self._records(zf, member):
+                writer.writerow(record)
+                yield text.getvalue()
+                text.seek(0)
+                text.truncate()
+            return
+        with zf.open(member, pwd=self.password) as raw:
+            yield from io.TextIOWrapper(raw, encoding=self.adapter.get_csv_encoding(), newline="")
+
+    def _keep(self, lines: Iterable[str]) -> Iterator[str]:
+        """Copy the standard lines to ``standard_csv`` while they pass through."""
+        with open(self.standard_csv, "w", encoding="utf-8", newline="") as f:
+            for line in lines:
+                f.write(line)
+                yield line
+        self.logger.info(f"Kept standard CSV: {self.standard_csv}")
+
+    def _keep_records(self, records: Iterable[Tuple]) -> Iterator[Tuple]:
+        """Write the records to ``standard_csv`` while they pass through."""
+        with open(self.standard_csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            for record in records:
+                writer.writerow(record)
+                yield record
+        self.logger.info(f"Kept standard CSV: {self.standard_csv}")
+
+    def _timed(self, rows: Iterable, member: zipfile.ZipInfo, method: str) -> Iterator:
+        """Pass the rows through and log how long reading the member took."""
+        started = time.perf_counter()
+        yield from rows
+        self.logger.info(
+            f"Read {member.filename} ({member.file_size} bytes, encryption: {method}) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    @contextmanager
+    def _open(self) -> Iterator[Tuple[zipfile.ZipFile, zipfile.ZipInfo, str]]:
+        """Open the bill member, keeping a copy of it in ``keep_dir`` if requested.
+
+        The decryption backend is chosen from the archive's central directory
+        (see ``open_member``), so the member is decrypted exactly once.
+        """
+        with open_member(self.archive, self._member) as (zf, member, method):
+            self.logger.info(f"Reading {member.filename} from {self.archive.name} in memory")
+            if self.keep_dir is not None:
+                self.keep_dir.mkdir(parents=True, exist_ok=True)
+                with zf.open(member, pwd=self.password) as src, open(
+                    self.keep_dir / Path(member.filename).name, "wb"
+                ) as dst:
+                    shutil.copyfileobj(src, dst)
+                self.logger.info(f"Kept extracted bill: {self.keep_dir / Path(member.filename).name}")
+            yield zf, member, method
+
+    @contextmanager
+    def open_standard(self) -> Iterator[LineStream]:
+        """Open the bill as a stream of standard CSV text, header line first."""
+        with self._open() as (zf, member, method):
+            lines = CsvTransformer.iter_standard_lines(self._timed(self._raw_lines(zf, member), member, method))
+            if self.standard_csv is not None:
+                lines = self._keep(lines)
+            yield LineStream(lines)
+
+    def read_frame(self, dtype: Optional[Dict[str, type]] = None) -> pd.DataFrame:
+        """Parse the bill into a DataFrame of its standard columns.
+
+        CSV bills are parsed from ``open_standard``. Excel bills skip the CSV
+        text altogether: the records streamed from the sheet are put into the
+        frame directly.
+
+        Args:
+            dtype: Column types, as for ``pd.read_csv`` (optional)
+        """
+        with self._open() as (zf, member, method):
+            if not _is_excel(member):
+                lines = CsvTransformer.iter_standard_lines(self._timed(self._raw_lines(zf, member), member, method))
+                if self.standard_csv is not None:
+                    lines = self._keep(lines)
+                return pd.read_csv(LineStream(lines), encoding="utf-8", dtype=dtype)
+
+            records = self._timed(self._records(zf, member), member, method)
+            if self.standard_csv is not None:
+                records = self._keep_records(records)
+            header = next(records)
+            frame = pd.DataFrame.from_records(records, columns=header)
+        for column, kind in (dtype or {}).items():
+            if column in frame and kind is str:
+                frame[column] = frame[column].map(lambda value: value if value is None else str(value))
+        return frame
@@ -1,38 +1,29 @@
 # 另外因为是导出账单，可能出现日期与上次导入Notion有重复的情况，
-# 这里可以在 alipay_raw.csv 中直接删除某一些日期。当然你也可以用程序进行筛选
+# 已上传的交易会记录在本地账本 data/state/ledger.sqlite3 中，再次导入时自动跳过。
 
 import re
-from pathlib import Path
-from src.adapters.base import PaymentAdapter
-from src.utils.logger import get_logger
 
 
-class CsvTransformer:
-    def __init__(self, adapter: PaymentAdapter, path_raw: str | Path, path_std: str | Path):
-        self.adapter = adapter
-        self.path_raw = Path(path_raw)
-        self.path_std = Path(path_std)
-        self.encoding = adapter.get_csv_encoding()
-        self.logger = get_logger()
-
-    def transform_to_standard_csv(self):
-        """读取原始文件，截取并得到新的文件"""
-
-        with open(self.path_raw, encoding=self.encoding, newline="") as f:
-            lines = f.readlines()
-            for line in lines:
-                if line.startswith("交易时间"):
-                    with open(
-                        self.path_std, "w", encoding="utf-8", newline=""
-                    ) as f2:  # encoding="utf-8"为便于读写
-                        # 将该行之后的所有行写入新文件并且用re删除每一行中的空格
-                        f2.writelines(
-                            re.sub(r"\s+,", ",", line)
-                            for line in lines[lines.index(line) :]
-                        )
-
-        self.logger.info(
-            f"Transformed CSV to standard format: {self.path_std}"
-        )
+# 字段末尾的空白(如微信订单号后补齐用的制表符), 换行符除外
+_PADDING = re.compile(r"[^\S\r\n]+(?=,|\r?\n|$)")
 
 
+class CsvTransformer:
+    @staticmethod
+    def iter_standard_lines(lines):
+        """从表头"交易时间"所在行开始逐行输出, 并删除字段末尾补齐的空白
+
+        只遍历一次, 不保留已读过的行, 内存占用与文件大小无关.
+
+        Raises:
+            ValueError: 文件中没有以"交易时间"开头的表头行
+        """
+        lines = iter(lines)
+        for line in lines:
+            if line.startswith("交易时间"):
+                yield _PADDING.sub("", line)
+                break
+        else:
+            raise ValueError('Header line starting with "交易时间" not found, not a bill export?')
+        for line in lines:
+            yield _PADDING.sub("", line)
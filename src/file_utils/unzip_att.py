@@ -1,36 +1,132 @@
 from pathlib import Path
 from datetime import datetime
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
+import struct
 import zipfile
 import pyzipper
+from src.adapters.base import PaymentAdapter
 from src.utils.logger import get_logger
 
+ZIP_FLAG_ENCRYPTED = 0x1
+ZIP_AES_EXTRA_ID = 0x9901
+ZIP_AES_COMPRESSION = 99
+# 标准zipfile能解压的压缩方法
+ZIPFILE_COMPRESSION = (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA)
+
+# 压缩包中可以读取的账单格式
+BILL_SUFFIXES = (".csv", ".xlsx")
+
+
+def _extra_fields(extra: bytes) -> Iterator[Tuple[int, bytes]]:
+    """Yield (header id, data) of the extra fields of a central directory entry."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<HH", extra, offset)
+        yield header_id, extra[offset + 4:offset + 4 + size]
+        offset += 4 + size
+
+
+def zip_method(info: zipfile.ZipInfo) -> str:
+    """检查ZIP成员的加密方式, 只读中央目录, 不解密
+
+    Returns:
+        "none", "zipcrypto" 或 "aes"
+
+    Raises:
+        zipfile.BadZipFile: 如果AES扩展字段缺失或压缩方法无法解压
+    """
+    if not info.flag_bits & ZIP_FLAG_ENCRYPTED:
+        method, compress_type = "none", info.compress_type
+    elif info.compress_type == ZIP_AES_COMPRESSION:
+        # WinZip AES: 实际的压缩方法在0x9901扩展字段的最后两个字节
+        aes = dict(_extra_fields(info.extra)).get(ZIP_AES_EXTRA_ID)
+        if aes is None or len(aes) < 7:
+            raise zipfile.BadZipFile(f"{info.filename}: AES加密但缺少0x9901扩展字段")
+        method, compress_type = "aes", struct.unpack_from("<H", aes, 5)[0]
+    else:
+        method, compress_type = "zipcrypto", info.compress_type
+    if compress_type not in ZIPFILE_COMPRESSION:
+        raise zipfile.BadZipFile(f"{info.filename}: 不支持的压缩方法: {compress_type}")
+    return method
+
+
+def select_bill_member(members: List[zipfile.ZipInfo], prefix: str) -> zipfile.ZipInfo:
+    """从ZIP成员中选出账单, 优先选择文件名以平台账单前缀开头的成员
+
+    Args:
+        members: ZIP的成员列表
+        prefix: 平台账单文件名前缀, 见 ``PaymentAdapter.get_bill_file_prefix``
+
+    Raises:
+        FileNotFoundError: 如果没有csv或xlsx成员
+    """
+    candidates = [
+        info for info in members
+        if not info.is_dir() and Path(info.filename).suffix.lower() in BILL_SUFFIXES
+    ]
+    if not candidates:
+        raise FileNotFoundError("No bill file in the archive")
+    return next((info for info in candidates if Path(info.filename).name.startswith(prefix)), candidates[0])
+
+
+@contextmanager
+def open_member(
+    zip_path, select: Callable[[List[zipfile.ZipInfo]], zipfile.ZipInfo]
+) -> Iterator[Tuple[zipfile.ZipFile, zipfile.ZipInfo, str]]:
+    """按中央目录选好解压后端再打开ZIP, 而不是逐个尝试
+
+    未加密和ZipCrypto成员用标准zipfile, 只有AES成员才用pyzipper.
+
+    Args:
+        zip_path: ZIP文件路径
+        select: 从成员列表中选出要读取的成员
+
+    Yields:
+        (打开的ZIP, 选中的成员, 加密方式)
+    """
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        member = select(zip_ref.infolist())
+        method = zip_method(member)
+        if method != "aes":
+            yield zip_ref, member, method
+            return
+    with pyzipper.AESZipFile(zip_path, "r") as zip_ref:
+        yield zip_ref, zip_ref.getinfo(member.filename), method
+
 
 class FileExtractor:
-    def __init__(
-        self,
-        path_attachment_file,
-        path_target_folder,
-        attachment_password,
-        payment_platform,
-    ):
+    """Locate the bill archives saved from the mails; they are read by BillReader."""
+
+    def __init__(self, path_attachment_file, adapter: PaymentAdapter):
         self.attachment_path = path_attachment_file
-        self.target_folder_path = path_target_folder
-        self.attachment_password = attachment_password
-        self.payment_platform = payment_platform
+        self.adapter = adapter
         self.logger = get_logger()
 
-    def search_files(self):
-        text_start = {"alipay": "支付宝交易明细", "wechatpay": "微信支付账单"}
+    def archives(self) -> List[Path]:
+        """Return every bill archive of the platform, oldest first."""
         base_path = Path(self.attachment_path)
-        base_path.mkdir(parents=True, exist_ok=True)
-
+        if not base_path.is_dir():
+            return []
+        prefix = self.adapter.get_bill_file_prefix()
         zip_files = [
             f
             for f in base_path.iterdir()
-            if f.is_file() and (f.suffix == ".zip") and f.name.startswith(text_start[self.payment_platform])
+            if f.is_file() and f.suffix.lower() == ".zip" and f.name.startswith(prefix)
         ]
-        latest_file = max(zip_files, key=lambda f: f.stat().st_mtime)
-        return latest_file
+        return sorted(zip_files, key=lambda f: f.stat().st_mtime)
+
+    def search_files(self):
+        """Return the newest bill archive of the platform.
+
+        Raises:
+            ValueError: If there is none
+        """
+        Path(self.attachment_path).mkdir(parents=True, exist_ok=True)
+        zip_files = self.archives()
+        if not zip_files:
+            raise ValueError(f"No {self.adapter.platform_name} bill archive in {self.attachment_path}")
+        return zip_files[-1]
 
     @staticmethod
     def extract_date_from_filename(filename):
@@ -40,92 +136,3 @@ class FileExtractor:
         ]  # Assumes filename format is 'alipay_record_YYYYMMDD_HHMMSS.csv'
         # print(date_str)
         return datetime.strptime(date_str, "%Y%m%d")
-
-    def check_zip_compatibility(self, zip_path):
-        """检查ZIP文件是否可以用标准zipfile模块处理"""
-        try:
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                # 检查所有文件的压缩方法
-                for info in zip_ref.infolist():
-                    if info.compress_type not in [0, 8]:  # ZIP_STORED, ZIP_DEFLATED
-                        return False, f"不支持的压缩方法: {info.compress_type}"
-                return True, "兼容"
-        except Exception as e:
-            return False, str(e)
-
-    def extract_with_zipfile(self, zip_path, file_name):
-        """使用标准zipfile解压"""
-        try:
-            with zipfile.ZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(
-                    self.target_folder_path,
-                    pwd=(
-                        self.attachment_password.encode()
-                        if self.attachment_password
-                        else None
-                    ),
-                )
-            return True, f"Successfully extracted {file_name} using zipfile"
-        except Exception as e:
-            return False, f"zipfile extraction failed: {e}"
-
-    def extract_with_pyzipper(self, zip_path, file_name):
-        """使用pyzipper解压不兼容的ZIP文件"""
-        try:
-            with pyzipper.AESZipFile(zip_path, "r") as zip_ref:
-                zip_ref.extractall(
-                    self.target_folder_path,
-                    pwd=(
-                        self.attachment_password.encode()
-                        if self.attachment_password
-                        else None
-                    ),
-                )
-            return True, f"Successfully extracted {file_name} using pyzipper (AES)"
-        except Exception as e:
-            # 如果AES失败，尝试传统ZIP
-            try:
-                with pyzipper.ZipFile(zip_path, "r") as zip_ref:
-                    zip_ref.extractall(
-                        self.target_folder_path,
-                        pwd=(
-                            self.attachment_password.encode()
-                            if self.attachment_password
-                            else None
-                        ),
-                    )
-                return True, f"Successfully extracted {file_name} using pyzipper"
-            except Exception as e2:
-                return (
-                    False,
-                    f"pyzipper extraction failed: AES error: {e}, Standard error: {e2}",
-                )
-
-    def unzip_earliest_file(self, files):
-        if not files:
-            self.logger.warning("No zip files found in directory")
-            return "No zip files found in directory."
-
-        latest_file = self.search_files()
-        zip_path = latest_file
-        self.logger.info(f"Attempting to extract: {zip_path}")
-        # 尝试用标准zipfile解压
-        success, message = self.extract_with_zipfile(zip_path, latest_file)
-        if success:
-            self.logger.info(message)
-            return message
-        else:
-            self.logger.warning(f"zipfile extraction failed: {message}")
-
-        # 如果标准zipfile失败，尝试pyzipper
-        success, message = self.extract_with_pyzipper(zip_path, latest_file)
-        if success:
-            self.logger.info(message)
-            return message
-        else:
-            self.logger.error(f"pyzipper extraction failed: {message}")
-
-        self.logger.error("No zip files could be extracted with any method")
-        return "No zip files could be extracted with any method."
-
-
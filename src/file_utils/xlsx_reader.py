@@ -0,0 +1,68 @@
+"""Stream the rows of an Excel bill, starting at its "交易时间" header row."""
+
+from datetime import date, datetime, time
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from openpyxl import load_workbook
+
+HEADER_START = "交易时间"
+
+
+def _cell(value) -> Optional[object]:
+    """Normalize a cell value the way read_excel -> to_csv -> read_csv would see it.
+
+    Dates become the text pandas writes for them, integral floats become
+    ints, and trailing spaces are removed like ``CsvTransformer`` does.
+    Empty cells become None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.rstrip()
+        return value or None
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def iter_bill_rows(source: str | BinaryIO) -> Iterator[Tuple]:
+    """Yield the header and the records of the first sheet of an Excel bill.
+
+    The workbook is opened with openpyxl in read-only mode, so rows are
+    parsed from the sheet XML as they are iterated instead of being loaded
+    all at once. Rows before the "交易时间" header (the export summary) and
+    empty rows are skipped; every record is cut to the width of the header.
+
+    Args:
+        source: Path or seekable binary file of the .xlsx workbook
+
+    Yields:
+        The header tuple, then one tuple of normalized cell values per record
+
+    Raises:
+        ValueError: If the sheet has no "交易时间" header row
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        for row in rows:
+            if row and isinstance(row[0], str) and row[0].strip() == HEADER_START:
+                header = [_cell(value) for value in row]
+                while header and header[-1] is None:
+                    header.pop()
+                break
+        else:
+            raise ValueError(f"No {HEADER_START} header row in the workbook")
+
+        width = len(header)
+        yield tuple(header)
+        for row in rows:
+            record = tuple(_cell(value) for value in row[:width])
+            if any(value is not None for value in record):
+                yield record + (None,) * (width - len(record))
+    finally:
+        workbook.close()
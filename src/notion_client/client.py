@@ -1,35 +1,245 @@
-from notion_client import Client
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from dataclasses import fields
+from typing import Dict, Optional
+
+from notion_client import AsyncClient, Client
+from notion_client.client import ClientOptions
 from src.adapters.base import PaymentAdapter
+from src.notion_client.retry import RetryPolicy
 from src.utils.logger import get_logger
+from src.utils.rate_limiter import TokenBucket
+
+# notion-client>=3 retries 429/5xx by itself. Retries are owned by
+# NotionUploader instead, so Retry-After throttles every worker and
+# exhausted rows end up in the dead-letter file.
+_SDK_OPTIONS = {"retry": False} if "retry" in {f.name for f in fields(ClientOptions)} else {}
+
+# Optional select property receiving the bill's 交易状态 / 当前状态
+STATUS_PROPERTY = "Status"
 
 
 class NotionClient:
-    def __init__(self, data_source_id, token, adapter: PaymentAdapter):
+    def __init__(self, data_source_id, token, adapter: PaymentAdapter, base_url: Optional[str] = None):
+        """Initialize the client.
+
+        Args:
+            data_source_id: Notion data source receiving the pages
+            token: Notion integration token
+            adapter: Payment platform adapter
+            base_url: API root to send requests to instead of https://api.notion.com,
+                e.g. a local fake_server for load testing (optional)
+        """
         self.data_source_id = data_source_id
         self.token = token
-        self.client: Client = Client(auth=token)
+        self.sdk_options = dict(_SDK_OPTIONS, base_url=base_url.rstrip("/")) if base_url else _SDK_OPTIONS
+        self.client: Client = Client(auth=token, **self.sdk_options)
+        self.async_client: Optional[AsyncClient] = None
         self.adapter = adapter
+        # Whether payloads carry STATUS_PROPERTY, see detect_status_property
+        self.status_property = False
         self.logger = get_logger()
 
-    def create_page(self, properties):
-        """Create a new page in the data_source"""
-
+    @asynccontextmanager
+    async def async_session(self):
+        """Open an AsyncClient bound to the running event loop for create_page_async."""
+        self.async_client = AsyncClient(auth=self.token, **self.sdk_options)
         try:
-            self.client.pages.create(
-                # icon = {
-                #     "external": {
-                #         "url": icon_url  # 使用上传文件的 URL 作为图标
-                #     }
-                # },    # 我个人没有这个需求,如果有,可以加上
-                # cover # 也没有需求
-                parent={"data_source_id": self.data_source_id},
-                properties=properties,
-                # children=blocks,  # 不要children
+            yield self.async_client
+        finally:
+            await self.async_client.aclose()
+            self.async_client = None
+
+    def create_page(self, properties) -> str:
+        """Create a new page in the data_source
+
+        Returns:
+            ID of the created page
+
+        Raises:
+            Exception: Any API or network error, for the caller to classify and retry
+        """
+
+        response = self.client.pages.create(
+            # icon = {
+            #     "external": {
+            #         "url": icon_url  # 使用上传文件的 URL 作为图标
+            #     }
+            # },    # 我个人没有这个需求,如果有,可以加上
+            # cover # 也没有需求
+            parent={"data_source_id": self.data_source_id},
+            properties=properties,
+            # children=blocks,  # 不要children
+        )
+        self.logger.info("Page created successfully | 上传成功")
+        return response["id"]
+
+    async def create_page_async(self, properties) -> str:
+        """Create a new page in the data_source through the AsyncClient.
+
+        Must be awaited inside ``async_session()``.
+
+        Returns:
+            ID of the created page
+
+        Raises:
+            Exception: Any API or network error, for the caller to classify and retry
+        """
+        response = await self.async_client.pages.create(
+            parent={"data_source_id": self.data_source_id},
+            properties=properties,
+        )
+        self.logger.info("Page created successfully | 上传成功")
+        return response["id"]
+
+    def update_page(self, page_id, properties) -> str:
+        """Update properties of an existing page
+
+        Returns:
+            ID of the updated page
+
+        Raises:
+            Exception: Any API or network error, for the caller to classify and retry
+        """
+        self.client.pages.update(page_id, properties=properties)
+        self.logger.info("Page updated successfully | 更新成功")
+        return page_id
+
+    async def update_page_async(self, page_id, properties) -> str:
+        """Update properties of an existing page through the AsyncClient.
+
+        Must be awaited inside ``async_session()``.
+        """
+        await self.async_client.pages.update(page_id, properties=properties)
+        self.logger.info("Page updated successfully | 更新成功")
+        return page_id
+
+    def _transaction_filter(self, transaction_key):
+        # transaction_key falls back to the merchant order number, so match either
+        return {
+            "and": [
+                {
+                    "or": [
+                        {"property": "Transaction Number", "rich_text": {"equals": transaction_key}},
+                        {"property": "Merchant Tracking Number", "rich_text": {"equals": transaction_key}},
+                    ]
+                },
+                {"property": "From", "select": {"equals": self.adapter.get_notion_display_name()}},
+            ]
+        }
+
+    def find_page(self, transaction_key) -> Optional[str]:
+        """Return the ID of the page holding a transaction key, or None if there is none.
+
+        The key is looked up in both the Transaction Number and the Merchant
+        Tracking Number property, like ``transaction_key`` builds it.
+        """
+        response = self.client.data_sources.query(
+            self.data_source_id,
+            filter=self._transaction_filter(transaction_key),
+            page_size=1,
+        )
+        results = response.get("results", [])
+        return results[0]["id"] if results else None
+
+    async def find_page_async(self, transaction_key) -> Optional[str]:
+        """Async variant of find_page, to be awaited inside ``async_session()``."""
+        response = await self.async_client.data_sources.query(
+            self.data_source_id,
+            filter=self._transaction_filter(transaction_key),
+            page_size=1,
+        )
+        results = response.get("results", [])
+        return results[0]["id"] if results else None
+
+    def detect_status_property(
+        self, rate_limiter: Optional[TokenBucket] = None, retry_policy: Optional[RetryPolicy] = None
+    ) -> bool:
+        """Write the transaction status only if the data source has a "Status" select.
+
+        Older copies of the template have no such property, and Notion rejects
+        pages with unknown properties, so the schema is checked once first.
+        """
+        retry_policy = retry_policy or RetryPolicy()
+        schema = retry_policy.call(
+            self.client.data_sources.retrieve, self.data_source_id, rate_limiter=rate_limiter
+        )
+        prop = schema.get("properties", {}).get(STATUS_PROPERTY, {})
+        self.status_property = prop.get("type") == "select"
+        if not self.status_property:
+            self.logger.info(
+                f"Data source has no {STATUS_PROPERTY} select property, transaction status is not written"
             )
-            self.logger.info("Page created successfully | 上传成功")
-        except Exception as e:
-            self.logger.error(f"Failed to create page: {e}")
-            self.logger.warning("Upload failed, skipping | 上传失败,自动跳过,请自行检查")
+        return self.status_property
+
+    def fetch_existing_transactions(
+        self,
+        start_date: str,
+        end_date: str,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> Dict[str, Dict[str, str]]:
+        """Collect the transactions of this platform already in the data source.
+
+        Pages are queried 100 at a time, filtered to this platform and the
+        given date range, and only the Transaction Number, Merchant Tracking
+        Number, From and Date properties are returned.
+
+        Args:
+            start_date: First date to include ('YYYY-MM-DD')
+            end_date: Last date to include ('YYYY-MM-DD')
+            rate_limiter: Token bucket pacing the query calls (optional)
+            retry_policy: Retry policy for throttled/transient failures (defaults to RetryPolicy())
+
+        Returns:
+            Dict mapping transaction key to {"page_id": ..., "date": ...}
+        """
+        retry_policy = retry_policy or RetryPolicy()
+        wanted = ("Transaction Number", "Merchant Tracking Number", "From", "Date")
+        schema = retry_policy.call(
+            self.client.data_sources.retrieve, self.data_source_id, rate_limiter=rate_limiter
+        )
+        # filter_properties takes property IDs, not names
+        property_ids = [
+            schema["properties"][name]["id"] for name in wanted if name in schema.get("properties", {})
+        ]
+        query_filter = {
+            "and": [
+                {"property": "From", "select": {"equals": self.adapter.get_notion_display_name()}},
+                {"property": "Date", "date": {"on_or_after": start_date}},
+                {"property": "Date", "date": {"on_or_before": end_date}},
+            ]
+        }
+
+        existing = {}
+        cursor = None
+        while True:
+            kwargs = {"filter": query_filter, "filter_properties": property_ids, "page_size": 100}
+            if cursor:
+                kwargs["start_cursor"] = cursor
+            response = retry_policy.call(
+                self.client.data_sources.query, self.data_source_id, rate_limiter=rate_limiter, **kwargs
+            )
+            for page in response.get("results", []):
+                properties = page.get("properties", {})
+                key = self._plain_text(properties, "Transaction Number") or self._plain_text(
+                    properties, "Merchant Tracking Number"
+                )
+                if key:
+                    date = (properties.get("Date", {}).get("date") or {}).get("start", "")
+                    existing[key] = {"page_id": page["id"], "date": date}
+            if not response.get("has_more"):
+                break
+            cursor = response.get("next_cursor")
+
+        self.logger.info(f"Found {len(existing)} existing {self.adapter.platform_name} pages in Notion")
+        return existing
+
+    @staticmethod
+    def _plain_text(properties, name) -> str:
+        texts = properties.get(name, {}).get("rich_text", [])
+        return "".join(t.get("plain_text", "") for t in texts).strip()
 
     def notion_property(
         self,
@@ -44,6 +254,7 @@ class NotionClient:
         merchant_tracking_number="",
         payment_method="undefined",
         time_zone="Asia/Shanghai",
+        status=None,
     ):
         """将输入的内容转换为notion的json格式
         Args:
@@ -59,9 +270,49 @@ class NotionClient:
             payment_method (str, optional): 支付方式. Defaults to ""
             payment_platform (str, optional): 支付平台. Defaults to ""
             time_zone (str, optional): 时区. Defaults to "Asia/Shanghai"
+            status (str, optional): 交易状态, 写入Status属性. Defaults to None (不写入)
         Returns:
             properties: 返回notion的json格式
         """
+        return self._payload(
+            self.adapter.get_notion_display_name(),
+            time_zone,
+            content,
+            price,
+            transaction_type,
+            category,
+            date,
+            counterparty,
+            remarks,
+            transaction_number,
+            merchant_tracking_number,
+            payment_method,
+            status,
+        )
+
+    @staticmethod
+    def _payload(
+        platform_name,
+        time_zone,
+        content,
+        price,
+        transaction_type,
+        category,
+        date,
+        counterparty,
+        remarks,
+        transaction_number,
+        merchant_tracking_number,
+        payment_method,
+        status=None,
+    ):
+        """Build the properties of one page; shared by ``notion_property`` and ``build_payloads``.
+
+        Every call builds a new dict tree, so payloads can be changed (e.g. by
+        an upsert dropping unchanged properties) without affecting each other.
+        The status is hashed with the other properties, so an upsert picks up
+        a status change (e.g. a refund) like any other edit.
+        """
         properties = {
             "Name": {"title": [{"text": {"content": content}}]},
             "Price": {"number": price},
@@ -73,7 +324,7 @@ class NotionClient:
                     "time_zone": time_zone,  # 时区, 参见官方文档
                 }
             },
-            "From": {"select": {"name": self.adapter.get_notion_display_name()}},
+            "From": {"select": {"name": platform_name}},
             "Counterparty": {"rich_text": [{"text": {"content": counterparty}}]},
             "Remarks": {"rich_text": [{"text": {"content": remarks}}]},
             "Transaction Number": {
@@ -84,13 +335,45 @@ class NotionClient:
             },
             "Payment Method": {"select": {"name": payment_method}},
         }
+        if status:
+            properties[STATUS_PROPERTY] = {"select": {"name": status}}
         return properties
 
-    def process_row(self, row):
+    @staticmethod
+    def transaction_key(properties) -> str:
+        """Return the transaction number of a payload, falling back to the merchant order number."""
+        for name in ("Transaction Number", "Merchant Tracking Number"):
+            texts = properties.get(name, {}).get("rich_text", [])
+            key = "".join(str(t["text"]["content"]) for t in texts).strip()
+            if key:
+                return key
+        return ""
+
+    @staticmethod
+    def property_hashes(properties) -> Dict[str, str]:
+        """Return a short content hash of every property of a payload.
+
+        Comparing hashes against those stored for an imported row tells which
+        properties changed, without keeping the old payload around.
+        """
+        return {
+            name: hashlib.sha1(
+                json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+            ).hexdigest()[:16]
+            for name, value in properties.items()
+        }
+
+    @staticmethod
+    def transaction_time(properties) -> str:
+        """Return the Date start of a payload."""
+        return properties.get("Date", {}).get("date", {}).get("start", "")
+
+    def build_properties(self, row):
+        """Build the Notion properties payload for one processed row."""
         # Use adapter to get column mapping
         col_map = self.adapter.get_csv_column_mapping()
         
-        properties = self.notion_property(
+        return self.notion_property(
             row[col_map['content']],
             row[col_map['amount']],
             row[col_map['transaction_type']],
@@ -101,5 +384,32 @@ class NotionClient:
             row[col_map['transaction_id']],
             row[col_map['merchant_order_id']],
             row[col_map['payment_method']],
+            status=row[col_map['status']] if self.status_property else None,
+        )
+
+    def build_payloads(self, df):
+        """Build the properties payload of every row of a processed DataFrame.
+
+        The column mapping and platform name are resolved once and values are
+        read column by column, so no pandas Series is created per row. Produces
+        the same payloads as ``build_properties`` (see tests/bench_build_payloads.py).
+
+        Args:
+            df: Processed DataFrame
+
+        Yields:
+            (index, properties) pairs
+        """
+        col_map = self.adapter.get_csv_column_mapping()
+        keys = (
+            'content', 'amount', 'transaction_type', 'category', 'datetime',
+            'counterparty', 'remarks', 'transaction_id', 'merchant_order_id', 'payment_method',
         )
-        self.create_page(properties)
+        if self.status_property:
+            keys += ('status',)
+        columns = [df[col_map[key]].tolist() for key in keys]
+        platform_name = self.adapter.get_notion_display_name()
+        time_zone = "Asia/Shanghai"
+
+        for index, *values in zip(df.index.tolist(), *columns):
+            yield index, self._payload(platform_name, time_zone, *values)
@@ -0,0 +1,94 @@
+"""Persistent dead-letter queue for pages that could not be uploaded."""
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils.logger import get_logger
+
+
+class DeadLetterQueue:
+    """Append-only NDJSON file holding the exact payload of every failed page.
+
+    Each line is one JSON object::
+
+        {"failed_at": "...", "platform": "alipay", "attempts": 5,
+         "status": 429, "error": "...", "page_id": null, "properties": {...}}
+
+    ``claim()`` moves the pending records aside for a replay; rows that fail
+    again during the replay are appended to a fresh queue file, so nothing is
+    lost if the replay itself is interrupted.
+    """
+
+    def __init__(self, path: str | Path, platform: str):
+        self.path = Path(path)
+        self.platform = platform
+        self.claimed_path = self.path.with_name(self.path.name + ".replaying")
+        self._lock = threading.Lock()
+        self.logger = get_logger()
+
+    def push(self, properties: dict, error: Exception, attempts: int, page_id: Optional[str] = None):
+        """Persist one failed payload (flushed and fsynced before returning).
+
+        Args:
+            properties: Full property payload of the row
+            error: Last error raised for the row
+            attempts: Number of attempts made
+            page_id: Page that was being updated, if the row was an update
+        """
+        record = {
+            "failed_at": datetime.now().isoformat(timespec="seconds"),
+            "platform": self.platform,
+            "attempts": attempts,
+            "status": getattr(error, "status", None),
+            "error": f"{type(error).__name__}: {error}",
+            "page_id": page_id,
+            "properties": properties,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        self.logger.warning(f"Dead-lettered page after {attempts} attempt(s): {self.path}")
+
+    def claim(self) -> List[dict]:
+        """Take every pending record out of the queue for replay.
+
+        Records left behind by an interrupted replay are claimed again.
+
+        Returns:
+            List of dead-letter records
+        """
+        with self._lock:
+            if self.path.exists():
+                if self.claimed_path.exists():
+                    with open(self.path, encoding="utf-8") as src, open(
+                        self.claimed_path, "a", encoding="utf-8"
+                    ) as dst:
+                        dst.write(src.read())
+                    self.path.unlink()
+                else:
+                    os.replace(self.path, self.claimed_path)
+
+            if not self.claimed_path.exists():
+                return []
+            with open(self.claimed_path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+
+    def release_claim(self):
+        """Drop the claimed records once a replay has finished."""
+        with self._lock:
+            self.claimed_path.unlink(missing_ok=True)
+
+    def pending(self) -> int:
+        """Number of records waiting in the queue file."""
+        if not self.path.exists():
+            return 0
+        with open(self.path, encoding="utf-8") as f:
+            return sum(1 for line in f if line.strip())
@@ -0,0 +1,407 @@
+"""Local stand-in for the Notion API, for load testing the uploader offline.
+
+Implements the endpoints the importer uses:
+
+    POST  /v1/pages                       create a page
+    PATCH /v1/pages/{id}                  update a page's properties
+    GET   /v1/pages/{id}                  retrieve a page
+    GET   /v1/data_sources/{id}           retrieve the data source schema
+    POST  /v1/data_sources/{id}/query     query pages (filter + pagination)
+    GET   /stats                          request counters of this server
+
+Latency, rate limiting (429 with Retry-After), random throttling and 5xx
+errors are configurable, so retry and concurrency behaviour can be measured
+without network access. Pages are kept in memory only.
+
+Usage::
+
+    python -m src.notion_client.fake_server --port 8787 --latency 0.3 --rate-limit 3
+    python main.py --notion-base-url http://127.0.0.1:8787 push data/dry_run/...ndjson.gz
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from src.utils.logger import get_logger, setup_logger
+from src.utils.rate_limiter import TokenBucket
+
+# Schema returned by GET /v1/data_sources/{id}: the properties NotionClient writes
+SCHEMA_PROPERTIES = {
+    "Name": "title",
+    "Price": "number",
+    "Transaction Type": "select",
+    "Category": "select",
+    "Date": "date",
+    "From": "select",
+    "Counterparty": "rich_text",
+    "Remarks": "rich_text",
+    "Transaction Number": "rich_text",
+    "Merchant Tracking Number": "rich_text",
+    "Payment Method": "select",
+    "Status": "select",
+}
+
+# (status, Notion error code) of the injected server errors
+SERVER_ERRORS = (
+    (500, "internal_server_error"),
+    (503, "service_unavailable"),
+    (504, "gateway_timeout"),
+)
+
+_PAGE_PATH = re.compile(r"^/v1/pages/([^/]+)$")
+_DATA_SOURCE_PATH = re.compile(r"^/v1/data_sources/([^/]+)$")
+_QUERY_PATH = re.compile(r"^/v1/data_sources/([^/]+)/query$")
+
+
+class NotionAPIError(Exception):
+    """Error answered with a Notion-style error body."""
+
+    def __init__(self, status: int, code: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.retry_after = retry_after
+
+
+@dataclass
+class FakeNotionConfig:
+    """Behaviour of the fake server.
+
+    Attributes:
+        latency: Seconds added to every response
+        jitter: Random extra latency, uniform in [0, jitter]
+        rate_limit: Average requests/second before answering 429 (None: unlimited)
+        burst: Requests allowed in a burst above ``rate_limit``
+        throttle_rate: Fraction of requests answered 429 regardless of the rate
+        error_rate: Fraction of requests answered with a 5xx error
+        retry_after: Retry-After seconds sent with injected 429 responses
+        seed: Seed of the random error injection (optional)
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    rate_limit: Optional[float] = None
+    burst: int = 3
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeNotionState:
+    """In-memory pages and request counters shared by the handler threads."""
+
+    pages: Dict[str, dict] = field(default_factory=dict)
+    counters: Counter = field(default_factory=Counter)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def _with_plain_text(properties: dict) -> dict:
+    """Add the ``plain_text`` field Notion returns on title and rich_text items."""
+    result = {}
+    for name, value in properties.items():
+        value = dict(value)
+        for kind in ("title", "rich_text"):
+            if kind in value:
+                value[kind] = [
+                    {**item, "plain_text": item.get("text", {}).get("content", "")}
+                    for item in value[kind]
+                ]
+        result[name] = value
+    return result
+
+
+def _plain_text(value: dict, kind: str) -> str:
+    return "".join(item.get("plain_text", "") for item in value.get(kind, []))
+
+
+def _matches(page: dict, query_filter: Optional[dict]) -> bool:
+    """Evaluate the subset of Notion's filter language used by the importer."""
+    if not query_filter:
+        return True
+    if "and" in query_filter:
+        return all(_matches(page, f) for f in query_filter["and"])
+    if "or" in query_filter:
+        return any(_matches(page, f) for f in query_filter["or"])
+
+    value = page["properties"].get(query_filter.get("property"), {})
+    for kind in ("title", "rich_text"):
+        if kind in query_filter:
+            return _plain_text(value, kind) == query_filter[kind].get("equals")
+    if "select" in query_filter:
+        return (value.get("select") or {}).get("name") == query_filter["select"].get("equals")
+    if "number" in query_filter:
+        return value.get("number") == query_filter["number"].get("equals")
+    if "date" in query_filter:
+        start = (value.get("date") or {}).get("start")
+        if not start:
+            return False
+        condition = query_filter["date"]
+        # Compare on the precision of the filter value ('YYYY-MM-DD' compares days)
+        for operator, check in (
+            ("equals", lambda a, b: a == b),
+            ("on_or_after", lambda a, b: a >= b),
+            ("on_or_before", lambda a, b: a <= b),
+            ("after", lambda a, b: a > b),
+            ("before", lambda a, b: a < b),
+        ):
+            if operator in condition and not check(start[: len(condition[operator])], condition[operator]):
+                return False
+        return True
+    raise NotionAPIError(400, "validation_error", f"Unsupported filter: {json.dumps(query_filter)}")
+
+
+class FakeNotionHandler(BaseHTTPRequestHandler):
+    """Request handler; the server carries ``config``, ``state`` and ``rate_limiter``."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like api.notion.com
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def log_message(self, format, *args):
+        get_logger().debug(f"{self.address_string()} {format % args}")
+
+    def _dispatch(self, method: str):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        path = self.path.split("?", 1)[0]
+        state: FakeNotionState = self.server.state
+
+        if method == "GET" and path == "/stats":
+            with state.lock:
+                stats = dict(state.counters, pages=len(state.pages))
+            self._send_json(200, stats)
+            return
+
+        with state.lock:
+            state.counters["requests"] += 1
+        try:
+            self._inject_faults()
+            body = json.loads(raw_body) if raw_body else {}
+            status, response = self._route(method, path, body)
+        except NotionAPIError as e:
+            with state.lock:
+                state.counters[f"status_{e.status}"] += 1
+            headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after is not None else {}
+            self._send_json(
+                e.status,
+                {"object": "error", "status": e.status, "code": e.code, "message": str(e)},
+                headers,
+            )
+            return
+        except json.JSONDecodeError:
+            self._send_json(400, {"object": "error", "status": 400, "code": "invalid_json",
+                                  "message": "Error parsing JSON body."})
+            return
+        with state.lock:
+            state.counters[f"status_{status}"] += 1
+        self._send_json(status, response)
+
+    def _inject_faults(self):
+        """Apply the rate limit, latency and random errors of the server config."""
+        config: FakeNotionConfig = self.server.config
+        rng: random.Random = self.server.rng
+
+        if self.server.rate_limiter is not None:
+            wait = self.server.rate_limiter.try_acquire()
+            if wait:
+                raise NotionAPIError(429, "rate_limited", "You have been rate limited.", wait)
+        with self.server.rng_lock:
+            throttled = rng.random() < config.throttle_rate
+            failed = rng.random() < config.error_rate
+            delay = config.latency + rng.uniform(0, config.jitter)
+            server_error = rng.choice(SERVER_ERRORS)
+        if throttled:
+            raise NotionAPIError(429, "rate_limited", "You have been rate limited.", config.retry_after)
+        if delay > 0:
+            time.sleep(delay)
+        if failed:
+            status, code = server_error
+            raise NotionAPIError(status, code, "Injected server error.")
+
+    def _route(self, method: str, path: str, body: dict) -> Tuple[int, dict]:
+        if method == "POST" and path == "/v1/pages":
+            return 200, self._create_page(body)
+        match = _PAGE_PATH.match(path)
+        if match and method == "PATCH":
+            return 200, self._update_page(match.group(1), body)
+        if match and method == "GET":
+            return 200, self._response_page(self._get_page(match.group(1)))
+        match = _QUERY_PATH.match(path)
+        if match and method == "POST":
+            return 200, self._query(match.group(1), body)
+        match = _DATA_SOURCE_PATH.match(path)
+        if match and method == "GET":
+            return 200, self._data_source(match.group(1))
+        raise NotionAPIError(400, "invalid_request_url", f"Invalid request URL: {method} {path}")
+
+    def _create_page(self, body: dict) -> dict:
+        data_source_id = (body.get("parent") or {}).get("data_source_id")
+        if not data_source_id or not isinstance(body.get("properties"), dict):
+            raise NotionAPIError(400, "validation_error", "body.parent.data_source_id and body.properties are required.")
+        self._check_properties(body["properties"])
+        now = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        page = {
+            "object": "page",
+            "id": str(uuid.uuid4()),
+            "created_time": now,
+            "last_edited_time": now,
+            "parent": {"type": "data_source_id", "data_source_id": data_source_id},
+            "properties": _with_plain_text(body["properties"]),
+        }
+        with self.server.state.lock:
+            self.server.state.pages[page["id"]] = page
+        return self._response_page(page)
+
+    def _get_page(self, page_id: str) -> dict:
+        page = self.server.state.pages.get(page_id)
+        if page is None:
+            raise NotionAPIError(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        return page
+
+    @staticmethod
+    def _check_properties(properties: dict):
+        """Reject properties the data source does not have, like Notion does."""
+        for name in properties:
+            if name not in SCHEMA_PROPERTIES:
+                raise NotionAPIError(400, "validation_error", f"{name} is not a property that exists.")
+
+    def _update_page(self, page_id: str, body: dict) -> dict:
+        self._check_properties(body.get("properties") or {})
+        with self.server.state.lock:
+            page = self._get_page(page_id)
+            page["properties"].update(_with_plain_text(body.get("properties") or {}))
+            page["last_edited_time"] = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        return self._response_page(page)
+
+    def _query(self, data_source_id: str, body: dict) -> dict:
+        page_size = min(int(body.get("page_size") or 100), 100)
+        with self.server.state.lock:
+            pages = [
+                page for page in self.server.state.pages.values()
+                if page["parent"]["data_source_id"] == data_source_id
+                and _matches(page, body.get("filter"))
+            ]
+        start = 0
+        if body.get("start_cursor"):
+            ids = [page["id"] for page in pages]
+            if body["start_cursor"] not in ids:
+                raise NotionAPIError(400, "validation_error", "Invalid start_cursor.")
+            start = ids.index(body["start_cursor"])
+        results = pages[start:start + page_size]
+        has_more = start + page_size < len(pages)
+        return {
+            "object": "list",
+            "results": [self._response_page(page) for page in results],
+            "has_more": has_more,
+            "next_cursor": pages[start + page_size]["id"] if has_more else None,
+            "type": "page_or_data_source",
+        }
+
+    @staticmethod
+    def _data_source(data_source_id: str) -> dict:
+        return {
+            "object": "data_source",
+            "id": data_source_id,
+            "properties": {
+                name: {"id": f"p{i}", "name": name, "type": kind}
+                for i, (name, kind) in enumerate(SCHEMA_PROPERTIES.items())
+            },
+        }
+
+    @staticmethod
+    def _response_page(page: dict) -> dict:
+        return json.loads(json.dumps(page))
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def create_server(host: str = "127.0.0.1", port: int = 8787, config: Optional[FakeNotionConfig] = None):
+    """Create (but do not start) a fake Notion server.
+
+    Args:
+        host: Interface to listen on
+        port: Port to listen on (0 picks a free port)
+        config: Latency and fault injection settings (defaults to FakeNotionConfig())
+
+    Returns:
+        ThreadingHTTPServer; its ``state`` holds the created pages and counters
+    """
+    config = config or FakeNotionConfig()
+    server = ThreadingHTTPServer((host, port), FakeNotionHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.state = FakeNotionState()
+    server.rng = random.Random(config.seed)
+    server.rng_lock = threading.Lock()
+    server.rate_limiter = TokenBucket(config.rate_limit, config.burst) if config.rate_limit else None
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Notion API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency, up to this many seconds")
+    parser.add_argument("--rate-limit", type=float, help="requests/second before answering 429 (default: unlimited)")
+    parser.add_argument("--burst", type=int, default=3, help="burst size above --rate-limit (default: 3)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 5xx")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--seed", type=int, help="seed of the random fault injection")
+    args = parser.parse_args(argv)
+
+    logger = setup_logger()
+    config = FakeNotionConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = create_server(args.host, args.port, config)
+    logger.info(f"Fake Notion API listening on http://{args.host}:{server.server_port} ({config})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with server.state.lock:
+            counters = dict(server.state.counters)
+        logger.info(f"Served {counters.get('requests', 0)} requests, {len(server.state.pages)} pages: {counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Gzip-compressed NDJSON files of Notion page payloads."""
+
+import gzip
+import json
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+from src.utils.logger import get_logger
+
+
+class PayloadFile:
+    """Payloads produced by a dry run, to be inspected or pushed to Notion later.
+
+    Each line is one JSON object::
+
+        {"platform": "alipay", "row": 0, "properties": {...}}
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.logger = get_logger()
+
+    def write(self, platform: str, payloads: Iterable[Tuple[int, dict]]) -> int:
+        """Stream ``(row, properties)`` pairs into the file.
+
+        Returns:
+            Number of payloads written
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for row, properties in payloads:
+                record = {"platform": platform, "row": int(row), "properties": properties}
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                count += 1
+        self.logger.info(f"Wrote {count} payloads to {self.path}")
+        return count
+
+    def __iter__(self) -> Iterator[dict]:
+        """Yield the records of the file one at a time."""
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
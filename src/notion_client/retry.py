@@ -0,0 +1,86 @@
+"""Retry classification and backoff for Notion API calls."""
+
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+
+import httpx
+from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+from src.config import constants
+from src.utils.rate_limiter import TokenBucket
+
+# 409 is Notion's conflict_error ("try again"), 429 is rate_limited and the
+# 5xx codes are transient server-side failures. Anything else (validation,
+# auth, missing data source) will fail the same way on every attempt.
+RETRYABLE_STATUS_CODES = frozenset({409, 429, 500, 502, 503, 504})
+
+
+@dataclass
+class RetryPolicy:
+    """Decide whether a failed Notion call is retried and how long to wait."""
+
+    max_attempts: int = constants.NOTION_MAX_ATTEMPTS
+    base_delay: float = constants.NOTION_RETRY_BASE_DELAY
+    max_delay: float = constants.NOTION_RETRY_MAX_DELAY
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Return True for throttling, transient server errors and network failures."""
+        if isinstance(error, HTTPResponseError):
+            return error.status in RETRYABLE_STATUS_CODES
+        return isinstance(error, (RequestTimeoutError, httpx.TransportError))
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """Return the server-requested wait in seconds, if the response carried one.
+
+        Retry-After may be either a number of seconds or an HTTP date.
+        """
+        headers = getattr(error, "headers", None)
+        value = headers.get("retry-after") if headers is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter for the given 1-based attempt number."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def delay_for(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying after ``error`` on ``attempt``."""
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return self.backoff(attempt)
+
+    def call(self, fn: Callable, *args, rate_limiter: Optional[TokenBucket] = None, **kwargs):
+        """Call ``fn`` until it succeeds, raising once the error is permanent or attempts run out.
+
+        Each attempt is paced by ``rate_limiter`` when one is given.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.is_retryable(e) or attempt >= self.max_attempts:
+                    raise
+                delay = self.delay_for(e, attempt)
+                if rate_limiter is not None and self.retry_after(e) is not None:
+                    # The next acquire() waits for the paused bucket
+                    rate_limiter.pause(delay)
+                else:
+                    time.sleep(delay)
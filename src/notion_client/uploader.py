@@ -0,0 +1,239 @@
+"""Upload engine that pushes Notion page payloads sequentially or concurrently."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from src.config import constants
+from src.notion_client.client import NotionClient
+from src.notion_client.dead_letter import DeadLetterQueue
+from src.notion_client.retry import RetryPolicy
+from src.utils.logger import get_logger
+from src.utils.rate_limiter import TokenBucket
+
+
+@dataclass
+class UploadJob:
+    """One row to push to Notion.
+
+    By default a new page is created. With ``page_id`` set, that page is
+    updated with ``changes`` (or every property if ``changes`` is None).
+    With ``lookup_key`` set and no ``page_id``, the page is first looked up
+    by transaction number and created only if it does not exist.
+    """
+
+    row: int
+    properties: dict
+    page_id: Optional[str] = None
+    changes: Optional[dict] = None
+    lookup_key: Optional[str] = None
+
+
+@dataclass
+class UploadReport:
+    """Counts of one upload run.
+
+    ``retried`` counts rows that needed at least one retry before succeeding;
+    ``updated`` counts existing pages that were updated instead of created.
+    Both are included in ``uploaded``. ``unchanged`` counts rows the caller
+    skipped before upload because their page is already up to date.
+    """
+
+    processed: int = 0
+    uploaded: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
+class NotionUploader:
+    """Push property payloads to Notion through a NotionClient.
+
+    With ``async_mode`` enabled, a bounded pool of workers shares one
+    ``AsyncClient`` so requests overlap instead of waiting on each other's
+    round trip. Both modes draw from the same token bucket, which keeps the
+    request rate under Notion's quota.
+
+    Throttled, transient and network failures are retried with jittered
+    exponential backoff; a Retry-After header pauses the whole bucket. Rows
+    that still fail are written to the dead-letter queue.
+    """
+
+    def __init__(
+        self,
+        notion_client: NotionClient,
+        async_mode: bool = False,
+        workers: int = constants.NOTION_UPLOAD_WORKERS,
+        rate_limiter: Optional[TokenBucket] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        dead_letters: Optional[DeadLetterQueue] = None,
+        on_uploaded: Optional[Callable[[UploadJob, str], None]] = None,
+    ):
+        """Initialize the uploader.
+
+        Args:
+            notion_client: Client used to create pages
+            async_mode: Upload concurrently through the AsyncClient
+            workers: Number of concurrent upload workers in async mode
+            rate_limiter: Shared token bucket (a default Notion-rate bucket is created if omitted)
+            retry_policy: Retry classification and backoff (defaults to RetryPolicy())
+            dead_letters: Queue receiving rows that exhausted their retries (optional)
+            on_uploaded: Callback invoked with (job, page_id) after each successful upload
+        """
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        self.notion_client = notion_client
+        self.async_mode = async_mode
+        self.workers = workers
+        self.rate_limiter = rate_limiter or TokenBucket(
+            constants.NOTION_RATE_LIMIT, constants.NOTION_RATE_BURST
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letters = dead_letters
+        self.on_uploaded = on_uploaded
+        self.logger = get_logger()
+
+    def run(self, jobs: Iterable[UploadJob], report: Optional[UploadReport] = None) -> UploadReport:
+        """Upload every job.
+
+        Args:
+            jobs: Iterable of UploadJob
+            report: Report to add the counts to (a new one is created if omitted)
+
+        Returns:
+            UploadReport with uploaded, retried and dead-lettered counts
+        """
+        report = report or UploadReport()
+        if self.async_mode:
+            self.logger.info(f"Uploading with {self.workers} async workers")
+            asyncio.run(self._run_async(jobs, report))
+        else:
+            self._run_sync(jobs, report)
+        self.logger.info(
+            f"Upload finished: {report.uploaded}/{report.processed} uploaded, "
+            f"{report.retried} retried, {report.dead_lettered} dead-lettered"
+        )
+        return report
+
+    def _on_failure(self, job: UploadJob, error: Exception, attempt: int, report: UploadReport) -> Optional[float]:
+        """Classify a failed attempt.
+
+        Returns:
+            Seconds to sleep before the next attempt (0 after a Retry-After, which
+            pauses the shared bucket instead), or None if the row was given up on
+        """
+        if self.retry_policy.is_retryable(error) and attempt < self.retry_policy.max_attempts:
+            delay = self.retry_policy.delay_for(error, attempt)
+            self.logger.warning(
+                f"Notion request failed (attempt {attempt}/{self.retry_policy.max_attempts}), "
+                f"retrying in {delay:.1f}s: {error}"
+            )
+            if self.retry_policy.retry_after(error) is not None:
+                # The paused bucket makes the next acquire() wait, for every worker
+                self.rate_limiter.pause(delay)
+                return 0.0
+            return delay
+
+        self.logger.error(f"Failed to {'update' if job.page_id else 'create'} page: {error}")
+        report.dead_lettered += 1
+        if self.dead_letters is not None:
+            self.dead_letters.push(job.properties, error, attempt, page_id=job.page_id)
+        else:
+            self.logger.warning("Upload failed, skipping | 上传失败,自动跳过,请自行检查")
+        return None
+
+    def _on_success(self, job: UploadJob, page_id: str, attempt: int, report: UploadReport):
+        report.uploaded += 1
+        if attempt > 1:
+            report.retried += 1
+        if job.page_id:
+            report.updated += 1
+        if self.on_uploaded is not None:
+            self.on_uploaded(job, page_id)
+
+    def _send(self, job: UploadJob) -> str:
+        """Perform the API calls of one attempt, each paced by the token bucket."""
+        if job.lookup_key and not job.page_id:
+            self.rate_limiter.acquire()
+            job.page_id = self.notion_client.find_page(job.lookup_key)
+            job.lookup_key = None
+        self.rate_limiter.acquire()
+        if job.page_id:
+            changes = job.changes if job.changes is not None else job.properties
+            return self.notion_client.update_page(job.page_id, changes)
+        return self.notion_client.create_page(job.properties)
+
+    async def _send_async(self, job: UploadJob) -> str:
+        if job.lookup_key and not job.page_id:
+            await self.rate_limiter.acquire_async()
+            job.page_id = await self.notion_client.find_page_async(job.lookup_key)
+            job.lookup_key = None
+        await self.rate_limiter.acquire_async()
+        if job.page_id:
+            changes = job.changes if job.changes is not None else job.properties
+            return await self.notion_client.update_page_async(job.page_id, changes)
+        return await self.notion_client.create_page_async(job.properties)
+
+    def _run_sync(self, jobs: Iterable[UploadJob], report: UploadReport):
+        for job in jobs:
+            report.processed += 1
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    page_id = self._send(job)
+                except Exception as e:
+                    delay = self._on_failure(job, e, attempt, report)
+                    if delay is None:
+                        break
+                    if delay:
+                        time.sleep(delay)
+                else:
+                    self._on_success(job, page_id, attempt, report)
+                    break
+
+    async def _upload_async(self, job: UploadJob, report: UploadReport):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                page_id = await self._send_async(job)
+            except Exception as e:
+                delay = self._on_failure(job, e, attempt, report)
+                if delay is None:
+                    return
+                if delay:
+                    await asyncio.sleep(delay)
+            else:
+                self._on_success(job, page_id, attempt, report)
+                return
+
+    async def _run_async(self, jobs: Iterable[UploadJob], report: UploadReport):
+        # A bounded queue keeps the producer at most a few payloads ahead of the
+        # workers, so memory does not grow with the size of the bill.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def worker():
+            while True:
+                job = await queue.get()
+                try:
+                    if job is None:
+                        return
+                    await self._upload_async(job, report)
+                finally:
+                    queue.task_done()
+
+        async with self.notion_client.async_session():
+            tasks = [asyncio.create_task(worker()) for _ in range(self.workers)]
+            try:
+                for job in jobs:
+                    await queue.put(job)
+                    report.processed += 1
+                for _ in tasks:
+                    await queue.put(None)
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
@@ -0,0 +1,14 @@
+"""Local state that persists between import runs."""
+
+from src.state.ledger import TransactionLedger
+from src.state.checkpoint import CheckpointState, UploadCheckpoint, file_sha256
+from src.state.mail_index import MailboxState, MailIndex
+
+__all__ = [
+    "TransactionLedger",
+    "CheckpointState",
+    "UploadCheckpoint",
+    "file_sha256",
+    "MailboxState",
+    "MailIndex",
+]
@@ -0,0 +1,114 @@
+"""Crash-safe checkpoints of an in-progress upload."""
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Set
+
+from src.utils.logger import get_logger
+
+
+def file_sha256(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CheckpointState:
+    """Progress recorded by an earlier, unfinished upload."""
+
+    source_file: str
+    source_sha256: str
+    started_at: str
+    since: Optional[datetime] = None
+    completed_rows: Set[int] = field(default_factory=set)
+    completed_keys: Set[str] = field(default_factory=set)
+
+    @property
+    def cursor(self) -> int:
+        """Row position after the last completed row."""
+        return max(self.completed_rows) + 1 if self.completed_rows else 0
+
+
+class UploadCheckpoint:
+    """Append-only journal of the rows uploaded from one source file.
+
+    The first line identifies the source file and its SHA-256; each following
+    line records one completed row (its position in the source and its
+    transaction key). Every line is fsynced before the upload continues, and
+    a torn last line left by a crash is ignored on load.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.logger = get_logger()
+
+    def load(self) -> Optional[CheckpointState]:
+        """Read the checkpoint, or return None if there is none."""
+        if not self.path.exists():
+            return None
+        state = None
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # torn write from a crash: everything before it is valid
+                if state is None:
+                    state = CheckpointState(
+                        source_file=entry["source_file"],
+                        source_sha256=entry["source_sha256"],
+                        started_at=entry["started_at"],
+                        since=datetime.fromisoformat(entry["since"]) if entry.get("since") else None,
+                    )
+                    continue
+                state.completed_rows.add(entry["row"])
+                if entry["key"]:
+                    state.completed_keys.add(entry["key"])
+        return state
+
+    def start(self, source_file: str | Path, source_sha256: str, since: Optional[datetime] = None):
+        """Begin a new checkpoint for ``source_file``, discarding any previous one.
+
+        Args:
+            source_file: File the upload reads its rows from
+            source_sha256: SHA-256 of that file
+            since: Time filter the upload was started with, reused on resume
+        """
+        header = {
+            "source_file": str(source_file),
+            "source_sha256": source_sha256,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "since": since.isoformat(sep=" ") if since else None,
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def mark_done(self, row: int, key: str):
+        """Durably record that a row has been uploaded."""
+        line = json.dumps({"row": int(row), "key": key}, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        """Remove the checkpoint after the upload has completed."""
+        with self._lock:
+            self.path.unlink(missing_ok=True)
@@ -0,0 +1,159 @@
+"""Local SQLite ledger of transactions already imported into Notion."""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from src.utils.logger import get_logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS imported_transactions (
+    platform        TEXT NOT NULL,
+    transaction_key TEXT NOT NULL,
+    page_id         TEXT NOT NULL,
+    occurred_at     TEXT,
+    imported_at     TEXT NOT NULL,
+    property_hashes TEXT,
+    PRIMARY KEY (platform, transaction_key)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    platform              TEXT PRIMARY KEY,
+    last_transaction_time TEXT NOT NULL,
+    updated_at            TEXT NOT NULL
+);
+"""
+
+_WATERMARK_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class TransactionLedger:
+    """Record of every row successfully pushed to Notion.
+
+    Rows are keyed by platform and transaction number (falling back to the
+    merchant order number), together with the ID of the Notion page that was
+    created for them. Each platform also has a high-water mark: the latest
+    transaction time covered by a completed import. The ledger is safe to
+    share between threads.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit: every recorded row is durable as soon as record() returns.
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self.logger = get_logger()
+
+    def _migrate(self):
+        """Add columns introduced after a ledger file was first created."""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(imported_transactions)")}
+        if "property_hashes" not in columns:
+            self._conn.execute("ALTER TABLE imported_transactions ADD COLUMN property_hashes TEXT")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def imported_keys(self, platform: str) -> Set[str]:
+        """Return every transaction key already imported for a platform.
+
+        A single range scan over the primary key index.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT transaction_key FROM imported_transactions WHERE platform = ?",
+                (platform,),
+            ).fetchall()
+        return {key for (key,) in rows}
+
+    def page_index(self, platform: str) -> Dict[str, Tuple[str, Optional[Dict[str, str]]]]:
+        """Return ``{transaction_key: (page_id, property_hashes)}`` for a platform.
+
+        ``property_hashes`` is None for rows recorded before hashes were stored.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT transaction_key, page_id, property_hashes FROM imported_transactions "
+                "WHERE platform = ?",
+                (platform,),
+            ).fetchall()
+        return {
+            key: (page_id, json.loads(hashes) if hashes else None)
+            for key, page_id, hashes in rows
+        }
+
+    def count(self, platform: str) -> int:
+        """Return how many transactions are recorded for a platform."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM imported_transactions WHERE platform = ?",
+                (platform,),
+            ).fetchone()
+        return count
+
+    def record(
+        self,
+        platform: str,
+        transaction_key: str,
+        page_id: str,
+        occurred_at: Optional[str] = None,
+        property_hashes: Optional[Dict[str, str]] = None,
+    ):
+        """Remember that a transaction has been uploaded (or updated).
+
+        Rows without a transaction key cannot be deduplicated and are ignored.
+        """
+        if not transaction_key:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO imported_transactions "
+                "(platform, transaction_key, page_id, occurred_at, imported_at, property_hashes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    platform,
+                    transaction_key,
+                    page_id,
+                    occurred_at,
+                    datetime.now().isoformat(timespec="seconds"),
+                    json.dumps(property_hashes) if property_hashes is not None else None,
+                ),
+            )
+
+    def watermark(self, platform: str) -> Optional[datetime]:
+        """Return the latest transaction time imported for a platform, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_transaction_time FROM watermarks WHERE platform = ?",
+                (platform,),
+            ).fetchone()
+        return datetime.strptime(row[0], _WATERMARK_FORMAT) if row else None
+
+    def advance_watermark(self, platform: str, transaction_time: datetime):
+        """Move a platform's high-water mark forward (it never moves backwards)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watermarks (platform, last_transaction_time, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(platform) DO UPDATE SET "
+                "last_transaction_time = MAX(last_transaction_time, excluded.last_transaction_time), "
+                "updated_at = excluded.updated_at",
+                (
+                    platform,
+                    transaction_time.strftime(_WATERMARK_FORMAT),
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
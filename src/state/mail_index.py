@@ -0,0 +1,174 @@
+"""Local SQLite index of mailbox envelopes for incremental scans."""
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+from src.utils.logger import get_logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    account       TEXT NOT NULL,
+    mailbox       TEXT NOT NULL,
+    uidvalidity   INTEGER NOT NULL,
+    last_uid      INTEGER NOT NULL,
+    indexed_since TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    PRIMARY KEY (account, mailbox)
+);
+
+CREATE TABLE IF NOT EXISTS envelopes (
+    account        TEXT NOT NULL,
+    mailbox        TEXT NOT NULL,
+    uid            INTEGER NOT NULL,
+    from_addr      TEXT NOT NULL,
+    subject        TEXT NOT NULL,
+    sent_at        TEXT,
+    classification TEXT,
+    PRIMARY KEY (account, mailbox, uid)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS envelopes_by_classification
+    ON envelopes (account, mailbox, classification, uid);
+"""
+
+
+@dataclass
+class MailboxState:
+    """How far a mailbox has been indexed."""
+
+    uidvalidity: int
+    last_uid: int
+    indexed_since: date
+
+
+class MailIndex:
+    """Envelopes (UID, From, Subject, Date) of the mails seen in earlier runs.
+
+    Each mailbox is tagged with its UIDVALIDITY: UIDs are only stable while
+    it stays the same, so a change discards the mailbox's envelopes and the
+    next scan rebuilds them. Envelopes carry a classification such as
+    ``password:alipay`` or ``bill:wechatpay`` (None for unrelated mail), so
+    finding the newest bill mail is an index lookup.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self.logger = get_logger()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def state(self, account: str, mailbox: str) -> Optional[MailboxState]:
+        """Return the indexing state of a mailbox, or None if it was never indexed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT uidvalidity, last_uid, indexed_since FROM mailboxes "
+                "WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            ).fetchone()
+        if row is None:
+            return None
+        return MailboxState(row[0], row[1], date.fromisoformat(row[2]))
+
+    def reset(self, account: str, mailbox: str, uidvalidity: int, indexed_since: date):
+        """Discard a mailbox's envelopes before it is indexed again from ``indexed_since``."""
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "DELETE FROM envelopes WHERE account = ? AND mailbox = ?", (account, mailbox)
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO mailboxes "
+                    "(account, mailbox, uidvalidity, last_uid, indexed_since, updated_at) "
+                    "VALUES (?, ?, ?, 0, ?, ?)",
+                    (account, mailbox, uidvalidity, indexed_since.isoformat(), now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def add(
+        self,
+        account: str,
+        mailbox: str,
+        envelopes: Iterable[Tuple[int, str, str, Optional[str], Optional[str]]],
+        last_uid: int,
+    ):
+        """Store new envelopes and move the mailbox's last indexed UID.
+
+        Args:
+            account: Mail account, e.g. user@imap.example.com
+            mailbox: Mailbox name
+            envelopes: (uid, from_addr, subject, sent_at, classification) tuples
+            last_uid: Highest UID covered by this scan
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO envelopes "
+                    "(account, mailbox, uid, from_addr, subject, sent_at, classification) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((account, mailbox, *envelope) for envelope in envelopes),
+                )
+                self._conn.execute(
+                    "UPDATE mailboxes SET last_uid = MAX(last_uid, ?), updated_at = ? "
+                    "WHERE account = ? AND mailbox = ?",
+                    (last_uid, now, account, mailbox),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove(self, account: str, mailbox: str, uid: int):
+        """Forget an envelope whose mail no longer exists (e.g. expunged)."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM envelopes WHERE account = ? AND mailbox = ? AND uid = ?",
+                (account, mailbox, uid),
+            )
+
+    def newest(
+        self, account: str, mailbox: str, classification: str, since: Optional[date] = None
+    ) -> Optional[Tuple[int, str]]:
+        """Return ``(uid, subject)`` of the newest envelope with a classification.
+
+        Args:
+            account: Mail account
+            mailbox: Mailbox name
+            classification: e.g. "bill:alipay"
+            since: Ignore mails dated before this day (undated mails are kept)
+        """
+        query = (
+            "SELECT uid, subject FROM envelopes "
+            "WHERE account = ? AND mailbox = ? AND classification = ?"
+        )
+        params = [account, mailbox, classification]
+        if since is not None:
+            query += " AND (sent_at IS NULL OR sent_at >= ?)"
+            params.append(since.isoformat())
+        query += " ORDER BY uid DESC LIMIT 1"
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()
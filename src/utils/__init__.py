@@ -1,5 +1,7 @@
 """Utility modules for the application."""
 
 from src.utils.logger import setup_logger, get_logger
+from src.utils.rate_limiter import TokenBucket
+from src.utils.timing import StageStats, StageTiming
 
-__all__ = ["setup_logger", "get_logger"]
+__all__ = ["setup_logger", "get_logger", "TokenBucket", "StageStats", "StageTiming"]
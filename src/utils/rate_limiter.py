@@ -0,0 +1,81 @@
+"""Token-bucket rate limiting shared by sync and async callers."""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    A token is reserved under a lock and the caller sleeps outside of it, so one
+    bucket can pace plain threads as well as coroutines running in different
+    event loops.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second (average requests per second)
+            capacity: Maximum burst size (defaults to ``max(1, rate)``)
+
+        Raises:
+            ValueError: If rate is not positive
+        """
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take one token and return how many seconds the caller must wait for it."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def try_acquire(self) -> float:
+        """Take a token only if one is available now.
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one will be available
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def pause(self, seconds: float):
+        """Withhold tokens for at least ``seconds``, e.g. after a Retry-After response.
+
+        Pauses do not add up: several workers reporting the same Retry-After
+        at once still pause the bucket for ``seconds`` only.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+    def acquire(self):
+        """Block the current thread until a token is available."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        """Suspend the current coroutine until a token is available."""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
@@ -0,0 +1,59 @@
+"""Per-stage timing and throughput statistics."""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class StageTiming:
+    """Wall time and row count of one pipeline stage."""
+
+    name: str
+    seconds: float = 0.0
+    rows: Optional[int] = None
+
+    @property
+    def rows_per_second(self) -> Optional[float]:
+        if self.rows is None or self.seconds <= 0:
+            return None
+        return self.rows / self.seconds
+
+    def __str__(self):
+        text = f"{self.name:<10} {self.seconds:8.3f}s"
+        if self.rows is not None:
+            text += f"  {self.rows:>8} rows"
+        if self.rows_per_second is not None:
+            text += f"  {self.rows_per_second:>12.1f} rows/s"
+        return text
+
+
+class StageStats:
+    """Collect timings of the stages of one run.
+
+    Usage::
+
+        stats = StageStats()
+        with stats.stage("process") as stage:
+            df = ...
+            stage.rows = len(df)
+    """
+
+    def __init__(self):
+        self.stages: List[StageTiming] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        timing = StageTiming(name)
+        start = time.perf_counter()
+        try:
+            yield timing
+        finally:
+            timing.seconds = time.perf_counter() - start
+            self.stages.append(timing)
+
+    def summary(self) -> List[str]:
+        """Return one formatted line per stage, plus the total."""
+        total = sum(stage.seconds for stage in self.stages)
+        return [str(stage) for stage in self.stages] + [f"{'total':<10} {total:8.3f}s"]
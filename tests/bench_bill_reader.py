@@ -0,0 +1,90 @@
+"""Benchmark reading a large Alipay bill archive through BillReader.
+
+Generates a synthetic GBK Alipay bill (1M records by default, the preamble
+taken from ``alipay_raw(example).csv``), zips it and times
+``BillReader.read_frame``, i.e. the path the importer actually runs:
+decrypt -> decode -> ``CsvTransformer.iter_standard_lines`` -> ``pd.read_csv``.
+
+Usage:
+    python tests/bench_bill_reader.py [--lines N] [--password PW] [--keep DIR]
+"""
+
+import argparse
+import logging
+import resource
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import pyzipper
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.adapters.factory import AdapterFactory  # noqa: E402
+from src.file_utils.bill_reader import BillReader  # noqa: E402
+from src.utils.logger import setup_logger  # noqa: E402
+
+HEADER = "交易时间,交易分类,交易对方,对方账号,商品说明,收/支,金额,收/付款方式,交易状态,交易订单号,商家订单号,备注,\n"
+MEMBER = "支付宝交易明细(20240801-20240831).csv"
+
+
+def generate(path: Path, lines: int) -> None:
+    """Write a GBK Alipay bill with ``lines`` records, padded like the real export."""
+    preamble = (ROOT / "alipay_raw(example).csv").read_text(encoding="gbk").split("交易时间")[0]
+    with open(path, "w", encoding="gbk", newline="") as f:
+        f.write(preamble)
+        f.write(HEADER)
+        for i in range(lines):
+            f.write(
+                f"2024-08-{i % 28 + 1:02d} 12:{i % 60:02d}:{i % 60:02d},日用百货,商户{i % 997}  ,"
+                f"abc***@163.com,商品说明{i % 13},支出,{i % 1000}.{i % 100:02d},余额宝,交易成功   ,"
+                f"2024082222001{i:015d}\t,T200P{i:018d}\t,,\n"
+            )
+
+
+def archive(bill: Path, target: Path, password: str | None) -> None:
+    """Zip the bill, AES-encrypted if a password is given (like the bill mails)."""
+    if password is None:
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.write(bill, MEMBER)
+        return
+    with pyzipper.AESZipFile(target, "w", compression=zipfile.ZIP_DEFLATED, encryption=pyzipper.WZ_AES) as zf:
+        zf.setpassword(password.encode())
+        zf.write(bill, MEMBER)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000, help="Records in the bill")
+    parser.add_argument("--password", help="Encrypt the archive with AES using this password")
+    parser.add_argument("--keep", help="Directory for the generated files (default: a temporary one)")
+    args = parser.parse_args()
+    setup_logger(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(args.keep or tmp)
+        directory.mkdir(parents=True, exist_ok=True)
+        bill, zipped = directory / "bill.csv", directory / "支付宝交易明细(20240801-20240831).zip"
+        started = time.perf_counter()
+        generate(bill, args.lines)
+        archive(bill, zipped, args.password)
+        print(f"Generated {bill.stat().st_size / 2**20:.0f} MB bill, "
+              f"{zipped.stat().st_size / 2**20:.0f} MB archive in {time.perf_counter() - started:.1f}s")
+
+        adapter = AdapterFactory.create("alipay")
+        col_map = adapter.get_csv_column_mapping()
+        id_columns = {col_map["transaction_id"]: str, col_map["merchant_order_id"]: str}  # as DataProcessor does
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        frame = BillReader(zipped, args.password, adapter).read_frame(dtype=id_columns)
+        elapsed = time.perf_counter() - started
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"read_frame: {len(frame)} rows in {elapsed:.2f}s, "
+              f"peak RSS {peak / 1024:.0f} MB (+{(peak - baseline) / 1024:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import sys
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+# Make ``src`` importable when pytest is run from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.adapters.factory import AdapterFactory  # noqa: E402
+from src.config import constants  # noqa: E402
+from src.core.service import BillImportService, ImportOptions  # noqa: E402
+from src.data_processing.data_processor import DataProcessor  # noqa: E402
+from src.file_utils.bill_reader import BillReader  # noqa: E402
+from src.notion_client.fake_server import FakeNotionConfig, create_server  # noqa: E402
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "alipay_raw(example).csv"
+
+
+@pytest.fixture
+def notion_server(request):
+    """Running fake Notion server; parametrize indirectly with a FakeNotionConfig to inject faults."""
+    server = create_server(port=0, config=getattr(request, "param", None) or FakeNotionConfig())
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def alipay_data(tmp_path):
+    """(adapter, processed DataFrame) of the example Alipay bill, read from a zip like a real import."""
+    adapter = AdapterFactory.create("alipay")
+    archive = tmp_path / "支付宝交易明细(1).zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.write(EXAMPLE, "支付宝交易明细(1).csv")
+    processor = DataProcessor(BillReader(archive, None, adapter), adapter)
+    processor.process_mandatory_fields()
+    return adapter, processor.get_processed_data()
+
+
+@pytest.fixture
+def make_service(tmp_path, notion_server):
+    """Build services working under ``tmp_path`` and uploading to the fake server (unthrottled)."""
+
+    def make(**options) -> BillImportService:
+        options.setdefault("rate_limit", 1000.0)
+        return BillImportService(
+            ("u", "p", "i", "ds", "tok"),
+            options=ImportOptions(notion_base_url=notion_server.base_url, **options),
+            paths=constants.DataPaths(tmp_path),
+        )
+
+    return make
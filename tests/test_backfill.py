@@ -0,0 +1,51 @@
+import shutil
+import subprocess
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.core.backfill import read_archive
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ALIPAY_EXAMPLE = PROJECT_ROOT / "alipay_raw(example).csv"
+
+
+@pytest.fixture
+def zipcrypto_archive(tmp_path):
+    if shutil.which("zip") is None:
+        pytest.skip("the zip command is needed to write a ZipCrypto archive")
+    member = tmp_path / "支付宝交易明细(20240801-20240831).csv"
+    shutil.copyfile(ALIPAY_EXAMPLE, member)
+    archive = tmp_path / "支付宝交易明细(20240801-20240831).zip"
+    subprocess.run(["zip", "-q", "-j", "-P", "123456", str(archive), str(member)], check=True)
+    return archive
+
+
+def _passes_check_byte(archive: Path, password: str) -> bool:
+    with zipfile.ZipFile(archive) as zf:
+        try:
+            with zf.open(zf.infolist()[0], pwd=password.encode()):
+                return True
+        except RuntimeError:
+            return False
+
+
+def test_zipcrypto_wrong_password_passing_the_header_check(zipcrypto_archive):
+    # About one wrong password in 256 matches the single ZipCrypto check byte
+    impostor = next(
+        password for password in (f"pw{i}" for i in range(10000))
+        if _passes_check_byte(zipcrypto_archive, password)
+    )
+
+    result = read_archive(zipcrypto_archive, "alipay", [impostor, "123456"])
+
+    assert result.error is None
+    assert len(result.data) == 10
+
+
+def test_no_password_opens_the_archive(zipcrypto_archive):
+    result = read_archive(zipcrypto_archive, "alipay", ["000000", "111111"])
+
+    assert result.data is None
+    assert "none of the 2 passwords" in result.error
@@ -0,0 +1,27 @@
+import zipfile
+
+import pytest
+
+from src.adapters.factory import AdapterFactory
+from src.file_utils.bill_reader import BillReader
+from src.file_utils.csv_transformer import CsvTransformer
+
+
+def test_standard_lines_start_at_header_and_drop_padding():
+    lines = ["支付宝交易明细\n", "----\n", "交易时间,交易对方,交易订单号\n", "2024-08-01 12:00:00,商户  ,2024\t,\n"]
+
+    assert list(CsvTransformer.iter_standard_lines(lines)) == [
+        "交易时间,交易对方,交易订单号\n",
+        "2024-08-01 12:00:00,商户,2024,\n",
+    ]
+
+
+def test_missing_header_is_an_error(tmp_path):
+    with pytest.raises(ValueError, match="交易时间"):
+        list(CsvTransformer.iter_standard_lines(["<html>下载链接已过期</html>\n"]))
+
+    archive = tmp_path / "支付宝交易明细(1).zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("支付宝交易明细(1).csv", "没有表头的文件\n".encode("gbk"))
+    with pytest.raises(ValueError, match="交易时间"):
+        BillReader(archive, None, AdapterFactory.create("alipay")).read_frame()
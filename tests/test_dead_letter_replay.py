@@ -0,0 +1,31 @@
+from src.adapters.factory import AdapterFactory
+from src.notion_client.client import NotionClient
+
+
+def _properties(client, transaction_number, remarks=""):
+    return client.notion_property(
+        "商品", 1.0, "支出", "餐饮美食", "2024-08-22T08:19:51Z", "商家", remarks,
+        transaction_number, "", "余额宝",
+    )
+
+
+def test_replay_keeps_dead_lettered_updates(make_service, notion_server):
+    service = make_service()
+    adapter = AdapterFactory.create("alipay")
+    client = service._notion_client(adapter)
+
+    # An imported page whose --upsert update failed, and a create that failed
+    original = _properties(client, "2024082222001")
+    page_id = client.create_page(original)
+    service.ledger.record("alipay", "2024082222001", page_id, "", NotionClient.property_hashes(original))
+    dead_letters = service._dead_letter_queue(adapter)
+    dead_letters.push(_properties(client, "2024082222001", "退款"), RuntimeError("503"), 5, page_id=page_id)
+    dead_letters.push(_properties(client, "2024082222002"), RuntimeError("503"), 5)
+
+    result = service.replay_dead_letters("alipay")
+
+    assert result.success and result.records_uploaded == 2
+    pages = notion_server.state.pages
+    assert len(pages) == 2
+    assert pages[page_id]["properties"]["Remarks"]["rich_text"][0]["plain_text"] == "退款"
+    assert dead_letters.pending() == 0 and not dead_letters.claimed_path.exists()
@@ -0,0 +1,28 @@
+from src.core.service import PayloadFile
+from src.utils.timing import StageStats
+
+
+def test_dry_run_file_round_trips_through_push(make_service, notion_server, alipay_data):
+    adapter, data = alipay_data
+    transaction_ids = set(data[adapter.get_csv_column_mapping()["transaction_id"]].str.strip())
+    dry = make_service(dry_run=True)
+    checkpoint = dry._upload_checkpoint(adapter)
+
+    written = dry._import_processed(data, adapter, StageStats(), checkpoint)
+
+    # Nothing was sent, and no state moved: a real import afterwards sees every row as new
+    assert written.success and written.records_processed == len(data)
+    assert notion_server.state.counters["requests"] == 0
+    assert dry.ledger.imported_keys("alipay") == set()
+    assert dry.ledger.watermark("alipay") is None
+    assert checkpoint.load() is None and not any(dry.paths.checkpoint_dir.iterdir())
+    payloads = {record["row"]: record["properties"] for record in PayloadFile(written.output_file)}
+    assert len(payloads) == len(data)
+
+    pushed = make_service().push_payload_file(written.output_file)
+
+    assert pushed.success and pushed.records_uploaded == len(data)
+    pages = list(notion_server.state.pages.values())
+    assert {page["properties"]["Transaction Number"]["rich_text"][0]["plain_text"] for page in pages} == transaction_ids
+    assert dry.ledger.imported_keys("alipay") == transaction_ids
+    assert make_service().push_payload_file(written.output_file).records_uploaded == 0  # now in the ledger
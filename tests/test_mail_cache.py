@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta, timezone
+
+from src.email_client.cache import MailCache
+
+CST = timezone(timedelta(hours=8))
+
+
+def test_password_for_compares_dates_across_offsets(tmp_path):
+    cache = MailCache(tmp_path)
+    bill = cache.add_message("bill", "alipay", b"bill", "service@mail.alipay.com", "账单",
+                             datetime(2024, 9, 1, 10, 0, tzinfo=CST))
+    # 11:30 and 17:00 in Beijing, sent from a UTC client: "T03:30" < "T10:00" as strings
+    first = cache.add_message("password", "alipay", b"pw1", "me@x.com", "alipay解压密码1",
+                              datetime(2024, 9, 1, 3, 30, tzinfo=timezone.utc))
+    cache.add_message("password", "alipay", b"pw2", "me@x.com", "alipay解压密码2",
+                      datetime(2024, 9, 1, 9, 0, tzinfo=timezone.utc))
+    cache.add_message("password", "alipay", b"pw0", "me@x.com", "alipay解压密码0",
+                      datetime(2024, 9, 1, 9, 0, tzinfo=CST))  # before the bill
+
+    assert [e["subject"] for e in cache.entries("password", "alipay")] == [
+        "alipay解压密码0", "alipay解压密码1", "alipay解压密码2",
+    ]
+    assert cache.password_for("alipay", bill) == first
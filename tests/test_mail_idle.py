@@ -0,0 +1,73 @@
+import imaplib
+import socket
+import threading
+import time
+
+import pytest
+
+from src.email_client.client import MailClient
+
+
+class _IdleServer:
+    """Minimal IMAP server that answers IDLE with scripted untagged responses."""
+
+    def __init__(self, during_idle: bytes, capabilities: bytes = b"IMAP4rev1 IDLE"):
+        self.during_idle = during_idle
+        self.capabilities = capabilities
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.port = self.listener.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.listener.accept()
+        with conn, conn.makefile("rb") as rfile:
+            conn.sendall(b"* OK ready\r\n")
+            while True:
+                line = rfile.readline()
+                if not line:
+                    return
+                tag, command = line.split()[:2]
+                if command == b"CAPABILITY":
+                    conn.sendall(b"* CAPABILITY " + self.capabilities + b"\r\n" + tag + b" OK done\r\n")
+                elif command == b"IDLE":
+                    conn.sendall(b"+ idling\r\n")
+                    time.sleep(0.1)
+                    # Both lines in one packet
+                    conn.sendall(self.during_idle)
+                    rfile.readline()  # DONE
+                    conn.sendall(tag + b" OK idle done\r\n")
+                elif command == b"NOOP":
+                    conn.sendall(self.during_idle + tag + b" OK noop\r\n")
+                elif command == b"LOGOUT":
+                    conn.sendall(b"* BYE\r\n" + tag + b" OK bye\r\n")
+                    return
+
+
+def _client(server: _IdleServer, exists: int) -> MailClient:
+    client = MailClient("me@example.com", "pw", "127.0.0.1")
+    client.mail = imaplib.IMAP4("127.0.0.1", server.port)
+    client.exists = exists
+    return client
+
+
+@pytest.mark.parametrize("capabilities", [b"IMAP4rev1 IDLE", b"IMAP4rev1"])
+def test_new_mail_after_expunge_wakes_up(capabilities):
+    # Mail 3 of 4 is deleted, then a new mail brings the count back to 4
+    server = _IdleServer(b"* 3 EXPUNGE\r\n* 4 EXISTS\r\n", capabilities)
+    client = _client(server, exists=4)
+    started = time.monotonic()
+
+    assert client.wait_for_mail(timeout=5, poll_interval=0.1) is True
+    assert time.monotonic() - started < 2
+    assert client.exists == 4
+    client.close()
+
+
+def test_expunge_alone_is_not_new_mail():
+    server = _IdleServer(b"* 3 EXPUNGE\r\n* 3 EXISTS\r\n")
+    client = _client(server, exists=4)
+
+    assert client.wait_for_mail(timeout=0.5) is False
+    assert client.exists == 3
+    client.close()
@@ -0,0 +1,58 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from src.adapters.factory import AdapterFactory
+from src.notion_client.client import NotionClient
+from src.notion_client.fake_server import create_server
+
+
+@pytest.fixture
+def notion():
+    server = create_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = NotionClient(
+        "ds", "token", AdapterFactory.create("alipay"), base_url=f"http://127.0.0.1:{server.server_port}"
+    )
+    yield client
+    server.shutdown()
+
+
+def _properties(client, transaction_number, merchant_tracking_number):
+    return client.notion_property(
+        "商品", 1.0, "支出", "餐饮美食", "2024-08-22T08:19:51Z", "商家", "",
+        transaction_number, merchant_tracking_number, "余额宝",
+    )
+
+
+def test_find_page_by_transaction_number(notion):
+    page_id = notion.create_page(_properties(notion, "2024082222001", "T200P1"))
+
+    assert notion.find_page("2024082222001") == page_id
+
+
+def test_find_page_by_merchant_number_fallback(notion):
+    properties = _properties(notion, "", "T200P2")
+    page_id = notion.create_page(properties)
+
+    assert NotionClient.transaction_key(properties) == "T200P2"
+    assert notion.find_page("T200P2") == page_id
+    assert notion.find_page("T200P3") is None
+
+
+def test_build_payloads_matches_build_properties(notion):
+    col_map = notion.adapter.get_csv_column_mapping()
+    row = {
+        col_map["content"]: "商品", col_map["amount"]: 12.5, col_map["transaction_type"]: "支出",
+        col_map["category"]: "餐饮美食", col_map["datetime"]: "2024-08-22T08:19:51Z",
+        col_map["counterparty"]: "商家", col_map["remarks"]: "", col_map["transaction_id"]: "2024082222001",
+        col_map["merchant_order_id"]: "T200P1", col_map["payment_method"]: "余额宝",
+    }
+    df = pd.DataFrame([row, {**row, col_map["transaction_id"]: "2024082222002"}])
+
+    payloads = [properties for _, properties in notion.build_payloads(df)]
+    assert payloads == [notion.build_properties(r) for _, r in df.iterrows()]
+
+    payloads[0]["From"]["select"]["name"] = "changed"  # payloads share no dicts
+    assert payloads[1]["From"]["select"]["name"] == notion.adapter.get_notion_display_name()
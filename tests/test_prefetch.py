@@ -0,0 +1,19 @@
+from src.notion_client.uploader import UploadReport
+
+
+def test_prefetched_pages_are_not_written_to_the_ledger(make_service, alipay_data):
+    adapter, data = alipay_data
+    service = make_service(prefetch=True)
+    client = service._notion_client(adapter)
+    payloads = list(client.build_payloads(data))
+    page_id = client.create_page(payloads[0][1])
+
+    existing = service._prefetch_existing(data, adapter)
+
+    assert [page["page_id"] for page in existing.values()] == [page_id]
+    assert service.ledger.count("alipay") == 0
+    assert len(service._drop_imported(data, adapter, existing)) == len(data) - 1
+
+    jobs = list(service._upsert_jobs(payloads, adapter, UploadReport(), existing))
+    assert jobs[0].page_id == page_id and jobs[0].changes is None
+    assert all(job.page_id is None and job.lookup_key is None for job in jobs[1:])
@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+from src.utils.rate_limiter import TokenBucket
+
+
+def test_pause_withholds_tokens():
+    bucket = TokenBucket(rate=3, capacity=3)
+    bucket.pause(1.0)
+    # One second of pause, then a third of a second for the next token
+    assert bucket.try_acquire() == pytest.approx(1.0 + 1 / 3, abs=0.05)
+
+
+def test_concurrent_pauses_do_not_add_up():
+    bucket = TokenBucket(rate=3, capacity=3)
+    barrier = threading.Barrier(4)
+
+    def pause():
+        barrier.wait()
+        bucket.pause(1.0)
+
+    threads = [threading.Thread(target=pause) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert bucket.try_acquire() == pytest.approx(1.0 + 1 / 3, abs=0.05)
+
+
+def test_pause_keeps_a_longer_pause():
+    bucket = TokenBucket(rate=3, capacity=3)
+    bucket.pause(2.0)
+    bucket.pause(1.0)
+    assert bucket.try_acquire() == pytest.approx(2.0 + 1 / 3, abs=0.05)
@@ -0,0 +1,140 @@
+import threading
+from datetime import date
+
+import pytest
+
+from src.adapters.factory import AdapterFactory
+from src.email_client.client import MailEnvelope, MailNotFoundError
+from src.email_client.scanner import MailboxScanner
+from src.state.mail_index import MailIndex
+
+
+def test_scanner_searches_whole_mailbox_by_default():
+    assert MailboxScanner(None, [])._since_criteria() == ["ALL"]
+    assert MailboxScanner(None, [], date(2025, 1, 1))._since_criteria() == ["SINCE", "01-Jan-2025"]
+
+
+class _Client:
+    def __init__(self, attachments):
+        self.attachments = attachments
+        self.adapter = None
+        self.fetched = []
+
+    def get_mail_info(self, uid):
+        self.fetched.append(uid)
+
+    def fetch_mail_attachment(self):
+        attachment = self.attachments[self.adapter.platform_name]
+        if isinstance(attachment, Exception):
+            raise attachment
+        return attachment
+
+
+def test_background_downloads_keep_outcomes_for_download_bill():
+    adapters = [AdapterFactory.create("alipay"), AdapterFactory.create("wechatpay")]
+    client = _Client({"alipay": ["a.zip"], "wechatpay": RuntimeError("link expired")})
+    scanner = MailboxScanner(client, adapters)
+    for uid, mail in zip((b"1", b"2"), scanner.results.values()):
+        mail.password, mail.bill_uid = "123456", uid
+
+    scanner.start_downloads(logout=False)
+    scanner._download_thread.join()
+    client.attachments = {}  # the session is gone: nothing may be fetched again
+
+    assert scanner.download_bill("alipay") is True
+    with pytest.raises(RuntimeError, match="link expired"):
+        scanner.download_bill("wechatpay")
+    assert client.fetched == [b"1", b"2"]
+
+
+class _SlowClient(_Client):
+    """The WeChat bill download blocks until ``release`` is set."""
+
+    def __init__(self):
+        super().__init__({"alipay": ["a.zip"], "wechatpay": ["w.zip"]})
+        self.release = threading.Event()
+        self.closed = False
+
+    def fetch_mail_attachment(self):
+        if self.adapter.platform_name == "wechatpay":
+            assert self.release.wait(5)
+        return super().fetch_mail_attachment()
+
+    def close(self):
+        self.closed = True
+
+
+def test_first_bill_is_available_while_the_next_downloads():
+    adapters = [AdapterFactory.create("alipay"), AdapterFactory.create("wechatpay")]
+    client = _SlowClient()
+    scanner = MailboxScanner(client, adapters)
+    for uid, mail in zip((b"1", b"2"), scanner.results.values()):
+        mail.password, mail.bill_uid = "123456", uid
+
+    scanner.start_downloads()
+
+    assert scanner.download_bill("alipay") is True
+    assert not client.closed  # the WeChat download still holds the session
+    client.release.set()
+    assert scanner.download_bill("wechatpay") is True
+    scanner.close()
+    assert client.closed
+
+
+class _IndexedClient(_Client):
+    """Mailbox of 100 mails where only UIDs 40 (alipay bill) and 41 (its password) match."""
+
+    username, imap_url, mailbox, uidvalidity, uidnext, cache = "me@x.com", "imap.x.com", "inbox", 7, 101, None
+
+    def __init__(self):
+        super().__init__({"alipay": ["a.zip"]})
+        self.searches, self.envelopes = [], []
+
+    def search(self, criteria):
+        self.searches.append(criteria)
+        if criteria[:2] == ["FROM", "service@mail.alipay.com"]:
+            return [b"40"]
+        if criteria[:2] == ["FROM", "me@x.com"] and criteria[-1].startswith("alipay"):
+            return [b"41"]
+        return [] if criteria[0] != "ALL" else [str(uid).encode() for uid in range(1, 101)]
+
+    def fetch_envelopes(self, uids):
+        uids = list(uids)
+        self.envelopes += uids
+        for uid in uids:
+            if uid == b"40":
+                yield MailEnvelope(uid, "service@mail.alipay.com", "支付宝账单")
+            elif uid == b"41":
+                yield MailEnvelope(uid, "me@x.com", "alipay解压密码123456")
+
+
+def test_new_index_is_seeded_from_server_searches(tmp_path):
+    client = _IndexedClient()
+    index = MailIndex(tmp_path / "index.sqlite3")
+    scanner = MailboxScanner(client, [AdapterFactory.create("alipay")], index=index)
+
+    mail = scanner.scan()["alipay"]
+
+    assert (mail.bill_uid, mail.password) == (b"40", "123456")
+    assert ["ALL"] not in client.searches and sorted(client.envelopes) == [b"40", b"41"]
+    assert index.state("me@x.com@imap.x.com", "inbox").last_uid == 100
+
+
+def test_expunged_indexed_bill_falls_back_to_previous_one(tmp_path):
+    client = _IndexedClient()
+    index = MailIndex(tmp_path / "index.sqlite3")
+    MailboxScanner(client, [AdapterFactory.create("alipay")], index=index).scan()
+    index.add("me@x.com@imap.x.com", "inbox", [(44, "service@mail.alipay.com", "支付宝账单", None, "bill:alipay")], 100)
+
+    def get_mail_info(uid):
+        if uid == b"44":  # expunged after it was indexed
+            raise MailNotFoundError("Mail UID 44 not found")
+        client.fetched.append(uid)
+
+    client.get_mail_info = get_mail_info
+    scanner = MailboxScanner(client, [AdapterFactory.create("alipay")], index=index)
+    assert scanner.scan()["alipay"].bill_uid == b"44"
+
+    assert scanner.download_bill("alipay") is True
+    assert client.fetched == [b"40"] and scanner.results["alipay"].bill_uid == b"40"
+    assert index.newest("me@x.com@imap.x.com", "inbox", "bill:alipay") == (40, "支付宝账单")
@@ -0,0 +1,36 @@
+import zipfile
+
+import pytest
+
+from src.adapters.factory import AdapterFactory
+from src.file_utils.unzip_att import FileExtractor, select_bill_member, zip_method
+
+
+def test_select_bill_member_prefers_platform_prefix():
+    members = [zipfile.ZipInfo("readme.txt"), zipfile.ZipInfo("other.csv"), zipfile.ZipInfo("支付宝交易明细(1).csv")]
+
+    assert select_bill_member(members, "支付宝交易明细").filename == "支付宝交易明细(1).csv"
+    assert select_bill_member(members, "微信支付账单").filename == "other.csv"
+    with pytest.raises(FileNotFoundError):
+        select_bill_member(members[:1], "支付宝交易明细")
+
+
+def test_zip_method_rejects_unreadable_members():
+    ppmd = zipfile.ZipInfo("bill.csv")
+    ppmd.compress_type = 98
+    aes = zipfile.ZipInfo("bill.csv")
+    aes.flag_bits, aes.compress_type = 0x1, 99  # AES without its 0x9901 extra field
+
+    for info in (ppmd, aes):
+        with pytest.raises(zipfile.BadZipFile):
+            zip_method(info)
+
+
+def test_file_extractor_uses_adapter_prefix(tmp_path):
+    for name in ("微信支付账单(1).zip", "支付宝交易明细(1).zip", "支付宝交易明细(1).csv"):
+        (tmp_path / name).write_bytes(b"")
+
+    extractor = FileExtractor(tmp_path, AdapterFactory.create("alipay"))
+
+    assert [f.name for f in extractor.archives()] == ["支付宝交易明细(1).zip"]
+    assert extractor.search_files().name == "支付宝交易明细(1).zip"
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from src.adapters.factory import AdapterFactory
+from src.notion_client.client import NotionClient
+from src.notion_client.dead_letter import DeadLetterQueue
+from src.notion_client.fake_server import FakeNotionConfig
+from src.notion_client.retry import RetryPolicy
+from src.notion_client.uploader import NotionUploader, UploadJob
+from src.utils.rate_limiter import TokenBucket
+
+FAULTS = FakeNotionConfig(throttle_rate=0.2, error_rate=0.2, retry_after=0, seed=7)
+
+
+@pytest.mark.parametrize("notion_server", [FAULTS], indirect=True)
+def test_async_upload_retries_faults_and_dead_letters_the_rest(tmp_path, notion_server):
+    client = NotionClient("ds", "tok", AdapterFactory.create("alipay"), base_url=notion_server.base_url)
+    dead_letters = DeadLetterQueue(tmp_path / "alipay_dead_letter.ndjson", "alipay")
+    uploader = NotionUploader(
+        client,
+        async_mode=True,
+        workers=4,
+        rate_limiter=TokenBucket(1000, 1000),
+        retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.05),
+        dead_letters=dead_letters,
+    )
+    jobs = [
+        UploadJob(i, client.notion_property(
+            "商品", float(i), "支出", "餐饮美食", "2024-08-22T08:19:51Z", "商家", "", f"20240822{i:05d}", "", "余额宝",
+        ))
+        for i in range(40)
+    ]
+    jobs[5].properties["Bogus"] = {"number": 1}  # rejected with a 400, never retried
+
+    report = uploader.run(jobs)
+
+    records = [json.loads(line) for line in dead_letters.path.read_text(encoding="utf-8").splitlines()]
+    pages = notion_server.state.pages.values()
+    uploaded_keys = {page["properties"]["Transaction Number"]["rich_text"][0]["plain_text"] for page in pages}
+    dead_keys = {NotionClient.transaction_key(record["properties"]) for record in records}
+
+    assert report.processed == 40
+    assert report.uploaded + report.dead_lettered == 40
+    assert report.retried > 0 and report.dead_lettered >= 1
+    assert len(uploaded_keys) == report.uploaded and len(records) == report.dead_lettered
+    assert uploaded_keys | dead_keys == {f"20240822{i:05d}" for i in range(40)}
+    assert not uploaded_keys & dead_keys
+    assert "2024082200005" in dead_keys
+    for record in records:
+        # Either rejected outright, or still failing with injected faults after every attempt
+        assert record["status"] == 400 or (record["status"] in (429, 500, 502, 503, 504) and record["attempts"] == 3)
+        assert record["page_id"] is None and record["platform"] == "alipay"
@@ -0,0 +1,15 @@
+def test_upsert_updates_pages_whose_status_changed(make_service, notion_server, alipay_data):
+    adapter, data = alipay_data
+    service = make_service(upsert=True)
+    status = adapter.get_csv_column_mapping()["status"]
+
+    created = service._upload_to_notion(data, adapter)
+    data[status] = "退款成功"
+    changed = service._upload_to_notion(data, adapter)
+    again = service._upload_to_notion(data, adapter)
+
+    assert created.uploaded == len(data) and created.updated == 0
+    assert (changed.updated, changed.unchanged) == (len(data), 0)
+    assert (again.updated, again.unchanged) == (0, len(data))
+    statuses = {page["properties"]["Status"]["select"]["name"] for page in notion_server.state.pages.values()}
+    assert statuses == {"退款成功"}